@@ -1,23 +1,128 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Blueprint, current_app, render_template, request, jsonify
 from flask_cors import CORS
-from anxiety_predict_utils import predict_anxiety, get_feature_importance
+from micro_batcher import BatcherBusyError
+from warmup import Warmup
+from metrics import instrument_blueprint, metrics_blueprint, stage_timers
+from profiler import (PROFILER_ENABLED, PROFILER_DEFAULT_SECONDS, ProfilerBusyError, profiler, authorized,
+                      install_signal_handler)
+from log_utils import get_logger
+import importlib
 import traceback
 import sys
+import os
 
-app = Flask(__name__)
-CORS(app)
+logger = get_logger(__name__)
 
-@app.route('/')
+# Upper bound on respondents per batch request
+MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', 50000))
+
+anxiety_api = Blueprint('anxiety', __name__)
+CORS(anxiety_api)
+instrument_blueprint(anxiety_api, 'prediction')
+
+# Request handling around the model call; the model stages are timed in anxiety_predict_utils
+stages = stage_timers('anxiety', ['parse', 'serialize'])
+
+# The ML stack (numpy, pandas, the predict modules and their models) is only
+# imported by the routes that need it or by the warm-up below, so the app
+# itself imports in a fraction of the time and /test and /ready answer at once
+
+def load_anxiety_models():
+    import anxiety_predict_utils
+    # Build the inference session once at startup; requests borrow its model
+    anxiety_predict_utils.get_session()
+    anxiety_predict_utils.get_feature_importance_payload()
+
+def load_depression_models():
+    import predict_utils
+    predict_utils.load_model_components()
+    predict_utils.get_scorer()
+    predict_utils.get_feature_importance_payload()
+
+warmup = Warmup([
+    ('import numpy', lambda: importlib.import_module('numpy')),
+    ('import pandas', lambda: importlib.import_module('pandas')),
+    ('import anxiety_predict_utils', lambda: importlib.import_module('anxiety_predict_utils')),
+    ('import predict_utils', lambda: importlib.import_module('predict_utils')),
+    ('load anxiety models', load_anxiety_models),
+    ('load depression models', load_depression_models)
+])
+
+def preload_models():
+    """Load every model artifact and derived structure before serving.
+
+    Under gunicorn with preload_app this runs in the master, so the forked
+    workers share the loaded arrays copy-on-write and start out ready.
+    """
+    warmup.run()
+
+def create_app(warm_up=None):
+    """Build the prediction app.
+
+    warm_up (default MODEL_WARMUP, 'background') decides when the models load:
+    'eager' before this returns, 'background' on a thread started by the
+    first request so the server is already listening, 'lazy' on first use
+    (or on the first /ready probe, so readiness still turns true).
+    """
+    warm_up = warm_up or os.getenv('MODEL_WARMUP', 'background')
+    app = Flask(__name__)
+    if warm_up == 'eager':
+        preload_models()
+    elif warm_up == 'background':
+        app.before_request(warmup.start)
+    app.register_blueprint(anxiety_api)
+    app.register_blueprint(metrics_blueprint())
+    return app
+
+def answers_to_input(answers):
+    """Convert a list of {question, answer} pairs to the format expected by the model."""
+    input_data = {}
+    for answer in answers:
+        if 'question' in answer and 'answer' in answer:
+            input_data[answer['question']] = answer['answer']
+    return input_data
+
+def parse_batch_request(data):
+    """Return (inputs, error) for a batch body of {"respondents": [{"answers": [...]}, ...]}."""
+    if not data or not isinstance(data.get('respondents'), list):
+        return None, 'Respondents must be a list'
+    respondents = data['respondents']
+    if len(respondents) > MAX_BATCH_SIZE:
+        return None, f'Batch size exceeds limit of {MAX_BATCH_SIZE}'
+    inputs = []
+    for respondent in respondents:
+        if not isinstance(respondent, dict) or not isinstance(respondent.get('answers'), list):
+            return None, 'Each respondent must have a list of answers'
+        inputs.append(answers_to_input(respondent['answers']))
+    return inputs, None
+
+def batcher_stats(batcher):
+    return dict(batcher.stats(), enabled=True) if batcher is not None else {'enabled': False}
+
+@anxiety_api.route('/')
 def home():
     return render_template('anxiety_index.html')
 
-@app.route('/test', methods=['GET'])
+@anxiety_api.route('/test', methods=['GET'])
 def test():
     try:
-        return jsonify({
+        status = {
             'status': 'Server is running',
-            'model_loaded': True
-        })
+            'model_loaded': warmup.ready
+        }
+        # Only report on the predict modules once something has imported them
+        anxiety_predict_utils = sys.modules.get('anxiety_predict_utils')
+        predict_utils = sys.modules.get('predict_utils')
+        if anxiety_predict_utils is not None and predict_utils is not None:
+            status['prediction_cache'] = {
+                'anxiety': anxiety_predict_utils.prediction_cache.stats(),
+                'depression': predict_utils.prediction_cache.stats()
+            }
+            status['batching'] = {
+                'anxiety': batcher_stats(anxiety_predict_utils.batcher),
+                'depression': batcher_stats(predict_utils.batcher)
+            }
+        return jsonify(status)
     except Exception as e:
         return jsonify({
             'status': 'Error',
@@ -25,59 +130,143 @@ def test():
             'error': str(e)
         })
 
-@app.route('/predict/anxiety', methods=['POST', 'OPTIONS'])
-def predict_anxiety():
+@anxiety_api.route('/ready', methods=['GET'])
+def ready():
+    """Readiness probe: 200 once every model is loaded, 503 until then.
+
+    In lazy mode nothing else starts the warm-up, so the first probe does;
+    models that a request already loaded are picked up from the registry.
+    """
+    if not warmup.ready:
+        warmup.start()
+    return jsonify(warmup.report()), 200 if warmup.ready else 503
+
+@anxiety_api.route('/admin/profile', methods=['GET', 'POST'])
+def profile():
+    """POST ?seconds=N samples this worker for N seconds; GET reports the latest profile.
+
+    Only answers when PROFILER_ENABLED=1 and the X-Profiler-Token header
+    matches PROFILER_TOKEN. Under gunicorn it profiles whichever worker
+    took the request; signal a specific worker to pick one.
+    """
+    if not PROFILER_ENABLED:
+        return jsonify({'error': 'Not found'}), 404
+    if not authorized(request.headers.get('X-Profiler-Token')):
+        return jsonify({'error': 'Forbidden'}), 403
+    if request.method == 'GET':
+        return jsonify(profiler.report or {'state': 'idle'})
+
+    try:
+        profiler.start(request.args.get('seconds', type=float) or PROFILER_DEFAULT_SECONDS)
+        return jsonify(profiler.report), 202
+    except ProfilerBusyError as e:
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@anxiety_api.route('/predict/anxiety', methods=['POST', 'OPTIONS'])
+def predict_anxiety_route():
     if request.method == 'OPTIONS':
-        response = app.make_default_options_response()
+        response = current_app.make_default_options_response()
         response.headers.add('Access-Control-Allow-Origin', '*')
         response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
         response.headers.add('Access-Control-Allow-Methods', 'POST')
         return response
 
     try:
-        data = request.get_json()
-        if not data or 'answers' not in data:
-            return jsonify({'error': 'No answers provided'}), 400
+        with stages['parse'].time():
+            data = request.get_json()
+            if not data or 'answers' not in data:
+                return jsonify({'error': 'No answers provided'}), 400
 
-        answers = data['answers']
-        if not isinstance(answers, list):
-            return jsonify({'error': 'Answers must be a list'}), 400
+            answers = data['answers']
+            if not isinstance(answers, list):
+                return jsonify({'error': 'Answers must be a list'}), 400
 
-        # Convert answers to the format expected by the model
-        input_data = {}
-        for answer in answers:
-            if 'question' in answer and 'answer' in answer:
-                input_data[answer['question']] = answer['answer']
+            # Convert answers to the format expected by the model
+            input_data = answers_to_input(answers)
 
         # Make prediction using the model
+        from anxiety_predict_utils import predict_anxiety
         result = predict_anxiety(input_data)
         
         if not result:
             return jsonify({'error': 'Failed to make prediction'}), 500
 
+        with stages['serialize'].time():
+            return jsonify({
+                'category': result['interpretation'],
+                'probability': float(result['probability']),
+                'symptom_summary': result['symptom_summary']
+            })
+
+    except BatcherBusyError:
+        return jsonify({'error': 'Server is busy, please retry'}), 503
+
+    except Exception as e:
+        logger.error("Error in predict_anxiety: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@anxiety_api.route('/predict/anxiety/batch', methods=['POST'])
+def predict_anxiety_batch_route():
+    try:
+        inputs, error = parse_batch_request(request.get_json())
+        if error:
+            return jsonify({'error': error}), 400
+
+        from anxiety_predict_utils import predict_anxiety_batch
+        results = predict_anxiety_batch(inputs)
         return jsonify({
-            'category': result['predicted_class'],
-            'probability': float(result['confidence']),
-            'symptom_summary': {
-                'severe': result.get('severe_symptoms', []),
-                'moderate': result.get('moderate_symptoms', []),
-                'mild': result.get('mild_symptoms', [])
-            }
+            'results': [
+                {
+                    'category': result['interpretation'],
+                    'probability': result['probability'],
+                    'symptom_summary': result['symptom_summary']
+                }
+                for result in results
+            ]
         })
 
     except Exception as e:
-        print(f"Error in predict_anxiety: {str(e)}")
+        logger.error("Error in predict_anxiety_batch: %s", e)
         return jsonify({'error': str(e)}), 500
 
-@app.route('/feature_importance', methods=['GET'])
+@anxiety_api.route('/predict/depression/batch', methods=['POST'])
+def predict_depression_batch_route():
+    try:
+        inputs, error = parse_batch_request(request.get_json())
+        if error:
+            return jsonify({'error': error}), 400
+
+        import predict_utils
+        return jsonify({'results': predict_utils.predict_depression_batch(inputs)})
+
+    except Exception as e:
+        logger.error("Error in predict_depression_batch: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@anxiety_api.route('/feature_importance', methods=['GET'])
 def feature_importance():
     try:
-        importance_data = get_feature_importance()
-        return jsonify(importance_data.to_dict('records'))
+        from anxiety_predict_utils import get_feature_importance_payload
+        return get_feature_importance_payload().response(request)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@anxiety_api.route('/feature_importance/depression', methods=['GET'])
+def depression_feature_importance():
+    try:
+        import predict_utils
+        return predict_utils.get_feature_importance_payload().response(request)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+app = create_app()
+
 if __name__ == '__main__':
     print("\n=== Starting Anxiety Prediction Server ===")
     print("Server will be available at http://127.0.0.1:5001")
+    # Load the models while the server starts listening; /ready reports progress
+    warmup.start()
+    install_signal_handler()
     app.run(debug=True, port=5001) 
\ No newline at end of file
@@ -1,166 +1,217 @@
-import joblib
 import pandas as pd
 import numpy as np
-import json
+import os
+from model_registry import registry, load_json
+from flat_forest import load_flat_forest, MAX_FLAT_BATCH
+from model_bundle import load_bundle, bundle_path
+from prediction_cache import PredictionCache
+from json_payload import JsonPayload, importance_records
+from symptom_rules import AnxietySymptomRules
+from micro_batcher import BatcherBusyError, batcher_from_env
+from metrics import registry as metrics_registry, stage_timers, cache_samples, batcher_samples, PREDICTION_ERRORS
+from log_utils import get_logger
+
+MODEL_PATH = 'anxiety_model.joblib'
+LABEL_ENCODER_PATH = 'anxiety_label_encoder.joblib'
+COLUMN_INFO_PATH = 'anxiety_column_info.json'
+BUNDLE_PATH = bundle_path(MODEL_PATH)
+
+# 'bundle' serves from the memory-mapped file written by model_bundle.py
+# instead of the joblib pickles
+MODEL_FORMAT = os.getenv('MODEL_FORMAT', 'joblib')
+
+logger = get_logger(__name__)
+
+# Define critical symptoms and their weights
+CRITICAL_SYMPTOMS = {
+    'Panic_attacks': 3.0,
+    'Physical_symptoms': 2.5,
+    'Impending_doom': 2.5,
+    'Social_avoidance': 2.0,
+    'Nervousness': 2.0,
+    'Excessive_worry': 2.0,
+    'Trouble_relaxing': 1.5,
+    'Sleep_difficulty': 1.5,
+    'Lightheadedness': 1.5,
+    'Concentration_issues': 1.5
+}
+
+# The weights above compiled into arrays; a severe answer to either of these always escalates
+symptom_rules = AnxietySymptomRules(CRITICAL_SYMPTOMS, ['Panic_attacks', 'Physical_symptoms'])
 
 def load_model_components():
     """Load the trained model and preprocessing components."""
     try:
-        model = joblib.load('anxiety_model.joblib')
-        label_encoder = joblib.load('anxiety_label_encoder.joblib')
-        
-        with open('anxiety_column_info.json', 'r') as f:
-            column_info = json.load(f)
+        if MODEL_FORMAT == 'bundle':
+            bundle = registry.get(BUNDLE_PATH, load_bundle)
+            return bundle, bundle.label_encoder, bundle.column_info
+
+        model = registry.get(MODEL_PATH)
+        label_encoder = registry.get(LABEL_ENCODER_PATH)
+        column_info = registry.get(COLUMN_INFO_PATH, load_json)
         
         return model, label_encoder, column_info
     except Exception as e:
-        print(f"Error loading model components: {str(e)}")
+        logger.error("Error loading model components: %s", e)
         raise
 
-def preprocess_input(input_data):
+class AnxietySession:
+    """Preloaded model, label encoder and column metadata for anxiety inference.
+
+    Built once from the registry artifacts and shared by every request, so a
+    prediction borrows the already-loaded objects instead of loading them.
+    Scoring goes through the flattened copy of the forest, and the feature
+    importances are computed here once rather than per request.
+    """
+
+    def __init__(self, model, forest, label_encoder, column_info):
+        self.model = model
+        self.forest = forest
+        self.label_encoder = label_encoder
+        self.column_info = column_info
+        self.feature_names = list(column_info.keys())
+        self.feature_defaults = {
+            feature: info['mean'] for feature, info in column_info.items()
+        }
+        self.feature_importance = importance_records(self.feature_names, model.feature_importances_)
+        # Positions of the weighted symptoms among the model features, in rule order
+        self.symptom_columns = [self.feature_names.index(symptom) for symptom in CRITICAL_SYMPTOMS]
+
+    def cache_key(self, input_data):
+        """Canonical cache key: the feature row after missing answers get their defaults."""
+        return tuple(
+            input_data.get(feature, self.feature_defaults[feature])
+            for feature in self.feature_names
+        )
+
+    def is_built_from(self, model, forest, label_encoder, column_info):
+        """Check whether this session wraps exactly these artifact objects."""
+        return (self.model is model and
+                self.forest is forest and
+                self.label_encoder is label_encoder and
+                self.column_info is column_info)
+
+_session = None
+_importance_payload = None
+
+# Repeated answer patterns skip scoring and symptom analysis entirely
+prediction_cache = PredictionCache(int(os.getenv('PREDICTION_CACHE_SIZE', 4096)))
+registry.add_reload_listener(prediction_cache.clear, [MODEL_PATH, LABEL_ENCODER_PATH, COLUMN_INFO_PATH, BUNDLE_PATH])
+
+# Latency histograms for each step of a prediction, exported on /metrics
+stages = stage_timers('anxiety', ['preprocess', 'symptoms', 'predict_proba', 'batched'])
+prediction_errors = PREDICTION_ERRORS.labels('anxiety')
+
+def get_session():
+    """Return the shared inference session, rebuilding it if an artifact was reloaded."""
+    global _session
+    model, label_encoder, column_info = load_model_components()
+    forest = model.forest if MODEL_FORMAT == 'bundle' else registry.get(MODEL_PATH, load_flat_forest)
+    session = _session
+    if session is None or not session.is_built_from(model, forest, label_encoder, column_info):
+        session = AnxietySession(model, forest, label_encoder, column_info)
+        _session = session
+    return session
+
+def preprocess_input(input_data, session=None):
     """Preprocess the input data for prediction."""
     try:
-        model, label_encoder, column_info = load_model_components()
+        if session is None:
+            session = get_session()
         
         # Create a DataFrame with the input data
         df = pd.DataFrame([input_data])
         
         # Ensure all required features are present
-        required_features = list(column_info.keys())
-        for feature in required_features:
-            if feature not in df.columns:
-                print(f"Warning: Missing feature {feature}")
-                df[feature] = column_info[feature]['mean']
+        missing = [feature for feature in session.feature_names if feature not in df.columns]
+        for feature in missing:
+            df[feature] = session.feature_defaults[feature]
+        if missing:
+            logger.debug("Missing features filled with training means: %s", missing)
         
         # Reorder columns to match training data
-        df = df[required_features]
+        df = df[session.feature_names]
         
         return df
     except Exception as e:
-        print(f"Error in preprocessing: {str(e)}")
+        logger.error("Error in preprocessing: %s", e)
         raise
 
+def classify_symptoms(processed_data, session=None):
+    """Symptom levels and total weight for every row of preprocessed data."""
+    if session is None:
+        session = get_session()
+    symptoms = symptom_rules.classify(processed_data.to_numpy()[:, session.symptom_columns])
+    return symptoms, symptom_rules.total_weight(symptoms)
+
 def analyze_symptoms(processed_data):
     """Analyze the severity and patterns of anxiety symptoms."""
-    # Define critical symptoms and their weights
-    critical_symptoms = {
-        'Panic_attacks': 3.0,
-        'Physical_symptoms': 2.5,
-        'Impending_doom': 2.5,
-        'Social_avoidance': 2.0,
-        'Nervousness': 2.0,
-        'Excessive_worry': 2.0,
-        'Trouble_relaxing': 1.5,
-        'Sleep_difficulty': 1.5,
-        'Lightheadedness': 1.5,
-        'Concentration_issues': 1.5
+    symptoms, total_weight = classify_symptoms(processed_data)
+    return {
+        'critical_count': int(symptoms.severe_count[0]),
+        'moderate_count': int(symptoms.moderate_count[0]),
+        'mild_count': int(symptoms.mild_count[0]),
+        'total_weight': float(total_weight[0]),
+        'severe_symptoms': symptoms.names_at(symptoms.severe, 0),
+        'moderate_symptoms': symptoms.names_at(symptoms.moderate, 0),
+        'mild_symptoms': symptoms.names_at(symptoms.mild, 0)
     }
-    
-    # Initialize symptom analysis
-    symptom_analysis = {
-        'critical_count': 0,
-        'moderate_count': 0,
-        'mild_count': 0,
-        'total_weight': 0,
-        'severe_symptoms': [],
-        'moderate_symptoms': [],
-        'mild_symptoms': []
-    }
-    
-    # Analyze each symptom
-    for symptom, weight in critical_symptoms.items():
-        value = processed_data[symptom].iloc[0]
-        
-        # Severe symptoms (value >= 4)
-        if value >= 4:
-            symptom_analysis['critical_count'] += 1
-            symptom_analysis['total_weight'] += weight
-            symptom_analysis['severe_symptoms'].append(symptom)
-        
-        # Moderate symptoms (value == 3)
-        elif value == 3:
-            symptom_analysis['moderate_count'] += 1
-            symptom_analysis['total_weight'] += weight * 0.7
-            symptom_analysis['moderate_symptoms'].append(symptom)
-        
-        # Mild symptoms (value <= 2)
-        else:
-            symptom_analysis['mild_count'] += 1
-            symptom_analysis['total_weight'] += weight * 0.3
-            symptom_analysis['mild_symptoms'].append(symptom)
-    
-    return symptom_analysis
+
+def build_results(symptoms, total_weight, probability):
+    """Risk level and symptom summary for scored rows, shared by single and batch predictions."""
+    risk_levels, interpretation_index, confidences = symptom_rules.decide(
+        symptoms, total_weight, probability
+    )
+    return [
+        {
+            'prediction': int(risk_levels[i]),
+            'probability': float(confidences[i]),
+            'interpretation': symptom_rules.INTERPRETATIONS[interpretation_index[i]],
+            'symptom_summary': {
+                'severe': symptoms.names_at(symptoms.severe, i),
+                'moderate': symptoms.names_at(symptoms.moderate, i),
+                'mild': symptoms.names_at(symptoms.mild, i)
+            }
+        }
+        for i in range(len(risk_levels))
+    ]
 
 def predict_anxiety(input_data):
     """Make a prediction for anxiety with enhanced analysis."""
     try:
-        model, label_encoder, column_info = load_model_components()
-        
-        # Preprocess the input data
-        processed_data = preprocess_input(input_data)
-        
-        # Get symptom analysis
-        symptom_analysis = analyze_symptoms(processed_data)
-        
-        # Get model probability
-        probability = model.predict_proba(processed_data)[0]
-        
-        # Calculate risk level based on symptom analysis and model probability
-        risk_level = 0
-        interpretation = ""
-        confidence = 0.0
-        
-        # Critical case: Multiple severe symptoms or high scores in critical symptoms
-        if (symptom_analysis['critical_count'] >= 2 or 
-            'Panic_attacks' in symptom_analysis['severe_symptoms'] or
-            'Physical_symptoms' in symptom_analysis['severe_symptoms'] or
-            (symptom_analysis['critical_count'] == 1 and 
-             symptom_analysis['moderate_count'] >= 3)):
-            risk_level = 3
-            interpretation = "Extreme Anxiety"
-            confidence = max(probability[3], 0.9)
-        
-        # Severe case: High model probability with significant symptoms
-        elif probability[3] > 0.7 and symptom_analysis['total_weight'] > 8:
-            risk_level = 2
-            interpretation = "Severe Anxiety"
-            confidence = probability[3]
+        session = get_session()
+        cache_key = session.cache_key(input_data)
+        generation = prediction_cache.generation
+        cached = prediction_cache.get(cache_key)
+        if cached is not None:
+            return cached
         
-        # Moderate case: Mixed symptoms with moderate probability
-        elif (probability[2] > 0.6 and 
-              (symptom_analysis['moderate_count'] >= 2 or 
-               symptom_analysis['total_weight'] > 5)):
-            risk_level = 1
-            interpretation = "Moderate Anxiety"
-            confidence = probability[2]
-        
-        # Mild case: Few symptoms and low probability
-        elif probability[1] > 0.5:
-            risk_level = 0
-            interpretation = "Mild Anxiety"
-            confidence = probability[1]
-        
-        # No anxiety case: No significant symptoms
+        if batcher is not None and is_batchable(input_data):
+            # Scored together with other concurrent requests in one model call
+            with stages['batched'].time():
+                result = batcher.submit(input_data)
         else:
-            risk_level = 0
-            interpretation = "No Anxiety"
-            confidence = probability[0]
-        
-        # Add detailed symptom summary
-        symptom_summary = {
-            'severe': symptom_analysis['severe_symptoms'],
-            'moderate': symptom_analysis['moderate_symptoms'],
-            'mild': symptom_analysis['mild_symptoms']
-        }
-        
-        return {
-            'prediction': risk_level,
-            'probability': float(confidence),
-            'interpretation': interpretation,
-            'symptom_summary': symptom_summary
-        }
+            # Preprocess the input data
+            with stages['preprocess'].time():
+                processed_data = preprocess_input(input_data, session)
+            
+            # Get symptom analysis
+            with stages['symptoms'].time():
+                symptoms, total_weight = classify_symptoms(processed_data, session)
+            
+            # Get model probability
+            with stages['predict_proba'].time():
+                probability = session.forest.predict_proba(processed_data)
+            
+            # Risk level from the symptom analysis and model probability
+            result = build_results(symptoms, total_weight, probability)[0]
+        prediction_cache.put(cache_key, result, generation)
+        return result
+    except BatcherBusyError:
+        raise
     except Exception as e:
-        print(f"Error in prediction: {str(e)}")
+        prediction_errors.inc()
+        logger.error("Error in prediction: %s", e)
         return {
             'prediction': 0,
             'probability': 0.0,
@@ -168,18 +219,100 @@ def predict_anxiety(input_data):
             'symptom_summary': {'severe': [], 'moderate': [], 'mild': []}
         }
 
-def get_feature_importance():
-    """Get the importance of each feature."""
+def is_batchable(input_data):
+    """True if every answer is a number, so preprocess_batch treats it exactly like preprocess_input."""
+    return all(
+        isinstance(value, (int, float)) and value == value
+        for value in input_data.values()
+    )
+
+def preprocess_batch(inputs, session=None):
+    """Build one feature matrix for a list of answer dicts."""
     try:
-        model, _, column_info = load_model_components()
+        if session is None:
+            session = get_session()
         
-        importance = model.feature_importances_
-        feature_importance = pd.DataFrame({
-            'feature': list(column_info.keys()),
-            'importance': importance
-        })
+        # Missing answers fall back to the training mean, as in preprocess_input
+        df = pd.DataFrame(inputs).reindex(columns=session.feature_names)
+        return df.fillna(session.feature_defaults).astype(float)
+    except Exception as e:
+        logger.error("Error in batch preprocessing: %s", e)
+        raise
+
+def analyze_symptoms_batch(processed_data):
+    """Classify every weighted symptom for a whole batch at once.
+
+    Returns boolean (severe, moderate, mild) masks of shape
+    (n_rows, n_symptoms) in CRITICAL_SYMPTOMS order, and the total weight
+    of each row.
+    """
+    symptoms, total_weight = classify_symptoms(processed_data)
+    return symptoms.severe, symptoms.moderate, symptoms.mild, total_weight
+
+def predict_anxiety_batch(inputs):
+    """Make anxiety predictions for a list of answer dicts in one model call."""
+    try:
+        if not inputs:
+            return []
+        
+        session = get_session()
+        with stages['preprocess'].time():
+            processed_data = preprocess_batch(inputs, session)
+        scorer = session.forest if len(inputs) <= MAX_FLAT_BATCH else session.model
+        with stages['predict_proba'].time():
+            probability = scorer.predict_proba(processed_data)
         
-        return feature_importance.sort_values('importance', ascending=False)
+        with stages['symptoms'].time():
+            symptoms, total_weight = classify_symptoms(processed_data, session)
+        return build_results(symptoms, total_weight, probability)
     except Exception as e:
-        print(f"Error getting feature importance: {str(e)}")
-        raise 
\ No newline at end of file
+        prediction_errors.inc()
+        logger.error("Error in batch prediction: %s", e)
+        raise
+
+def predict_anxiety_numeric_batch(inputs):
+    """predict_anxiety_batch for answer dicts that all pass is_batchable.
+
+    Every answer is already a number, so the feature matrix is filled
+    directly instead of going through pandas' reindex and fillna.
+    """
+    session = get_session()
+    with stages['preprocess'].time():
+        values = np.array([
+            [row.get(feature, session.feature_defaults[feature]) for feature in session.feature_names]
+            for row in inputs
+        ], dtype=float)
+        processed_data = pd.DataFrame(values, columns=session.feature_names)
+    scorer = session.forest if len(inputs) <= MAX_FLAT_BATCH else session.model
+    with stages['predict_proba'].time():
+        probability = scorer.predict_proba(processed_data)
+
+    with stages['symptoms'].time():
+        symptoms, total_weight = classify_symptoms(processed_data, session)
+    return build_results(symptoms, total_weight, probability)
+
+# Optional coalescing of concurrent single predictions into one model call
+batcher = batcher_from_env(predict_anxiety_numeric_batch, 'anxiety-batcher')
+
+metrics_registry.collector('anxiety_predictions', lambda: (
+    cache_samples('anxiety', prediction_cache) + batcher_samples('anxiety', batcher)
+))
+
+def get_feature_importance():
+    """Get the importance of each feature."""
+    try:
+        return pd.DataFrame(get_session().feature_importance)
+    except Exception as e:
+        logger.error("Error getting feature importance: %s", e)
+        raise
+
+def get_feature_importance_payload():
+    """Return the prebuilt feature-importance JSON, rebuilt only when the model is reloaded."""
+    global _importance_payload
+    session = get_session()
+    payload = _importance_payload
+    if payload is None or payload.data is not session.feature_importance:
+        payload = JsonPayload(session.feature_importance,
+                              os.path.getmtime(BUNDLE_PATH if MODEL_FORMAT == 'bundle' else MODEL_PATH))
+        _importance_payload = payload
+    return payload
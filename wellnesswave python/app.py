@@ -1,110 +1,226 @@
 import os
-import datetime
+import threading
+from functools import partial
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify
+from flask import Flask, Blueprint, current_app, request, jsonify
 from flask_cors import CORS
-from pymongo import MongoClient
-import numpy as np
+from pymongo.errors import PyMongoError
+from assessment_writer import start_writer, WriterBusyError
+from db import mongo_manager_from_env
+from memory_store import UnsupportedByMemoryStore
+from assessments import (CORS_ORIGINS, build_assessment, assessment_response,
+                         calculate_assessment_result, get_anxiety_recommendations)
+from assessment_queries import QueryError, ensure_indexes, list_assessments, aggregate_assessments
+from assessment_rollups import ROLLUP_COLLECTION, ensure_rollup_indexes, record_rollups, assessment_stats
+from log_utils import get_logger
+from metrics import (registry as metrics_registry, instrument_blueprint, metrics_blueprint, stage_timers,
+                     store_samples, writer_samples)
 
-# Load environment variables and initialize Flask app
+# Load environment variables
 load_dotenv('db.env')
-app = Flask(__name__)
-
-# Configure CORS
-CORS(app, resources={r"/*": {
-    "origins": ["http://localhost:5173", "http://127.0.0.1:5173"],
-    "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    "allow_headers": ["Content-Type"],
-    "supports_credentials": True
-}})
-
-# Database connection
-try:
-    client = MongoClient(os.getenv('MONGO_URI', 'mongodb://localhost:27017/krishdb'))
-    db = client.get_database()
-    assessments_collection = db.assessments
-    print("✅ MongoDB Connected successfully")
-except Exception as e:
-    print(f"❌ MongoDB Connection failed: {str(e)}")
-    assessments_collection = None
-
-@app.route('/api/assessment', methods=['POST'])
+
+logger = get_logger(__name__)
+
+# The scoring helpers moved to assessments.py; they are still exported from
+# here for code that imports them from app
+__all__ = ['app', 'api', 'create_app', 'calculate_assessment_result', 'get_anxiety_recommendations']
+
+# Optional write-behind mode: assessments are queued and written in batches
+# by a background thread instead of one insert_one per request
+WRITE_BEHIND = os.getenv('ASSESSMENT_WRITE_BEHIND', '0') == '1'
+
+# Keep the per-day rollup buckets behind /api/stats up to date. With
+# write-behind they are updated once per flushed batch, so they default to
+# on; otherwise each insert pays a second round trip and they default to
+# off (rebuild with python assessment_rollups.py after turning them on)
+ROLLUPS = os.getenv('ASSESSMENT_ROLLUPS', '1' if WRITE_BEHIND else '0') == '1'
+
+api = Blueprint('api', __name__)
+instrument_blueprint(api, 'assessment')
+_writer_lock = threading.Lock()
+
+# Latency of each step of an assessment submission, exported on /metrics
+stages = stage_timers('assessment', ['parse', 'enqueue', 'mongo_insert', 'rollup', 'serialize'])
+
+def create_app(mongo=None):
+    """Build the Flask app; the Mongo client itself is created lazily per process."""
+    app = Flask(__name__)
+
+    # Configure CORS
+    CORS(app, resources={r"/api/*": {
+        "origins": CORS_ORIGINS,
+        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        "allow_headers": ["Content-Type"],
+        "supports_credentials": True
+    }})
+
+    app.extensions['mongo'] = mongo or mongo_manager_from_env()
+    app.extensions['mongo'].on_connect(ensure_indexes)
+    app.extensions['mongo'].on_connect(ensure_rollup_indexes)
+    app.extensions['assessment_writer'] = None
+    app.register_blueprint(api)
+    app.register_blueprint(metrics_blueprint())
+    metrics_registry.collector('assessment_store', partial(store_metrics, app))
+    return app
+
+def store_metrics(app):
+    """Connection-pool and write-behind queue samples for this app, read when /metrics is scraped."""
+    state = app.extensions['assessment_writer']
+    writer = state[1] if state is not None and state[0] == os.getpid() else None
+    return store_samples(app.extensions['mongo']) + writer_samples(writer)
+
+def get_assessments_collection():
+    return current_app.extensions['mongo'].collection('assessments')
+
+def get_rollups_collection():
+    return current_app.extensions['mongo'].collection(ROLLUP_COLLECTION)
+
+def get_assessment_writer():
+    """Return this process's write-behind writer, or None when the mode is off."""
+    if not WRITE_BEHIND:
+        return None
+    state = current_app.extensions['assessment_writer']
+    if state is None or state[0] != os.getpid():
+        with _writer_lock:
+            state = current_app.extensions['assessment_writer']
+            if state is None or state[0] != os.getpid():
+                writer = start_writer(
+                    get_assessments_collection(),
+                    on_flush=partial(record_rollups, get_rollups_collection()) if ROLLUPS else None,
+                    max_queue=int(os.getenv('ASSESSMENT_QUEUE_SIZE', 10000)),
+                    batch_size=int(os.getenv('ASSESSMENT_BATCH_SIZE', 500)),
+                    flush_interval=float(os.getenv('ASSESSMENT_FLUSH_INTERVAL', 0.05))
+                )
+                state = (os.getpid(), writer)
+                current_app.extensions['assessment_writer'] = state
+    return state[1]
+
+@api.route('/api/assessment', methods=['POST'])
 def submit_assessment():
     try:
-        data = request.get_json()
-        
-        if 'answers' not in data or not isinstance(data['answers'], list):
+        with stages['parse'].time():
+            assessment = build_assessment(request.get_json())
+        if assessment is None:
             return jsonify({"status": "error", "message": "Invalid assessment data"}), 400
+        
+        assessment_writer = get_assessment_writer()
+        if assessment_writer is not None:
+            with stages['enqueue'].time():
+                inserted_id = assessment_writer.submit(assessment)
+        else:
+            with stages['mongo_insert'].time():
+                inserted_id = get_assessments_collection().insert_one(assessment).inserted_id
+            if ROLLUPS:
+                with stages['rollup'].time():
+                    record_rollups(get_rollups_collection(), [assessment])
 
-        score = sum(data['answers'])
-        result = calculate_assessment_result("anxiety", score)
+        with stages['serialize'].time():
+            return jsonify(assessment_response(assessment, inserted_id)), 201
 
-        assessment = {
-            "type": "anxiety",
-            "answers": data["answers"],
-            "score": score,
-            "result": result,
-            "created_at": datetime.datetime.utcnow()
-        }
-        
-        result = assessments_collection.insert_one(assessment)
+    except WriterBusyError:
+        return jsonify({
+            "status": "error",
+            "message": "Server is busy, please retry"
+        }), 503
 
+    except PyMongoError as e:
+        logger.exception("Assessment database error: %s", e)
         return jsonify({
-            "status": "success",
-            "message": "Assessment submitted successfully",
-            "data": {
-                "id": str(result.inserted_id),
-                "score": score,
-                "result": assessment["result"],
-                "recommendations": get_anxiety_recommendations(score)
-            }
-        }), 201
+            "status": "error",
+            "message": "Database unavailable"
+        }), 503
 
     except Exception as e:
-        print(f"Assessment error: {str(e)}")
+        logger.exception("Assessment error: %s", e)
         return jsonify({
             "status": "error",
             "message": "Error processing assessment"
         }), 500
 
-def calculate_assessment_result(assessment_type, score):
-    if score <= 4: return "Minimal"
-    elif score <= 9: return "Mild"
-    elif score <= 14: return "Moderate"
-    else: return "Severe"
-
-def get_anxiety_recommendations(score):
-    if score <= 4:
-        return [
-            "Continue monitoring your mental health",
-            "Practice regular self-care",
-            "Maintain healthy lifestyle habits"
-        ]
-    elif score <= 9:
-        return [
-            "Consider talking to a trusted friend or family member",
-            "Practice relaxation techniques",
-            "Maintain a regular sleep schedule"
-        ]
-    elif score <= 14:
-        return [
-            "Consider consulting a mental health professional",
-            "Practice mindfulness and meditation",
-            "Establish a regular exercise routine"
-        ]
-    else:
-        return [
-            "Strongly recommend seeking professional help",
-            "Contact a mental health Crisis hotline if needed",
-            "Don't hesitate to reach out to support systems"
-        ]
-
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/assessments', methods=['GET'])
+def get_assessments():
+    try:
+        return jsonify(list_assessments(get_assessments_collection(), request.args)), 200
+
+    except QueryError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    except UnsupportedByMemoryStore as e:
+        return jsonify({"status": "error", "message": str(e)}), 501
+
+    except PyMongoError as e:
+        logger.exception("Assessment query error: %s", e)
+        return jsonify({
+            "status": "error",
+            "message": "Database unavailable"
+        }), 503
+
+    except Exception as e:
+        logger.exception("Error listing assessments: %s", e)
+        return jsonify({
+            "status": "error",
+            "message": "Error listing assessments"
+        }), 500
+
+@api.route('/api/assessments/aggregate', methods=['GET'])
+def get_assessment_aggregates():
+    try:
+        return jsonify(aggregate_assessments(get_assessments_collection(), request.args)), 200
+
+    except QueryError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    except UnsupportedByMemoryStore as e:
+        return jsonify({"status": "error", "message": str(e)}), 501
+
+    except PyMongoError as e:
+        logger.exception("Assessment aggregate error: %s", e)
+        return jsonify({
+            "status": "error",
+            "message": "Database unavailable"
+        }), 503
+
+    except Exception as e:
+        logger.exception("Error aggregating assessments: %s", e)
+        return jsonify({
+            "status": "error",
+            "message": "Error aggregating assessments"
+        }), 500
+
+@api.route('/api/stats', methods=['GET'])
+def get_stats():
+    try:
+        return jsonify(assessment_stats(get_rollups_collection(), request.args)), 200
+
+    except QueryError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    except UnsupportedByMemoryStore as e:
+        return jsonify({"status": "error", "message": str(e)}), 501
+
+    except PyMongoError as e:
+        logger.exception("Assessment stats error: %s", e)
+        return jsonify({
+            "status": "error",
+            "message": "Database unavailable"
+        }), 503
+
+    except Exception as e:
+        logger.exception("Error reading assessment stats: %s", e)
+        return jsonify({
+            "status": "error",
+            "message": "Error reading assessment stats"
+        }), 500
+
+@api.route('/api/health', methods=['GET'])
 def health():
     return jsonify({
         "status": "success",
-        "message": "API is healthy"
+        "message": "API is healthy",
+        "database": current_app.extensions['mongo'].stats()
     }), 200
 
+app = create_app()
+
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=5000)
@@ -0,0 +1,186 @@
+import json
+import base64
+import binascii
+import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Fields a client may ask for with ?fields=; _id and created_at are always
+# returned because the next page's cursor is built from them
+LIST_FIELDS = ('type', 'answers', 'score', 'result', 'created_at')
+DEFAULT_LIST_FIELDS = ('type', 'score', 'result', 'created_at')
+
+# Dimensions /api/assessments/aggregate can group by
+GROUP_KEYS = {
+    'result': '$result',
+    'type': '$type',
+    'score': '$score',
+    'day': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$created_at'}}
+}
+
+# Equality filters come first and the (created_at, _id) sort last, so every
+# list query reads one index range in order and stops after limit+1 entries
+# instead of sorting the matching documents in memory
+ASSESSMENT_INDEXES = [
+    ([('created_at', DESCENDING), ('_id', DESCENDING)], 'created_at_id'),
+    ([('type', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)], 'type_created_at_id'),
+    ([('type', ASCENDING), ('result', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)],
+     'type_result_created_at_id')
+]
+
+class QueryError(ValueError):
+    """Invalid list or aggregate parameters; the message is safe to return to the client."""
+
+def ensure_indexes(mongo):
+    """on_connect callback that creates the assessment indexes.
+
+    create_index is a no-op for an index that already exists, so it is safe
+    to run in every process. A failure is logged rather than raised so an
+    unreachable server does not turn into an error on the first request.
+    """
+    collection = mongo.collection('assessments')
+    try:
+        for keys, name in ASSESSMENT_INDEXES:
+            collection.create_index(keys, name=name)
+    except PyMongoError as e:
+        logger.warning("Could not create assessment indexes: %s", e)
+
+def encode_cursor(document):
+    """Opaque cursor pointing just after document in (created_at, _id) order."""
+    position = {'t': document['created_at'].isoformat(), 'id': str(document['_id'])}
+    return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """(created_at, _id) from a cursor made by encode_cursor."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.datetime.fromisoformat(position['t']), ObjectId(position['id'])
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError, InvalidId):
+        raise QueryError("Invalid cursor")
+
+def parse_date(value, name):
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise QueryError(f"Invalid {name} date, expected ISO 8601")
+
+def build_filter(args):
+    """Mongo filter for the type/result/since/until query parameters."""
+    query = {}
+    for field in ('type', 'result'):
+        if args.get(field):
+            query[field] = args[field]
+    created_at = {}
+    if args.get('since'):
+        created_at['$gte'] = parse_date(args['since'], 'since')
+    if args.get('until'):
+        created_at['$lt'] = parse_date(args['until'], 'until')
+    if created_at:
+        query['created_at'] = created_at
+    return query
+
+def parse_limit(value):
+    if value is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise QueryError("limit must be an integer")
+    if limit < 1:
+        raise QueryError("limit must be positive")
+    return min(limit, MAX_PAGE_SIZE)
+
+def parse_projection(value):
+    fields = DEFAULT_LIST_FIELDS if not value else [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in LIST_FIELDS]
+    if unknown:
+        raise QueryError(f"Unknown fields: {', '.join(unknown)}")
+    projection = {field: 1 for field in fields}
+    projection['created_at'] = 1
+    return projection
+
+def list_query(args):
+    """(filter, projection, limit) for a GET /api/assessments request."""
+    query = build_filter(args)
+    if args.get('cursor'):
+        created_at, _id = decode_cursor(args['cursor'])
+        after_cursor = {'$or': [
+            {'created_at': {'$lt': created_at}},
+            {'created_at': created_at, '_id': {'$lt': _id}}
+        ]}
+        query = {'$and': [query, after_cursor]} if query else after_cursor
+    return query, parse_projection(args.get('fields')), parse_limit(args.get('limit'))
+
+def serialize_assessment(document):
+    document = dict(document)
+    document['id'] = str(document.pop('_id'))
+    if isinstance(document.get('created_at'), datetime.datetime):
+        document['created_at'] = document['created_at'].isoformat()
+    return document
+
+def page_response(documents, limit):
+    """Response body for one page; documents holds up to limit+1 results."""
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+    return {
+        'status': 'success',
+        'data': [serialize_assessment(document) for document in documents],
+        'next_cursor': encode_cursor(documents[-1]) if has_more else None
+    }
+
+def list_assessments(collection, args):
+    """One page of assessments, newest first."""
+    query, projection, limit = list_query(args)
+    documents = list(
+        collection.find(query, projection)
+        .sort([('created_at', DESCENDING), ('_id', DESCENDING)])
+        .limit(limit + 1)
+    )
+    return page_response(documents, limit)
+
+def aggregate_pipeline(args):
+    """$match/$group pipeline for a GET /api/assessments/aggregate request."""
+    group_by = args.get('group_by', 'result')
+    if group_by not in GROUP_KEYS:
+        raise QueryError(f"group_by must be one of: {', '.join(GROUP_KEYS)}")
+    return [
+        {'$match': build_filter(args)},
+        {'$group': {
+            '_id': GROUP_KEYS[group_by],
+            'count': {'$sum': 1},
+            'avg_score': {'$avg': '$score'},
+            'min_score': {'$min': '$score'},
+            'max_score': {'$max': '$score'}
+        }},
+        {'$sort': {'_id': 1}}
+    ], group_by
+
+def aggregate_response(groups, group_by):
+    return {
+        'status': 'success',
+        'group_by': group_by,
+        'data': [
+            {
+                group_by: group['_id'],
+                'count': group['count'],
+                'avg_score': group['avg_score'],
+                'min_score': group['min_score'],
+                'max_score': group['max_score']
+            }
+            for group in groups
+        ]
+    }
+
+def aggregate_assessments(collection, args):
+    """Counts and score statistics grouped by result, type, score or day."""
+    pipeline, group_by = aggregate_pipeline(args)
+    return aggregate_response(collection.aggregate(pipeline), group_by)
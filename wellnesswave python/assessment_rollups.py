@@ -0,0 +1,268 @@
+import time
+import argparse
+import datetime
+from collections import defaultdict
+from dotenv import load_dotenv
+from pymongo import ASCENDING, UpdateOne, ReplaceOne
+from pymongo.errors import PyMongoError
+from assessment_queries import QueryError, parse_date
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+ROLLUP_COLLECTION = 'assessment_rollups'
+ROLLUP_INDEXES = [
+    ([('type', ASCENDING), ('day', ASCENDING)], 'type_day')
+]
+
+# Longest range /api/stats will sum; one bucket is read per type per day
+DEFAULT_STATS_DAYS = 30
+MAX_STATS_DAYS = 366
+
+def score_key(score):
+    """Field name for a score in a bucket's scores map; never contains '.', which Mongo reads as a path."""
+    score = float(score)
+    if score.is_integer():
+        return str(int(score))
+    return repr(score).replace('.', '_')
+
+def score_from_key(key):
+    """The score a score_key stands for, as shown in /api/stats."""
+    return key.replace('_', '.')
+
+class Bucket:
+    """Counts for one (type, day) rollup document, built up in memory."""
+
+    def __init__(self, assessment_type, day):
+        self.type = assessment_type
+        self.day = day
+        self.count = 0
+        self.score_sum = 0
+        self.min_score = None
+        self.max_score = None
+        self.results = defaultdict(int)
+        self.scores = defaultdict(int)
+
+    @property
+    def id(self):
+        return f"{self.type}:{self.day:%Y-%m-%d}"
+
+    def add(self, score, result, n=1):
+        self.count += n
+        self.score_sum += score * n
+        self.min_score = score if self.min_score is None else min(self.min_score, score)
+        self.max_score = score if self.max_score is None else max(self.max_score, score)
+        self.results[result] += n
+        self.scores[score_key(score)] += n
+
+    def increment(self):
+        """Update that adds this bucket's counts to the stored document, for an upsert on _id."""
+        inc = {'count': self.count, 'score_sum': self.score_sum}
+        inc.update({f'results.{result}': n for result, n in self.results.items()})
+        inc.update({f'scores.{score}': n for score, n in self.scores.items()})
+        return {
+            '$inc': inc,
+            '$min': {'min_score': self.min_score},
+            '$max': {'max_score': self.max_score},
+            '$setOnInsert': {'type': self.type, 'day': self.day}
+        }
+
+    def document(self):
+        return {
+            '_id': self.id,
+            'type': self.type,
+            'day': self.day,
+            'count': self.count,
+            'score_sum': self.score_sum,
+            'min_score': self.min_score,
+            'max_score': self.max_score,
+            'results': dict(self.results),
+            'scores': dict(self.scores)
+        }
+
+def day_of(created_at):
+    return datetime.datetime(created_at.year, created_at.month, created_at.day)
+
+def rollup_buckets(assessments):
+    """The (type, day) buckets touched by assessments, with their counts."""
+    buckets = {}
+    for assessment in assessments:
+        key = (assessment['type'], day_of(assessment['created_at']))
+        if key not in buckets:
+            buckets[key] = Bucket(*key)
+        buckets[key].add(assessment['score'], assessment['result'])
+    return list(buckets.values())
+
+def increment_operations(buckets):
+    return [UpdateOne({'_id': bucket.id}, bucket.increment(), upsert=True) for bucket in buckets]
+
+def record_rollups(collection, assessments):
+    """Add stored assessments to their rollup buckets.
+
+    Called after the assessments themselves are written. A failure is logged
+    and not raised, since the assessments are already saved; the affected
+    days can be rebuilt with the backfill.
+    """
+    buckets = rollup_buckets(assessments)
+    try:
+        if len(buckets) == 1:
+            collection.update_one({'_id': buckets[0].id}, buckets[0].increment(), upsert=True)
+        elif buckets:
+            collection.bulk_write(increment_operations(buckets), ordered=False)
+    except PyMongoError as e:
+        logger.error("Rollup update failed for %d assessments: %s", len(assessments), e)
+
+async def record_rollups_async(collection, assessments):
+    """record_rollups for pymongo's async collections."""
+    buckets = rollup_buckets(assessments)
+    try:
+        if len(buckets) == 1:
+            await collection.update_one({'_id': buckets[0].id}, buckets[0].increment(), upsert=True)
+        elif buckets:
+            await collection.bulk_write(increment_operations(buckets), ordered=False)
+    except PyMongoError as e:
+        logger.error("Rollup update failed for %d assessments: %s", len(assessments), e)
+
+def ensure_rollup_indexes(mongo):
+    """on_connect callback that creates the rollup indexes."""
+    collection = mongo.collection(ROLLUP_COLLECTION)
+    try:
+        for keys, name in ROLLUP_INDEXES:
+            collection.create_index(keys, name=name)
+    except PyMongoError as e:
+        logger.warning("Could not create rollup indexes: %s", e)
+
+def stats_range(args):
+    """(first_day, end_day) for a /api/stats request; end_day is exclusive."""
+    today = day_of(datetime.datetime.utcnow())
+    end = day_of(parse_date(args['until'], 'until')) if args.get('until') else today + datetime.timedelta(days=1)
+    if args.get('since'):
+        start = day_of(parse_date(args['since'], 'since'))
+    else:
+        start = end - datetime.timedelta(days=DEFAULT_STATS_DAYS)
+    if start >= end:
+        raise QueryError("since must be before until")
+    if (end - start).days > MAX_STATS_DAYS:
+        raise QueryError(f"Date range is limited to {MAX_STATS_DAYS} days")
+    return start, end
+
+def stats_query(args):
+    start, end = stats_range(args)
+    query = {'day': {'$gte': start, '$lt': end}}
+    if args.get('type'):
+        query['type'] = args['type']
+    return query, start, end
+
+def stats_response(buckets, start, end):
+    """Totals, result counts and score distribution summed over the buckets."""
+    count = 0
+    score_sum = 0
+    min_score = None
+    max_score = None
+    results = defaultdict(int)
+    scores = defaultdict(int)
+    days = defaultdict(int)
+    for bucket in buckets:
+        count += bucket['count']
+        score_sum += bucket['score_sum']
+        if min_score is None or bucket['min_score'] < min_score:
+            min_score = bucket['min_score']
+        if max_score is None or bucket['max_score'] > max_score:
+            max_score = bucket['max_score']
+        for result, n in bucket.get('results', {}).items():
+            results[result] += n
+        for key, n in bucket.get('scores', {}).items():
+            scores[score_from_key(key)] += n
+        days[f"{bucket['day']:%Y-%m-%d}"] += bucket['count']
+    return {
+        'status': 'success',
+        'since': start.date().isoformat(),
+        'until': end.date().isoformat(),
+        'data': {
+            'count': count,
+            'avg_score': score_sum / count if count else None,
+            'min_score': min_score,
+            'max_score': max_score,
+            'by_result': dict(results),
+            'score_distribution': dict(sorted(scores.items(), key=lambda item: float(item[0]))),
+            'by_day': dict(sorted(days.items()))
+        }
+    }
+
+def assessment_stats(collection, args):
+    """Dashboard statistics read from the rollup buckets.
+
+    The cost depends on the number of days in the range, not on how many
+    assessments were submitted in it.
+    """
+    query, start, end = stats_query(args)
+    return stats_response(collection.find(query), start, end)
+
+def backfill_pipeline(since=None, until=None):
+    created_at = {}
+    if since is not None:
+        created_at['$gte'] = since
+    if until is not None:
+        created_at['$lt'] = until
+    return [
+        {'$match': {'created_at': created_at} if created_at else {}},
+        {'$group': {
+            '_id': {
+                'type': '$type',
+                'day': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$created_at'}},
+                'result': '$result',
+                'score': '$score'
+            },
+            'n': {'$sum': 1}
+        }}
+    ]
+
+def backfill_rollups(db, since=None, until=None, batch_size=500):
+    """Rebuild the rollup buckets for whole days from the assessments collection.
+
+    Buckets are replaced, not incremented, so the job can be rerun safely.
+    since and until should fall on day boundaries, otherwise the first and
+    last buckets only count part of their day. Increments that land on a
+    bucket between the aggregation and its replacement are lost, so run it
+    before enabling rollups on live traffic or over days that are complete.
+    """
+    buckets = {}
+    for group in db.assessments.aggregate(backfill_pipeline(since, until), allowDiskUse=True):
+        key = group['_id']
+        day = datetime.datetime.strptime(key['day'], '%Y-%m-%d')
+        if (key['type'], day) not in buckets:
+            buckets[(key['type'], day)] = Bucket(key['type'], day)
+        buckets[(key['type'], day)].add(key['score'], key['result'], group['n'])
+
+    operations = [
+        ReplaceOne({'_id': bucket.id}, bucket.document(), upsert=True)
+        for bucket in buckets.values()
+    ]
+    for i in range(0, len(operations), batch_size):
+        db[ROLLUP_COLLECTION].bulk_write(operations[i:i + batch_size], ordered=False)
+    return len(buckets), sum(bucket.count for bucket in buckets.values())
+
+def run_backfill(since=None, until=None):
+    from db import MongoManager
+    mongo = MongoManager()
+    try:
+        start = time.perf_counter()
+        bucket_count, assessment_count = backfill_rollups(
+            mongo.db,
+            since=day_of(parse_date(since, 'since')) if since else None,
+            until=day_of(parse_date(until, 'until')) if until else None
+        )
+        print(f"✅ Rebuilt {bucket_count} rollup buckets from {assessment_count} assessments "
+              f"in {time.perf_counter() - start:.1f}s")
+    except Exception as e:
+        print(f"❌ Rollup backfill failed: {str(e)}")
+    finally:
+        mongo.close()
+
+if __name__ == "__main__":
+    load_dotenv('db.env')
+    parser = argparse.ArgumentParser(description="Rebuild assessment rollup buckets from stored assessments")
+    parser.add_argument('--since', help="first day to rebuild (ISO date), default the earliest assessment")
+    parser.add_argument('--until', help="day to stop before (ISO date), default no limit")
+    args = parser.parse_args()
+    run_backfill(since=args.since, until=args.until)
@@ -0,0 +1,147 @@
+import time
+import queue
+import atexit
+import threading
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, ConnectionFailure
+from metrics import STAGE_SECONDS
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Time of each insert_many, exported on /metrics
+insert_batch_seconds = STAGE_SECONDS.labels('assessment', 'mongo_insert_batch')
+
+# Mongo's error code for a duplicate _id, which a retried batch can hit
+DUPLICATE_KEY_ERROR = 11000
+
+class WriterBusyError(Exception):
+    """Raised when the write-behind queue stays full for longer than put_timeout."""
+
+class WriteBehindWriter:
+    """Buffer documents in memory and write them with insert_many off the request thread.
+
+    submit() assigns a client-side ObjectId and returns immediately, so the
+    caller can respond with the id before the document reaches Mongo. A
+    background thread flushes a batch once batch_size documents are waiting
+    or flush_interval seconds have passed since the first one arrived. When
+    the queue is full, submit() waits up to put_timeout and then raises
+    WriterBusyError. close() flushes everything still queued. on_flush, if
+    given, is called with the documents of each batch that were stored.
+    """
+
+    def __init__(self, collection, max_queue=10000, batch_size=500,
+                 flush_interval=0.05, put_timeout=1.0, max_retries=5, on_flush=None):
+        self.collection = collection
+        self.on_flush = on_flush
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.written = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='assessment-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, document):
+        """Queue a document for insertion and return its _id."""
+        if self._stopping.is_set():
+            raise WriterBusyError("Writer is shutting down")
+        document.setdefault('_id', ObjectId())
+        try:
+            self._queue.put(document, timeout=self.put_timeout)
+        except queue.Full:
+            raise WriterBusyError("Assessment write queue is full")
+        return document['_id']
+
+    def queue_depth(self):
+        """Number of documents waiting to be written."""
+        return self._queue.qsize()
+
+    def close(self, timeout=30):
+        """Stop accepting documents and flush everything still queued."""
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error("Assessment writer did not drain within %ss; %d documents unwritten",
+                         timeout, self._queue.qsize())
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self._flush(batch)
+            except Exception:
+                # Never let one bad batch stop the writer; later submissions still need it
+                self.failed += len(batch)
+                logger.exception("Dropped %d assessments after an unexpected error: ids %s",
+                                 len(batch), [str(doc.get('_id')) for doc in batch])
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0 and not self._stopping.is_set():
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch):
+        for attempt in range(self.max_retries):
+            try:
+                with insert_batch_seconds.time():
+                    self.collection.insert_many(batch, ordered=False)
+                self.written += len(batch)
+                self._flushed(batch)
+                return
+            except BulkWriteError as e:
+                # Documents already stored by an earlier attempt count as written
+                errors = [error for error in e.details.get('writeErrors', [])
+                          if error.get('code') != DUPLICATE_KEY_ERROR]
+                self.written += len(batch) - len(errors)
+                self.failed += len(errors)
+                for error in errors:
+                    logger.error("Assessment insert failed: %s", error.get('errmsg'))
+                failed = {error.get('index') for error in errors}
+                self._flushed([doc for i, doc in enumerate(batch) if i not in failed])
+                return
+            except ConnectionFailure as e:
+                logger.warning("Assessment batch insert failed (attempt %d): %s", attempt + 1, e)
+                time.sleep(min(2 ** attempt * 0.1, 5))
+            except Exception:
+                # Not retryable (OperationFailure, WriteConcernError, an unencodable document)
+                self.failed += len(batch)
+                logger.exception("Dropped %d assessments: ids %s",
+                                 len(batch), [str(doc['_id']) for doc in batch])
+                return
+        self.failed += len(batch)
+        logger.error("Dropped %d assessments after %d attempts: ids %s",
+                     len(batch), self.max_retries, [str(doc['_id']) for doc in batch])
+
+    def _flushed(self, documents):
+        if self.on_flush is None or not documents:
+            return
+        try:
+            self.on_flush(documents)
+        except Exception as e:
+            logger.error("Assessment on_flush callback failed: %s", e)
+
+def start_writer(collection, **options):
+    """Create a writer that is flushed when the process exits."""
+    writer = WriteBehindWriter(collection, **options)
+    atexit.register(writer.close)
+    return writer
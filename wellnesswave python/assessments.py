@@ -0,0 +1,67 @@
+import datetime
+from bson import ObjectId
+
+# Frontend origins allowed to call the assessment API
+CORS_ORIGINS = ["http://localhost:5173", "http://127.0.0.1:5173"]
+
+def build_assessment(data):
+    """Score a submission and build the document to store; None if the answers are invalid."""
+    if 'answers' not in data or not isinstance(data['answers'], list):
+        return None
+
+    score = sum(data['answers'])
+    result = calculate_assessment_result("anxiety", score)
+
+    return {
+        "_id": ObjectId(),
+        "type": "anxiety",
+        "answers": data["answers"],
+        "score": score,
+        "result": result,
+        "created_at": datetime.datetime.utcnow()
+    }
+
+def assessment_response(assessment, inserted_id):
+    """Response body for a stored assessment."""
+    return {
+        "status": "success",
+        "message": "Assessment submitted successfully",
+        "data": {
+            "id": str(inserted_id),
+            "score": assessment["score"],
+            "result": assessment["result"],
+            "recommendations": get_anxiety_recommendations(assessment["score"])
+        }
+    }
+
+def calculate_assessment_result(assessment_type, score):
+    if score <= 4: return "Minimal"
+    elif score <= 9: return "Mild"
+    elif score <= 14: return "Moderate"
+    else: return "Severe"
+
+def get_anxiety_recommendations(score):
+    if score <= 4:
+        return [
+            "Continue monitoring your mental health",
+            "Practice regular self-care",
+            "Maintain healthy lifestyle habits"
+        ]
+    elif score <= 9:
+        return [
+            "Consider talking to a trusted friend or family member",
+            "Practice relaxation techniques",
+            "Maintain a regular sleep schedule"
+        ]
+    elif score <= 14:
+        return [
+            "Consider consulting a mental health professional",
+            "Practice mindfulness and meditation",
+            "Establish a regular exercise routine"
+        ]
+    else:
+        return [
+            "Strongly recommend seeking professional help",
+            "Contact a mental health Crisis hotline if needed",
+            "Don't hesitate to reach out to support systems"
+        ]
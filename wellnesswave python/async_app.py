@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import inspect
+from urllib.parse import parse_qsl
+from dotenv import load_dotenv
+from pymongo import DESCENDING
+from pymongo.errors import PyMongoError
+from assessments import CORS_ORIGINS, build_assessment, assessment_response
+from assessment_queries import (ASSESSMENT_INDEXES, QueryError, list_query, page_response,
+                                aggregate_pipeline, aggregate_response)
+from assessment_rollups import (ROLLUP_COLLECTION, ROLLUP_INDEXES, record_rollups_async,
+                                stats_query, stats_response)
+from db import mongo_manager_from_env
+from memory_store import UnsupportedByMemoryStore
+from metrics import (registry as metrics_registry, stage_timers, store_samples, REQUESTS, REQUEST_ERRORS,
+                     REQUEST_SECONDS, CONTENT_TYPE as METRICS_CONTENT_TYPE)
+from log_utils import get_logger
+
+# Load environment variables
+load_dotenv('db.env')
+
+logger = get_logger(__name__)
+
+# Largest request body accepted, in bytes
+MAX_BODY_BYTES = int(os.getenv('MAX_BODY_BYTES', 1 << 20))
+
+# Keep the per-day rollup buckets behind /api/stats up to date; off by
+# default because each insert then pays a second round trip
+ROLLUPS = os.getenv('ASSESSMENT_ROLLUPS', '0') == '1'
+
+# Latency of each step of an assessment submission, exported on /metrics
+stages = stage_timers('assessment', ['parse', 'mongo_insert', 'rollup', 'serialize'])
+
+class RequestTooLarge(Exception):
+    pass
+
+class AssessmentAPI:
+    """ASGI version of the assessment API with non-blocking Mongo inserts.
+
+    Serves the same /api/assessment, /api/assessments, /api/stats, /api/health and /metrics responses as app.py, but
+    a request awaits its insert instead of holding a worker thread, so one
+    process can keep thousands of submissions in flight. Run it with an
+    ASGI server, e.g.  uvicorn async_app:app --workers 4
+    """
+
+    def __init__(self, mongo=None):
+        self.mongo = mongo or mongo_manager_from_env(asynchronous=True)
+        self.routes = {
+            ('POST', '/api/assessment'): self.submit_assessment,
+            ('GET', '/api/assessments'): self.get_assessments,
+            ('GET', '/api/assessments/aggregate'): self.get_assessment_aggregates,
+            ('GET', '/api/stats'): self.get_stats,
+            ('GET', '/api/health'): self.health
+        }
+        metrics_registry.collector('assessment_store', lambda: store_samples(self.mongo))
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        origin = dict(scope['headers']).get(b'origin', b'').decode('latin-1')
+        cors_headers = self.cors_headers(origin)
+        path = scope['path']
+        if scope['method'] == 'OPTIONS' and any(route_path == path for _, route_path in self.routes):
+            await self.respond(send, 200, None, cors_headers + [
+                (b'access-control-allow-methods', b'GET, POST, PUT, DELETE, OPTIONS'),
+                (b'access-control-allow-headers', b'Content-Type')
+            ])
+            return
+
+        if scope['method'] == 'GET' and path == '/metrics':
+            await self.respond(send, 200, metrics_registry.render().encode('utf-8'), cors_headers,
+                               METRICS_CONTENT_TYPE.encode('latin-1'))
+            return
+
+        start = time.perf_counter()
+        handler = self.routes.get((scope['method'], path))
+        if handler is None:
+            endpoint = 'unmatched'
+            status, body = 404, {"status": "error", "message": "Not found"}
+        else:
+            endpoint = path
+            status, body = await handler(scope, receive)
+        await self.respond(send, status, body, cors_headers)
+        self.record_request(endpoint, scope['method'], status, time.perf_counter() - start)
+
+    def record_request(self, endpoint, method, status, seconds):
+        REQUEST_SECONDS.labels('assessment', endpoint).observe(seconds)
+        REQUESTS.labels('assessment', endpoint, method, status).inc()
+        if status >= 500:
+            REQUEST_ERRORS.labels('assessment', endpoint).inc()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self.ensure_indexes()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                closed = self.mongo.close()
+                if inspect.isawaitable(closed):
+                    await closed
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def ensure_indexes(self):
+        """Create the assessment and rollup indexes; a failure is logged so startup still completes."""
+        try:
+            for collection_name, indexes in (('assessments', ASSESSMENT_INDEXES),
+                                             (ROLLUP_COLLECTION, ROLLUP_INDEXES)):
+                collection = self.mongo.collection(collection_name)
+                for keys, name in indexes:
+                    await collection.create_index(keys, name=name)
+        except PyMongoError as e:
+            logger.warning("Could not create assessment indexes: %s", e)
+
+    def cors_headers(self, origin):
+        if origin not in CORS_ORIGINS:
+            return []
+        return [
+            (b'access-control-allow-origin', origin.encode('latin-1')),
+            (b'access-control-allow-credentials', b'true'),
+            (b'vary', b'Origin')
+        ]
+
+    async def respond(self, send, status, body, headers, content_type=b'application/json'):
+        """Send body as JSON, or as-is if it is already bytes."""
+        if isinstance(body, bytes):
+            payload = body
+        else:
+            payload = json.dumps(body).encode('utf-8') if body is not None else b''
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': headers + [
+                (b'content-type', content_type),
+                (b'content-length', str(len(payload)).encode())
+            ]
+        })
+        await send({'type': 'http.response.body', 'body': payload})
+
+    async def read_json(self, receive):
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                raise RequestTooLarge()
+            chunks.append(chunk)
+            if not message.get('more_body'):
+                break
+        return json.loads(b''.join(chunks))
+
+    def query_args(self, scope):
+        return dict(parse_qsl(scope['query_string'].decode('latin-1')))
+
+    async def submit_assessment(self, scope, receive):
+        try:
+            with stages['parse'].time():
+                assessment = build_assessment(await self.read_json(receive))
+            if assessment is None:
+                return 400, {"status": "error", "message": "Invalid assessment data"}
+
+            with stages['mongo_insert'].time():
+                result = await self.mongo.collection('assessments').insert_one(assessment)
+            if ROLLUPS:
+                with stages['rollup'].time():
+                    await record_rollups_async(self.mongo.collection(ROLLUP_COLLECTION), [assessment])
+            with stages['serialize'].time():
+                return 201, json.dumps(assessment_response(assessment, result.inserted_id)).encode('utf-8')
+
+        except RequestTooLarge:
+            return 413, {"status": "error", "message": "Request body too large"}
+
+        except PyMongoError as e:
+            logger.exception("Assessment database error: %s", e)
+            return 503, {"status": "error", "message": "Database unavailable"}
+
+        except Exception as e:
+            logger.exception("Assessment error: %s", e)
+            return 500, {"status": "error", "message": "Error processing assessment"}
+
+    async def get_assessments(self, scope, receive):
+        try:
+            query, projection, limit = list_query(self.query_args(scope))
+            cursor = (self.mongo.collection('assessments').find(query, projection)
+                      .sort([('created_at', DESCENDING), ('_id', DESCENDING)])
+                      .limit(limit + 1))
+            return 200, page_response(await cursor.to_list(), limit)
+
+        except QueryError as e:
+            return 400, {"status": "error", "message": str(e)}
+
+        except UnsupportedByMemoryStore as e:
+            return 501, {"status": "error", "message": str(e)}
+
+        except PyMongoError as e:
+            logger.exception("Assessment query error: %s", e)
+            return 503, {"status": "error", "message": "Database unavailable"}
+
+        except Exception as e:
+            logger.exception("Error listing assessments: %s", e)
+            return 500, {"status": "error", "message": "Error listing assessments"}
+
+    async def get_assessment_aggregates(self, scope, receive):
+        try:
+            pipeline, group_by = aggregate_pipeline(self.query_args(scope))
+            cursor = await self.mongo.collection('assessments').aggregate(pipeline)
+            return 200, aggregate_response(await cursor.to_list(), group_by)
+
+        except QueryError as e:
+            return 400, {"status": "error", "message": str(e)}
+
+        except UnsupportedByMemoryStore as e:
+            return 501, {"status": "error", "message": str(e)}
+
+        except PyMongoError as e:
+            logger.exception("Assessment aggregate error: %s", e)
+            return 503, {"status": "error", "message": "Database unavailable"}
+
+        except Exception as e:
+            logger.exception("Error aggregating assessments: %s", e)
+            return 500, {"status": "error", "message": "Error aggregating assessments"}
+
+    async def get_stats(self, scope, receive):
+        try:
+            query, start, end = stats_query(self.query_args(scope))
+            buckets = await self.mongo.collection(ROLLUP_COLLECTION).find(query).to_list()
+            return 200, stats_response(buckets, start, end)
+
+        except QueryError as e:
+            return 400, {"status": "error", "message": str(e)}
+
+        except UnsupportedByMemoryStore as e:
+            return 501, {"status": "error", "message": str(e)}
+
+        except PyMongoError as e:
+            logger.exception("Assessment stats error: %s", e)
+            return 503, {"status": "error", "message": "Database unavailable"}
+
+        except Exception as e:
+            logger.exception("Error reading assessment stats: %s", e)
+            return 500, {"status": "error", "message": "Error reading assessment stats"}
+
+    async def health(self, scope, receive):
+        return 200, {
+            "status": "success",
+            "message": "API is healthy",
+            "database": self.mongo.stats()
+        }
+
+app = AssessmentAPI()
@@ -0,0 +1,719 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import json
+import asyncio
+import time
+import random
+import platform
+import socket
+import subprocess
+import http.client
+import concurrent.futures
+import tracemalloc
+import numpy as np
+import pandas as pd
+import sklearn
+import anxiety_predict_utils
+import predict_utils
+from flat_forest import FlatForest, check_parity, random_inputs
+from lookup_table import ProbabilityTable, load_probability_table, table_path
+from model_registry import load_json, registry
+
+def sample_anxiety_input():
+    """Build one anxiety answer dict using the mid-scale answer for every feature."""
+    _, _, column_info = anxiety_predict_utils.load_model_components()
+    return {feature: 3 for feature in column_info}
+
+def sample_depression_inputs(count, seed=0):
+    """Build random depression answer dicts keyed by the frontend question names."""
+    _, column_info = predict_utils.load_model_components()
+    frontend_names = {column: question for question, column in predict_utils.QUESTION_MAPPING.items()}
+    rng = random.Random(seed)
+    return [
+        {frontend_names[column]: rng.choice(info['values']) for column, info in column_info.items()}
+        for _ in range(count)
+    ]
+
+def legacy_preprocess_depression(input_data, column_info):
+    """The original one-row DataFrame preprocessing, kept for comparison."""
+    df = pd.DataFrame([input_data]).rename(columns=predict_utils.QUESTION_MAPPING)
+    processed_df = pd.DataFrame()
+    for col_name, info in column_info.items():
+        if col_name in df.columns:
+            encoded_value = predict_utils.encode_value(df[col_name].iloc[0], info)
+        else:
+            encoded_value = 0
+        processed_df[col_name] = [encoded_value]
+    return processed_df
+
+def time_calls(fn, repeat):
+    """Call fn repeat times and return the per-call latencies in milliseconds."""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+def print_summary(name, latencies):
+    """Print p50/p95/mean for a set of latencies."""
+    print(f"{name:<32} p50 {np.percentile(latencies, 50):9.3f} ms   "
+          f"p95 {np.percentile(latencies, 95):9.3f} ms   "
+          f"mean {latencies.mean():9.3f} ms")
+
+def bench_session(args):
+    """Compare per-request anxiety latency with and without the preloaded session."""
+    input_data = sample_anxiety_input()
+
+    def reload_per_request():
+        # The old code path loaded every artifact from disk twice per request
+        registry.clear()
+        anxiety_predict_utils.load_model_components()
+        registry.clear()
+        anxiety_predict_utils.predict_anxiety(input_data)
+
+    def preloaded_session():
+        anxiety_predict_utils.predict_anxiety(input_data)
+
+    # Every call must reach the model, or the after column times cache hits
+    with contextlib.redirect_stdout(io.StringIO()), prediction_caches_disabled():
+        before = time_calls(reload_per_request, args.repeat)
+        preloaded_session()
+        after = time_calls(preloaded_session, args.repeat)
+
+    print(f"predict_anxiety latency over {args.repeat} requests")
+    print_summary("before (load per request)", before)
+    print_summary("after (preloaded session)", after)
+    print(f"speedup (p50): {np.percentile(before, 50) / np.percentile(after, 50):.1f}x")
+
+def bench_preprocess(args):
+    """Compare the legacy DataFrame preprocessing with the precompiled encoder."""
+    _, column_info = predict_utils.load_model_components()
+    encoder = predict_utils.get_encoder()
+    inputs = sample_depression_inputs(args.rows)
+
+    # Drop a few answers so the missing-column default is exercised too
+    for i, row in enumerate(inputs[::7]):
+        row.pop(list(row)[i % len(row)])
+
+    legacy = np.vstack([legacy_preprocess_depression(row, column_info).to_numpy() for row in inputs])
+    if not np.array_equal(legacy, encoder.encode(inputs)):
+        raise SystemExit("Encoder output differs from the legacy preprocessing")
+    print(f"Encoded {len(inputs)} rows: codes identical to the legacy path")
+
+    row = inputs[0]
+    print_summary("legacy DataFrame (1 row)", time_calls(
+        lambda: legacy_preprocess_depression(row, column_info), args.repeat))
+    print_summary("compiled encoder (1 row)", time_calls(
+        lambda: encoder.encode_one(row), args.repeat))
+    print_summary(f"legacy DataFrame ({len(inputs)} rows)", time_calls(
+        lambda: [legacy_preprocess_depression(r, column_info) for r in inputs], 3))
+    print_summary(f"compiled encoder ({len(inputs)} rows)", time_calls(
+        lambda: encoder.encode(inputs), 3))
+
+def bench_forest(args):
+    """Compare sklearn predict_proba with the flattened forest across batch sizes."""
+    for model_path in args.models:
+        model = registry.get(model_path)
+        forest = FlatForest.from_sklearn(model)
+        max_diff = check_parity(model, forest, random_inputs(model, 10000))
+        print(f"\n{model_path}: {len(forest.roots)} trees, parity max diff {max_diff:.3g}")
+
+        for batch_size in args.batch_sizes:
+            X = random_inputs(model, batch_size, seed=batch_size)
+            repeat = max(3, min(args.repeat, 100000 // batch_size))
+            sklearn_latency = time_calls(lambda: model.predict_proba(X), repeat)
+            forest_latency = time_calls(lambda: forest.predict_proba(X), repeat)
+            print(f"batch {batch_size:>6}: sklearn p50 {np.percentile(sklearn_latency, 50):9.3f} ms   "
+                  f"flat p50 {np.percentile(forest_latency, 50):9.3f} ms   "
+                  f"speedup {np.percentile(sklearn_latency, 50) / np.percentile(forest_latency, 50):6.1f}x")
+
+def bench_table(args):
+    """Report table-mode startup cost, memory and latency against the flat forest."""
+    model, column_info = predict_utils.load_model_components()
+    model_path = predict_utils.MODEL_PATH
+
+    start = time.perf_counter()
+    table = ProbabilityTable.build(model, column_info)
+    build_seconds = time.perf_counter() - start
+    table.save(table_path(model_path))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        load_latency = time_calls(
+            lambda: load_probability_table(model_path, predict_utils.COLUMN_INFO_PATH), 10)
+    print(f"table: {len(table.probabilities)} rows x {table.probabilities.shape[1]} classes, "
+          f"{table.nbytes / 1024:.0f} KiB")
+    print(f"startup: build {build_seconds * 1000:.1f} ms, load from disk p50 "
+          f"{np.percentile(load_latency, 50):.3f} ms")
+
+    encoder = predict_utils.get_encoder()
+    forest = predict_utils.get_forest()
+    X = encoder.encode(sample_depression_inputs(args.rows))
+    if not np.array_equal(table.predict_proba(X), model.predict_proba(X)):
+        raise SystemExit("Table probabilities differ from the model")
+
+    row = X[:1]
+    print_summary("flat forest (1 row)", time_calls(lambda: forest.predict_proba(row), args.repeat))
+    print_summary("table (1 row)", time_calls(lambda: table.predict_proba(row), args.repeat))
+    print_summary(f"sklearn ({len(X)} rows)", time_calls(lambda: model.predict_proba(X), 10))
+    print_summary(f"table ({len(X)} rows)", time_calls(lambda: table.predict_proba(X), 10))
+
+def synthetic_depression_answers(count, seed=0, feature_info_path='feature_info.json'):
+    """Random depression answers drawn from the categories listed in feature_info.json."""
+    feature_info = load_json(feature_info_path)
+    questions = [(question, feature_info[column]['values'])
+                 for question, column in predict_utils.QUESTION_MAPPING.items() if column in feature_info]
+    rng = random.Random(seed)
+    return [{question: rng.choice(values) for question, values in questions} for _ in range(count)]
+
+def synthetic_anxiety_answers(count, seed=0, column_info_path='anxiety_column_info.json'):
+    """Integer anxiety answers drawn around each feature's mean/std and clipped to its range."""
+    column_info = load_json(column_info_path)
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for feature, info in column_info.items():
+        low, high = info['range']
+        values = rng.normal(info['mean'], info['std'], count)
+        columns[feature] = np.clip(np.rint(values), low, high).astype(int).tolist()
+    return [{feature: columns[feature][i] for feature in columns} for i in range(count)]
+
+def as_answers(input_data):
+    """Frontend request body shape: a list of {question, answer} pairs."""
+    return [{'question': question, 'answer': answer} for question, answer in input_data.items()]
+
+def latency_stats(latencies):
+    """Percentiles of a latency array in milliseconds."""
+    return {
+        'count': int(len(latencies)),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'mean_ms': float(latencies.mean()),
+        'max_ms': float(latencies.max())
+    }
+
+def time_each(fn, inputs):
+    """Call fn once per input and return the per-call latencies in milliseconds."""
+    latencies = np.empty(len(inputs))
+    for i, item in enumerate(inputs):
+        start = time.perf_counter()
+        fn(item)
+        latencies[i] = (time.perf_counter() - start) * 1000
+    return latencies
+
+def allocation_stats(fn, inputs):
+    """Peak bytes allocated during a call and bytes still held afterwards, per call."""
+    tracemalloc.start()
+    try:
+        peaks = []
+        start_current, _ = tracemalloc.get_traced_memory()
+        for item in inputs:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            fn(item)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        end_current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'peak_bytes_per_call': float(np.mean(peaks)),
+        'retained_bytes_per_call': (end_current - start_current) / len(inputs)
+    }
+
+def measure(fn, inputs, warmup=20, allocation_calls=200):
+    """Latency percentiles and allocation figures for fn over inputs."""
+    for item in inputs[:warmup]:
+        fn(item)
+    result = latency_stats(time_each(fn, inputs))
+    result.update(allocation_stats(fn, inputs[:allocation_calls]))
+    return result
+
+def throughput(fn, make_batch, batch_sizes, min_seconds=0.5):
+    """Rows per second through fn at each batch size."""
+    results = {}
+    for batch_size in batch_sizes:
+        batch = make_batch(batch_size)
+        fn(batch)
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            fn(batch)
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_seconds and calls >= 3:
+                break
+        results[str(batch_size)] = {
+            'rows_per_second': batch_size * calls / elapsed,
+            'ms_per_batch': elapsed * 1000 / calls
+        }
+    return results
+
+@contextlib.contextmanager
+def prediction_caches_disabled():
+    """Bypass both prediction caches so every call reaches the model."""
+    caches = [anxiety_predict_utils.prediction_cache, predict_utils.prediction_cache]
+    sizes = [cache.maxsize for cache in caches]
+    for cache in caches:
+        cache.maxsize = 0
+    try:
+        yield
+    finally:
+        for cache, size in zip(caches, sizes):
+            cache.maxsize = size
+
+# Each snippet runs in a fresh interpreter; argv[1] is a JSON sample input
+COLD_START_SNIPPETS = {
+    'predict_anxiety': "import sys, json, anxiety_predict_utils as m; m.predict_anxiety(json.loads(sys.argv[1])['anxiety'])",
+    'predict_depression': "import sys, json, predict_utils as m; m.predict_depression(json.loads(sys.argv[1])['depression'])",
+    'anxiety_app': "import anxiety_app",
+    'app': "import app"
+}
+
+def cold_start(runs):
+    """Wall time from process launch to first prediction (or app import) in a new interpreter."""
+    sample = json.dumps({
+        'anxiety': synthetic_anxiety_answers(1, seed=99)[0],
+        'depression': synthetic_depression_answers(1, seed=99)[0]
+    })
+
+    def run(code):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', code, sample], check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            timings.append((time.perf_counter() - start) * 1000)
+        return float(np.median(timings))
+
+    interpreter_ms = run('pass')
+    results = {'interpreter_ms': interpreter_ms}
+    for name, code in COLD_START_SNIPPETS.items():
+        total_ms = run(code)
+        results[name] = {'total_ms': total_ms, 'minus_interpreter_ms': total_ms - interpreter_ms}
+    return results
+
+def post_json(client, url, body):
+    response = client.post(url, json=body)
+    if response.status_code >= 400:
+        raise SystemExit(f"{url} returned {response.status_code}: {response.get_data(as_text=True)}")
+    return response
+
+def bench_anxiety_app(requests, batch_sizes):
+    """Latency and throughput of the anxiety_app endpoints through the Flask test client."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        import anxiety_app
+    client = anxiety_app.app.test_client()
+    anxiety_bodies = [{'answers': as_answers(row)} for row in synthetic_anxiety_answers(requests, seed=3)]
+
+    def batch_body(make_answers):
+        return lambda size: {'respondents': [{'answers': as_answers(row)} for row in make_answers(size)]}
+
+    return {
+        'POST /predict/anxiety': measure(
+            lambda body: post_json(client, '/predict/anxiety', body), anxiety_bodies),
+        'GET /feature_importance': measure(
+            lambda _: client.get('/feature_importance'), [None] * min(requests, 500)),
+        'POST /predict/anxiety/batch': throughput(
+            lambda body: post_json(client, '/predict/anxiety/batch', body),
+            batch_body(lambda size: synthetic_anxiety_answers(size, seed=size)), batch_sizes),
+        'POST /predict/depression/batch': throughput(
+            lambda body: post_json(client, '/predict/depression/batch', body),
+            batch_body(lambda size: synthetic_depression_answers(size, seed=size)), batch_sizes)
+    }
+
+def bench_assessment_app(requests, mongo_uri):
+    """Latency of the app.py endpoints; the assessment insert needs a reachable MongoDB."""
+    import app as assessment_app
+    from db import MongoManager
+
+    manager = MongoManager(mongo_uri, serverSelectionTimeoutMS=1000)
+    client = assessment_app.create_app(mongo=manager).test_client()
+    results = {'GET /api/health': measure(lambda _: client.get('/api/health'), [None] * requests)}
+
+    try:
+        manager.client.admin.command('ping')
+    except Exception as e:
+        results['POST /api/assessment'] = {'skipped': f"MongoDB unreachable at {mongo_uri} ({type(e).__name__})"}
+        return results
+
+    rng = random.Random(5)
+    bodies = [{'answers': [rng.randint(0, 3) for _ in range(7)]} for _ in range(requests)]
+    try:
+        results['POST /api/assessment'] = measure(
+            lambda body: post_json(client, '/api/assessment', body), bodies)
+    finally:
+        manager.collection('assessments').drop()
+        manager.close()
+    return results
+
+def bench_suite(args):
+    """Run the full latency/throughput/allocation/cold-start suite and write a JSON baseline."""
+    for cache in (anxiety_predict_utils.prediction_cache, predict_utils.prediction_cache):
+        cache.clear()
+    anxiety_inputs = synthetic_anxiety_answers(args.requests, seed=1)
+    depression_inputs = synthetic_depression_answers(args.requests, seed=2)
+
+    results = {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'sklearn': sklearn.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'depression_table_mode': predict_utils.TABLE_MODE
+        },
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'functions': {},
+        'throughput': {},
+        'endpoints': {}
+    }
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        with prediction_caches_disabled():
+            results['functions']['predict_anxiety'] = measure(
+                anxiety_predict_utils.predict_anxiety, anxiety_inputs)
+            results['functions']['predict_depression'] = measure(
+                predict_utils.predict_depression, depression_inputs)
+            results['throughput']['predict_anxiety_batch'] = throughput(
+                anxiety_predict_utils.predict_anxiety_batch,
+                lambda size: synthetic_anxiety_answers(size, seed=size), args.batch_sizes)
+            results['throughput']['predict_depression_batch'] = throughput(
+                predict_utils.predict_depression_batch,
+                lambda size: synthetic_depression_answers(size, seed=size), args.batch_sizes)
+            results['endpoints'].update(bench_anxiety_app(args.requests, args.endpoint_batch_sizes))
+        # The same answers again, served from the prediction caches
+        results['functions']['predict_anxiety_cached'] = measure(
+            anxiety_predict_utils.predict_anxiety, [anxiety_inputs[0]] * args.requests)
+        results['functions']['predict_depression_cached'] = measure(
+            predict_utils.predict_depression, [depression_inputs[0]] * args.requests)
+        results['endpoints'].update(bench_assessment_app(args.requests, args.mongo_uri))
+
+    if args.cold_start_runs:
+        results['cold_start'] = cold_start(args.cold_start_runs)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    for name, stats in {**results['functions'], **results['endpoints']}.items():
+        if 'p50_ms' in stats:
+            print(f"{name:<32} p50 {stats['p50_ms']:8.3f} ms   p95 {stats['p95_ms']:8.3f} ms   "
+                  f"p99 {stats['p99_ms']:8.3f} ms   peak {stats['peak_bytes_per_call'] / 1024:8.1f} KiB/call")
+        elif 'skipped' in stats:
+            print(f"{name:<32} skipped: {stats['skipped']}")
+    for name, sizes in {**results['throughput'], **{
+            key: value for key, value in results['endpoints'].items() if 'p50_ms' not in value
+            and 'skipped' not in value}}.items():
+        print(f"{name:<32} " + "   ".join(
+            f"{size}: {stats['rows_per_second']:,.0f} rows/s" for size, stats in sizes.items()))
+    if 'cold_start' in results:
+        print("cold start (ms, minus interpreter): " + ", ".join(
+            f"{name} {stats['minus_interpreter_ms']:.0f}"
+            for name, stats in results['cold_start'].items() if isinstance(stats, dict)))
+    print(f"Wrote {args.output}")
+
+def free_port():
+    """An unused localhost TCP port."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(command, port, env=None, ready_path='/ready', timeout=120):
+    """Start a server subprocess and wait until ready_path answers 200."""
+    server = subprocess.Popen(command, env=dict(os.environ, **(env or {})),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"{command[2]} exited with status {server.returncode}")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', ready_path)
+            if connection.getresponse().status == 200:
+                return server
+        except OSError:
+            pass
+        time.sleep(0.2)
+    server.kill()
+    raise SystemExit(f"{command[2]} did not become ready within {timeout}s")
+
+def start_gunicorn(app, workers, threads, port, env=None, ready_path='/ready'):
+    """Run gunicorn.conf.py with the given app and worker/thread counts."""
+    env = dict(env or {}, WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads),
+               BIND=f'127.0.0.1:{port}')
+    return start_server([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', app],
+                        port, env, ready_path)
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+def load_client(port, path, bodies, duration):
+    """One keep-alive client posting bodies in a loop; returns its latencies in ms."""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    headers = {'Content-Type': 'application/json'}
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        connection.request('POST', path, body=bodies[i % len(bodies)], headers=headers)
+        response = connection.getresponse()
+        response.read()
+        latencies.append((time.perf_counter() - start) * 1000)
+        errors += response.status >= 400
+        i += 1
+    connection.close()
+    return latencies, errors
+
+def bench_load(args):
+    """Load-test the gunicorn server at several worker counts to show scaling across cores."""
+    bodies = [json.dumps({'answers': as_answers(row)}).encode()
+              for row in synthetic_anxiety_answers(1000, seed=11)]
+    results = {}
+    for workers in args.workers:
+        port = free_port()
+        server = start_gunicorn('wsgi:app', workers, args.threads, port)
+        try:
+            with concurrent.futures.ProcessPoolExecutor(args.clients) as executor:
+                # Short warm-up so every worker has served requests before measuring
+                list(executor.map(load_client, [port] * args.clients, ['/predict/anxiety'] * args.clients,
+                                  [bodies] * args.clients, [1.0] * args.clients))
+                runs = list(executor.map(load_client, [port] * args.clients,
+                                         ['/predict/anxiety'] * args.clients,
+                                         [bodies] * args.clients, [args.duration] * args.clients))
+        finally:
+            stop_server(server)
+
+        latencies = np.concatenate([np.array(run[0]) for run in runs])
+        errors = sum(run[1] for run in runs)
+        stats = latency_stats(latencies)
+        stats['requests_per_second'] = len(latencies) / args.duration
+        stats['errors'] = errors
+        results[str(workers)] = stats
+        print(f"workers {workers:>2} x {args.threads} threads: {stats['requests_per_second']:8.1f} req/s   "
+              f"p50 {stats['p50_ms']:7.2f} ms   p99 {stats['p99_ms']:7.2f} ms   errors {errors}")
+
+    first = results[str(args.workers[0])]['requests_per_second']
+    for workers, stats in results.items():
+        stats['scaling'] = stats['requests_per_second'] / first if first else None
+    print("scaling vs first: " + ", ".join(
+        f"{workers} workers {stats['scaling']:.2f}x" for workers, stats in results.items()))
+    print(f"({os.cpu_count()} CPUs; the load clients run on the same machine)")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'cpu_count': os.cpu_count(), 'threads': args.threads,
+                       'clients': args.clients, 'results': results}, f, indent=2)
+
+async def http_post(reader, writer, path, body):
+    """Send one keep-alive POST and return (status, keep_alive)."""
+    writer.write(b'POST %s HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n'
+                 b'Content-Length: %d\r\n\r\n%s' % (path.encode(), len(body), body))
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    keep_alive = True
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.partition(b':')
+        name = name.strip().lower()
+        if name == b'content-length':
+            length = int(value)
+        elif name == b'connection' and value.strip().lower() == b'close':
+            keep_alive = False
+    await reader.readexactly(length)
+    return status, keep_alive
+
+async def async_load(port, path, bodies, connections, duration):
+    """Keep `connections` requests in flight for duration seconds; returns (latencies_ms, errors)."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+    latencies = []
+    errors = 0
+
+    async def connection_loop(offset):
+        nonlocal errors
+        reader = writer = None
+        i = offset
+        while loop.time() < deadline:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            start = time.perf_counter()
+            try:
+                status, keep_alive = await http_post(reader, writer, path, bodies[i % len(bodies)])
+            except (ConnectionError, asyncio.IncompleteReadError, IndexError):
+                errors += 1
+                writer.close()
+                writer = None
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += status >= 400
+            if not keep_alive:
+                writer.close()
+                writer = None
+            i += connections
+        if writer is not None:
+            writer.close()
+
+    await asyncio.gather(*(connection_loop(offset) for offset in range(connections)))
+    return np.array(latencies), errors
+
+def bench_assessments(args):
+    """Compare /api/assessment throughput of the sync Flask app and the asyncio app."""
+    if args.mongo_uri:
+        env = {'MONGO_URI': args.mongo_uri, 'ASSESSMENT_STORE': 'mongo'}
+        store = f"MongoDB at {args.mongo_uri}"
+    else:
+        env = {'ASSESSMENT_STORE': 'memory', 'MEMORY_STORE_LATENCY_MS': str(args.store_latency_ms)}
+        store = f"in-memory store with {args.store_latency_ms} ms simulated insert latency"
+    rng = random.Random(13)
+    bodies = [json.dumps({'answers': [rng.randint(0, 3) for _ in range(7)]}).encode() for _ in range(1000)]
+
+    servers = {
+        f'sync Flask (gunicorn, {args.workers} workers x {args.threads} threads)': lambda port: start_gunicorn(
+            'app:app', args.workers, args.threads, port, env, ready_path='/api/health'),
+        f'async (uvicorn, {args.workers} workers)': lambda port: start_server(
+            [sys.executable, '-m', 'uvicorn', 'async_app:app', '--port', str(port),
+             '--workers', str(args.workers), '--log-level', 'warning'],
+            port, env, ready_path='/api/health')
+    }
+
+    print(f"/api/assessment with {args.connections} concurrent connections, {store}")
+    results = {}
+    for name, start in servers.items():
+        port = free_port()
+        server = start(port)
+        try:
+            asyncio.run(async_load(port, '/api/assessment', bodies, args.connections, 1.0))
+            latencies, errors = asyncio.run(
+                async_load(port, '/api/assessment', bodies, args.connections, args.duration))
+        finally:
+            stop_server(server)
+        stats = latency_stats(latencies) if len(latencies) else {}
+        stats['requests_per_second'] = len(latencies) / args.duration
+        stats['errors'] = errors
+        results[name] = stats
+        print(f"{name:<48} {stats['requests_per_second']:8.1f} req/s   "
+              f"p50 {stats.get('p50_ms', float('nan')):8.2f} ms   "
+              f"p99 {stats.get('p99_ms', float('nan')):8.2f} ms   errors {errors}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'store': store, 'connections': args.connections, 'results': results}, f, indent=2)
+
+def flatten_metrics(results, prefix=''):
+    """Map 'section/name/metric' paths to numbers for the latency and throughput figures."""
+    metrics = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten_metrics(value, path + '/'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and (
+                key.endswith('_ms') or key in ('rows_per_second', 'peak_bytes_per_call')):
+            metrics[path] = value
+    return metrics
+
+def bench_compare(args):
+    """Diff two suite baselines and exit non-zero when a metric regressed past the threshold."""
+    with open(args.baseline) as f:
+        baseline = flatten_metrics(json.load(f))
+    with open(args.current) as f:
+        current = flatten_metrics(json.load(f))
+
+    regressions = []
+    for path in sorted(baseline.keys() & current.keys()):
+        if path.startswith('environment/') or baseline[path] == 0:
+            continue
+        # Higher is better for throughput, lower for everything else
+        if path.endswith('rows_per_second'):
+            change = baseline[path] / current[path] - 1 if current[path] else float('inf')
+        else:
+            change = current[path] / baseline[path] - 1
+        marker = 'REGRESSION' if change > args.threshold else ''
+        print(f"{path:<72} {baseline[path]:>14.3f} -> {current[path]:>14.3f}  {change:+7.1%} {marker}")
+        if marker:
+            regressions.append(path)
+
+    if regressions:
+        print(f"\n{len(regressions)} metrics regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold:.0%}")
+
+def main():
+    parser = argparse.ArgumentParser(description="WellnessWave prediction benchmarks")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    session_parser = subparsers.add_parser('session', help=bench_session.__doc__)
+    session_parser.add_argument('--repeat', type=int, default=50)
+    session_parser.set_defaults(func=bench_session)
+
+    preprocess_parser = subparsers.add_parser('preprocess', help=bench_preprocess.__doc__)
+    preprocess_parser.add_argument('--repeat', type=int, default=1000)
+    preprocess_parser.add_argument('--rows', type=int, default=1000)
+    preprocess_parser.set_defaults(func=bench_preprocess)
+
+    forest_parser = subparsers.add_parser('forest', help=bench_forest.__doc__)
+    forest_parser.add_argument('--repeat', type=int, default=200)
+    forest_parser.add_argument('--models', nargs='+',
+                               default=['anxiety_model.joblib', 'depression_model.joblib'])
+    forest_parser.add_argument('--batch-sizes', type=int, nargs='+',
+                               default=[1, 10, 100, 1000, 10000, 100000])
+    forest_parser.set_defaults(func=bench_forest)
+
+    table_parser = subparsers.add_parser('table', help=bench_table.__doc__)
+    table_parser.add_argument('--repeat', type=int, default=1000)
+    table_parser.add_argument('--rows', type=int, default=10000)
+    table_parser.set_defaults(func=bench_table)
+
+    suite_parser = subparsers.add_parser('suite', help=bench_suite.__doc__)
+    suite_parser.add_argument('--requests', type=int, default=2000)
+    suite_parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 100, 1000, 10000])
+    suite_parser.add_argument('--endpoint-batch-sizes', type=int, nargs='+', default=[1, 10, 100, 1000])
+    suite_parser.add_argument('--cold-start-runs', type=int, default=3,
+                              help="fresh interpreters per cold-start measurement (0 to skip)")
+    suite_parser.add_argument('--mongo-uri', default='mongodb://localhost:27017/wellnesswave_benchmark',
+                              help="throwaway database for the /api/assessment benchmark")
+    suite_parser.add_argument('--output', default='benchmark_baseline.json')
+    suite_parser.set_defaults(func=bench_suite)
+
+    load_parser = subparsers.add_parser('load', help=bench_load.__doc__)
+    load_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4],
+                             help="gunicorn worker counts to compare")
+    load_parser.add_argument('--threads', type=int, default=1)
+    load_parser.add_argument('--clients', type=int, default=8, help="concurrent keep-alive clients")
+    load_parser.add_argument('--duration', type=float, default=10.0, help="seconds per worker count")
+    load_parser.add_argument('--output', default=None, help="optional JSON file for the results")
+    load_parser.set_defaults(func=bench_load)
+
+    assessments_parser = subparsers.add_parser('assessments', help=bench_assessments.__doc__)
+    assessments_parser.add_argument('--connections', type=int, default=200,
+                                    help="requests kept in flight")
+    assessments_parser.add_argument('--workers', type=int, default=1)
+    assessments_parser.add_argument('--threads', type=int, default=8, help="threads per sync worker")
+    assessments_parser.add_argument('--store-latency-ms', type=float, default=5.0,
+                                    help="simulated insert round trip when no --mongo-uri is given")
+    assessments_parser.add_argument('--mongo-uri', default=None,
+                                    help="benchmark against this MongoDB instead of the in-memory store")
+    assessments_parser.add_argument('--duration', type=float, default=10.0)
+    assessments_parser.add_argument('--output', default=None, help="optional JSON file for the results")
+    assessments_parser.set_defaults(func=bench_assessments)
+
+    compare_parser = subparsers.add_parser('compare', help=bench_compare.__doc__)
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help="allowed relative slowdown before a metric is flagged")
+    compare_parser.set_defaults(func=bench_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
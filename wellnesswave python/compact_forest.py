@@ -0,0 +1,310 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from flat_forest import FlatForest, check_parity
+from model_bundle import MODELS, FOREST_ARRAYS, write_bundle, load_bundle, bundle_path, file_info
+from model_registry import load_json
+
+# Trees are dropped while the training-split accuracy stays within this of
+# the full forest's and the mean probability shift stays below MAX_PROBA_DELTA
+MAX_ACCURACY_DROP = 0.0
+MAX_PROBA_DELTA = 0.02
+MIN_TREES = 20
+
+class TreeCompactor:
+    """Rewrite trees for integer answers within each feature's training range.
+
+    Each threshold t becomes floor(t) + 0.5, which sends every integer to
+    the same side as before. Splits that the path above them already
+    decides (the whole remaining range of the feature falls on one side)
+    are replaced by the branch that is taken, and a split whose two
+    branches are identical subtrees is replaced by that subtree. For
+    integer inputs within the ranges the rewritten tree reaches a leaf with
+    the same values as the original.
+
+    Non-integer, out-of-range or NaN inputs (such as the training mean
+    filled in for a missing answer) can land on a different leaf; a NaN
+    still follows the original node's missing-value side at every split
+    that is kept.
+    """
+
+    def __init__(self, forest, ranges):
+        self.forest = forest
+        self.ranges = ranges
+        self.feature = []
+        self.threshold = []
+        self.missing_go_to_left = []
+        self.children = []
+        self.value = []
+        # Canonical id of every distinct subtree emitted so far
+        self._subtrees = {}
+
+    def _leaf(self, node):
+        value = self.forest.value[node]
+        key = ('leaf', value.tobytes())
+        if key not in self._subtrees:
+            self._subtrees[key] = self._emit(0, 0.0, False, None, value)
+        return self._subtrees[key]
+
+    def _emit(self, feature, threshold, missing_go_to_left, children, value):
+        index = len(self.feature)
+        self.feature.append(feature)
+        self.threshold.append(threshold)
+        self.missing_go_to_left.append(missing_go_to_left)
+        self.children.append(children if children is not None else (index, index))
+        self.value.append(value)
+        return index
+
+    def _compact(self, node, low, high):
+        """Id of the compacted subtree at node, given integer bounds low/high per feature."""
+        forest = self.forest
+        left, right = forest.children[2 * node], forest.children[2 * node + 1]
+        if left == node:
+            return self._leaf(node)
+
+        feature = int(forest.feature[node])
+        cut = int(np.floor(forest.threshold[node]))
+        if cut >= high[feature]:
+            return self._compact(left, low, high)
+        if cut < low[feature]:
+            return self._compact(right, low, high)
+
+        saved_low, saved_high = low[feature], high[feature]
+        high[feature] = cut
+        left_id = self._compact(left, low, high)
+        high[feature] = saved_high
+        low[feature] = cut + 1
+        right_id = self._compact(right, low, high)
+        low[feature] = saved_low
+        if left_id == right_id:
+            return left_id
+
+        missing_left = bool(forest.missing_go_to_left[node])
+        key = (feature, cut, missing_left, left_id, right_id)
+        if key not in self._subtrees:
+            self._subtrees[key] = self._emit(feature, cut + 0.5, missing_left, (left_id, right_id), None)
+        return self._subtrees[key]
+
+    def compact(self, index):
+        """Append the compacted tree index and return its root position.
+
+        Nodes are emitted children first, so the root is the last node of
+        its tree's block rather than the first.
+        """
+        low = [int(low) for low, _ in self.ranges]
+        high = [int(high) for _, high in self.ranges]
+        # Subtrees are shared within a tree only, so each tree stays a contiguous block
+        self._subtrees = {}
+        return self._compact(int(self.forest.roots[index]), low, high)
+
+    def build(self, indices):
+        """A FlatForest of the compacted trees indices, in order."""
+        roots = [self.compact(index) for index in indices]
+        return self._forest(roots)
+
+    def _forest(self, roots):
+        n_classes = self.forest.value.shape[1]
+        value = np.zeros((len(self.feature), n_classes))
+        for node, leaf_value in enumerate(self.value):
+            if leaf_value is not None:
+                value[node] = leaf_value
+        forest = FlatForest(
+            feature=np.array(self.feature, dtype=np.intp),
+            threshold=np.array(self.threshold, dtype=np.float64),
+            missing_go_to_left=np.array(self.missing_go_to_left, dtype=bool),
+            children=np.array(self.children, dtype=np.intp).ravel(),
+            value=value,
+            roots=np.array(roots, dtype=np.intp),
+            classes=self.forest.classes_,
+            n_features=self.forest.n_features,
+            max_depth=self.forest.max_depth
+        )
+        forest.max_depth = max(tree_depth(forest, i) for i in range(len(roots)))
+        return forest
+
+def tree_depth(forest, index):
+    depth = 0
+    level = {int(forest.roots[index])}
+    while True:
+        following = set()
+        for node in level:
+            left, right = forest.children[2 * node], forest.children[2 * node + 1]
+            if left != node:
+                following.update((int(left), int(right)))
+        if not following:
+            return depth
+        level = following
+        depth += 1
+
+def tree_probabilities(forest, X):
+    """Leaf probabilities of every tree for every row, shape (n_trees, n_rows, n_classes)."""
+    return forest.value[forest.apply(X).T]
+
+def select_trees(per_tree, y, classes, max_accuracy_drop=MAX_ACCURACY_DROP,
+                 max_proba_delta=MAX_PROBA_DELTA, min_trees=MIN_TREES):
+    """Indices of the trees to keep, dropping the least useful ones first.
+
+    per_tree holds each tree's probabilities for the rows labelled y (see
+    tree_probabilities). Trees are ranked by how much removing each one
+    alone changes the forest's probabilities, then removed in that order as
+    long as accuracy on those rows stays within max_accuracy_drop of the
+    full forest and the mean absolute probability change stays within
+    max_proba_delta.
+    """
+    n_trees = len(per_tree)
+    total = per_tree.sum(axis=0)
+    full = total / n_trees
+    full_accuracy = np.mean(classes[full.argmax(axis=1)] == y)
+
+    # Probability shift from removing each tree on its own
+    shift = np.abs((total[np.newaxis] - per_tree) / (n_trees - 1) - full).mean(axis=(1, 2))
+    kept = set(range(n_trees))
+    for index in np.argsort(shift, kind='stable'):
+        if len(kept) <= min_trees:
+            break
+        candidate = total - per_tree[index]
+        proba = candidate / (len(kept) - 1)
+        accuracy = np.mean(classes[proba.argmax(axis=1)] == y)
+        if full_accuracy - accuracy <= max_accuracy_drop and np.abs(proba - full).mean() <= max_proba_delta:
+            total = candidate
+            kept.remove(int(index))
+    return sorted(kept)
+
+def forest_bytes(forest):
+    """Size of the node arrays, as stored in a bundle."""
+    return sum(getattr(forest, name).nbytes for name in FOREST_ARRAYS)
+
+def median_latency_ms(forest, X, repeat=200):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        forest.predict_proba(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000)
+
+def evaluate(forest, X, y):
+    proba = forest.predict_proba(X)
+    return proba, float(np.mean(forest.classes_[proba.argmax(axis=1)] == y))
+
+def missing_answer_rows(X, means, seed=0):
+    """X with one answer per row replaced by its training mean, as preprocessing does when it is missing."""
+    rng = np.random.default_rng(seed)
+    X = X.copy()
+    columns = rng.integers(0, X.shape[1], size=len(X))
+    X[np.arange(len(X)), columns] = means[columns]
+    return X
+
+def compaction_report(original, compacted, X_test, y_test, means):
+    original_proba, original_accuracy = evaluate(original, X_test, y_test)
+    compacted_proba, compacted_accuracy = evaluate(compacted, X_test, y_test)
+    delta = np.abs(original_proba - compacted_proba)
+    X_missing = missing_answer_rows(X_test, means)
+    missing_delta = np.abs(original.predict_proba(X_missing) - compacted.predict_proba(X_missing))
+    return {
+        'trees': [len(original.roots), len(compacted.roots)],
+        'nodes': [len(original.feature), len(compacted.feature)],
+        'max_depth': [original.max_depth, compacted.max_depth],
+        'bytes': [forest_bytes(original), forest_bytes(compacted)],
+        'latency_ms_single_row': [median_latency_ms(original, X_test[:1]), median_latency_ms(compacted, X_test[:1])],
+        'latency_ms_test_split': [median_latency_ms(original, X_test, 50), median_latency_ms(compacted, X_test, 50)],
+        'test_rows': len(X_test),
+        'accuracy': [original_accuracy, compacted_accuracy],
+        'prediction_agreement': float(np.mean(original_proba.argmax(axis=1) == compacted_proba.argmax(axis=1))),
+        'max_probability_delta': float(delta.max()),
+        'mean_probability_delta': float(delta.mean()),
+        'missing_answer_max_probability_delta': float(missing_delta.max())
+    }
+
+def print_report(report):
+    def row(name, key, fmt):
+        before, after = report[key]
+        print(f"  {name:<26} {fmt(before):>14} -> {fmt(after):>14}")
+    print(f"\n📉 Compaction report ({report['test_rows']} held-out rows)")
+    row('trees', 'trees', str)
+    row('nodes', 'nodes', str)
+    if 'nodes_after_quantize_and_merge' in report:
+        print(f"  {'nodes, quantize + merge':<26} {report['nodes'][0]:>14} -> "
+              f"{report['nodes_after_quantize_and_merge']:>14}")
+    row('max depth', 'max_depth', str)
+    row('node arrays', 'bytes', lambda b: f"{b / 1024:.0f} KiB")
+    row('file (joblib -> bundle)', 'file_bytes', lambda b: f"{b / 1024:.0f} KiB")
+    row('latency, 1 row', 'latency_ms_single_row', lambda ms: f"{ms:.3f} ms")
+    row('latency, test split', 'latency_ms_test_split', lambda ms: f"{ms:.3f} ms")
+    row('accuracy', 'accuracy', lambda a: f"{a:.2%}")
+    print(f"  {'prediction agreement':<26} {report['prediction_agreement']:.2%}")
+    print(f"  {'probability delta':<26} max {report['max_probability_delta']:.4f}, "
+          f"mean {report['mean_probability_delta']:.4f}")
+    print(f"  {'with a missing answer':<26} max {report['missing_answer_max_probability_delta']:.4f}")
+
+def compact_anxiety_model(output_path='anxiety_model.compact.bundle', max_accuracy_drop=MAX_ACCURACY_DROP,
+                          max_proba_delta=MAX_PROBA_DELTA, min_trees=MIN_TREES):
+    """Compact the anxiety forest into a bundle and report on the training script's held-out split."""
+    import joblib
+    import training
+    import train_anxiety_model as spec
+    model_path, column_info_path, label_encoder_path = MODELS['anxiety']
+
+    model = joblib.load(model_path)
+    column_info = load_json(column_info_path)
+    label_encoder = joblib.load(label_encoder_path)
+    df, _ = training.cached_dataset(spec.CSV_PATH, spec.prepare_dataset)
+    X_train, X_test, y_train, y_test = training.holdout_split(spec, df)
+    features = list(column_info)
+    X_train = X_train[features].to_numpy(dtype=float)
+    X_test = X_test[features].to_numpy(dtype=float)
+    means = np.array([column_info[feature]['mean'] for feature in features])
+    ranges = [column_info[feature]['range'] for feature in features]
+
+    original = FlatForest.from_sklearn(model)
+    all_trees = TreeCompactor(original, ranges).build(range(len(original.roots)))
+    # Quantizing and merging alone must not change any answer on the integer grid
+    grid = np.random.default_rng(0).integers([low for low, _ in ranges], [high + 1 for _, high in ranges],
+                                             size=(10000, len(ranges))).astype(np.float64)
+    check_parity(original, all_trees, np.vstack([grid, X_train, X_test]))
+    kept = select_trees(tree_probabilities(all_trees, X_train), y_train.to_numpy(), original.classes_,
+                        max_accuracy_drop, max_proba_delta, min_trees)
+    compacted = TreeCompactor(original, ranges).build(kept)
+
+    # Importances of the trees that remain, normalized as sklearn does for the whole forest
+    importances = np.mean([model.estimators_[i].feature_importances_ for i in kept], axis=0)
+    importances = importances / importances.sum() if importances.sum() else importances
+    size = write_bundle(output_path, compacted, column_info, importances, label_encoder.classes_.tolist(),
+                        sources={
+                            'model': file_info(model_path),
+                            'column_info': file_info(column_info_path),
+                            'label_encoder': file_info(label_encoder_path),
+                            'compaction': {
+                                'kept_trees': kept,
+                                'max_accuracy_drop': max_accuracy_drop,
+                                'max_proba_delta': max_proba_delta
+                            }
+                        })
+
+    report = compaction_report(original, load_bundle(output_path, verify=True).forest,
+                               X_test, y_test.to_numpy(), means)
+    report['file_bytes'] = [os.path.getsize(model_path), size]
+    report['nodes_after_quantize_and_merge'] = len(all_trees.feature)
+    report['output'] = output_path
+    with open(os.path.splitext(output_path)[0] + '.report.json', 'w') as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    print(f"\n✅ Wrote {output_path}; serve it with MODEL_FORMAT=bundle by copying it to {bundle_path(model_path)}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shrink the anxiety forest for integer questionnaire answers")
+    parser.add_argument('--output', default='anxiety_model.compact.bundle')
+    parser.add_argument('--max-accuracy-drop', type=float, default=MAX_ACCURACY_DROP,
+                        help="largest training-split accuracy loss allowed when dropping trees")
+    parser.add_argument('--max-proba-delta', type=float, default=MAX_PROBA_DELTA,
+                        help="largest mean probability change allowed when dropping trees")
+    parser.add_argument('--min-trees', type=int, default=MIN_TREES)
+    args = parser.parse_args()
+    try:
+        compact_anxiety_model(args.output, args.max_accuracy_drop, args.max_proba_delta, args.min_trees)
+    except Exception as e:
+        print(f"❌ Compaction failed: {str(e)}")
+        sys.exit(1)
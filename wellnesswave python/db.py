@@ -0,0 +1,174 @@
+import os
+import threading
+from pymongo import MongoClient, AsyncMongoClient, monitoring
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MONGO_URI = 'mongodb://localhost:27017/krishdb'
+
+def mongo_options_from_env():
+    """Read MongoClient pool, timeout and write-concern options from the environment.
+
+    The write concern is only passed when MONGO_WRITE_CONCERN_W or
+    MONGO_JOURNAL is set, so otherwise the URI's or server's default applies.
+    """
+    options = {
+        'maxPoolSize': int(os.getenv('MONGO_MAX_POOL_SIZE', 100)),
+        'minPoolSize': int(os.getenv('MONGO_MIN_POOL_SIZE', 0)),
+        'maxIdleTimeMS': int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 60000)),
+        'connectTimeoutMS': int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 5000)),
+        'serverSelectionTimeoutMS': int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+        'socketTimeoutMS': int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', 10000)),
+        'waitQueueTimeoutMS': int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000))
+    }
+    if os.getenv('MONGO_WRITE_CONCERN_W'):
+        options['w'] = _write_concern_w(os.getenv('MONGO_WRITE_CONCERN_W'))
+    if os.getenv('MONGO_JOURNAL'):
+        options['journal'] = os.getenv('MONGO_JOURNAL').lower() == 'true'
+    return options
+
+def _write_concern_w(value):
+    return int(value) if value.isdigit() else value
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Count connections per pool from pymongo's connection monitoring events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.checked_out = 0
+        self.created = 0
+        self.checkout_failures = 0
+
+    def _add(self, field, delta):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + delta)
+
+    def connection_created(self, event):
+        self._add('open', 1)
+        self._add('created', 1)
+
+    def connection_closed(self, event):
+        self._add('open', -1)
+
+    def connection_checked_out(self, event):
+        self._add('checked_out', 1)
+
+    def connection_checked_in(self, event):
+        self._add('checked_out', -1)
+
+    def connection_check_out_failed(self, event):
+        self._add('checkout_failures', 1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+class MongoManager:
+    """One lazily created MongoClient per process.
+
+    The client is only built on first use, and rebuilt if the process id
+    changed, so gunicorn workers forked from a preloaded master each get
+    their own connection pool instead of sharing the parent's sockets.
+    """
+
+    client_class = MongoClient
+
+    def __init__(self, uri=None, **options):
+        self.uri = uri or os.getenv('MONGO_URI', DEFAULT_MONGO_URI)
+        self.options = options or mongo_options_from_env()
+        self._lock = threading.Lock()
+        self._client = None
+        self._pid = None
+        self._pool_stats = None
+        self._on_connect = []
+
+    @property
+    def client(self):
+        """Return this process's MongoClient, creating it on first use."""
+        if self._client is None or self._pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._pid != os.getpid():
+                    self._pool_stats = PoolStatsListener()
+                    self._client = self.client_class(
+                        self.uri, event_listeners=[self._pool_stats], **self.options
+                    )
+                    self._pid = os.getpid()
+                    logger.info("Created %s for pid %d (maxPoolSize=%s)",
+                                self.client_class.__name__, self._pid, self.options.get('maxPoolSize'))
+                    for callback in self._on_connect:
+                        callback(self)
+        return self._client
+
+    def on_connect(self, callback):
+        """Call callback(manager) each time a process creates its client."""
+        self._on_connect.append(callback)
+
+    @property
+    def db(self):
+        return self.client.get_database()
+
+    def collection(self, name):
+        return self.db[name]
+
+    def stats(self):
+        """Connection-pool utilization for this process."""
+        if self._client is None or self._pid != os.getpid():
+            return {'client_initialized': False, 'max_pool_size': self.options.get('maxPoolSize')}
+        pool = self._pool_stats
+        max_pool_size = self.options.get('maxPoolSize') or 0
+        return {
+            'client_initialized': True,
+            'pid': self._pid,
+            'max_pool_size': max_pool_size,
+            'min_pool_size': self.options.get('minPoolSize'),
+            'open_connections': pool.open,
+            'in_use': pool.checked_out,
+            'utilization': pool.checked_out / max_pool_size if max_pool_size else None,
+            'connections_created': pool.created,
+            'checkout_failures': pool.checkout_failures
+        }
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+
+class AsyncMongoManager(MongoManager):
+    """MongoManager for asyncio code, backed by pymongo's AsyncMongoClient.
+
+    The client binds to the event loop it is first used on, so create and
+    use it from the serving loop only.
+    """
+
+    client_class = AsyncMongoClient
+
+    async def close(self):
+        client = self._client
+        self._client = None
+        if client is not None and self._pid == os.getpid():
+            await client.close()
+
+def mongo_manager_from_env(asynchronous=False):
+    """The assessment store selected by ASSESSMENT_STORE: 'mongo' (default) or 'memory'."""
+    if os.getenv('ASSESSMENT_STORE', 'mongo') == 'memory':
+        from memory_store import MemoryManager
+        latency = float(os.getenv('MEMORY_STORE_LATENCY_MS', 0)) / 1000
+        return MemoryManager(latency, asynchronous=asynchronous)
+    return AsyncMongoManager() if asynchronous else MongoManager()
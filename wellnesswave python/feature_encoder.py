@@ -0,0 +1,83 @@
+import numpy as np
+
+# Placeholder codes used by canonical_codes; never passed to the model
+UNKNOWN = -1
+MISSING = -2
+
+class CategoricalEncoder:
+    """Precompiled value->code tables for categorical questionnaire answers.
+
+    Built once from a column_info.json mapping. The column order is fixed to
+    the order of column_info, which is the order the model was trained on, and
+    every column gets a dict lookup instead of a list.index scan. Unknown or
+    missing answers encode to 0, matching encode_value.
+    """
+
+    def __init__(self, column_info, question_mapping=None):
+        question_mapping = question_mapping or {}
+        self.column_info = column_info
+        self.columns = list(column_info)
+        self.tables = [
+            dict(zip(info['values'], info['encoded_values']))
+            for info in column_info.values()
+        ]
+        # Input keys that feed each column: the frontend question names that
+        # are renamed to it, plus the column's own name
+        self.input_keys = [
+            tuple([key for key, target in question_mapping.items()
+                   if target == column and key != column] + [column])
+            for column in self.columns
+        ]
+        self._lookups = list(zip(self.input_keys, self.tables))
+
+    def encode(self, inputs):
+        """Encode a list of answer dicts into a C-contiguous (n_rows, n_columns) int array."""
+        try:
+            codes = [
+                [table.get(_answer(row, keys), 0) for keys, table in self._lookups]
+                for row in inputs
+            ]
+        except TypeError:
+            # Unhashable answers (lists, dicts) can never match a known value
+            codes = [
+                [_safe_code(table, _answer(row, keys)) for keys, table in self._lookups]
+                for row in inputs
+            ]
+        return np.array(codes, dtype=np.int64).reshape(len(inputs), len(self.columns))
+
+    def canonical_codes(self, input_data):
+        """Codes for one answer dict that keep missing and unrecognized answers apart.
+
+        encode() maps both to 0, which is also a real answer's code, so this
+        tuple is what to key caches on.
+        """
+        codes = []
+        for keys, table in self._lookups:
+            key = _present_key(input_data, keys)
+            if key is None:
+                codes.append(MISSING)
+            else:
+                codes.append(_safe_code(table, input_data[key], UNKNOWN))
+        return tuple(codes)
+
+    def encode_one(self, input_data):
+        """Encode a single answer dict into a (1, n_columns) int array."""
+        return self.encode([input_data])
+
+def _answer(row, keys):
+    for key in keys:
+        if key in row:
+            return row[key]
+    return None
+
+def _present_key(row, keys):
+    for key in keys:
+        if key in row:
+            return key
+    return None
+
+def _safe_code(table, value, default=0):
+    try:
+        return table.get(value, default)
+    except TypeError:
+        return default
@@ -0,0 +1,186 @@
+import os
+import sys
+import numpy as np
+
+# Upper bound on rows * trees evaluated in one step of predict_proba; small
+# enough that the per-level working arrays stay in cache
+CHUNK_NODES = 1 << 16
+
+# The level-by-level numpy walk beats sklearn's per-call overhead for small
+# batches, but sklearn's compiled traversal wins on large ones
+MAX_FLAT_BATCH = 512
+
+class FlatForest:
+    """A trained RandomForestClassifier packed into contiguous node arrays.
+
+    Every tree's nodes are concatenated into one set of arrays (feature,
+    threshold, the side a missing value takes, interleaved left/right
+    children and normalized leaf values), and predict_proba walks all trees
+    for all rows at once, one depth level per step. Leaves point back to
+    themselves so rows that finish early simply stay put. Probabilities
+    match sklearn's predict_proba for the same model, NaN answers included.
+    """
+
+    def __init__(self, feature, threshold, missing_go_to_left, children, value, roots, classes,
+                 n_features, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.missing_go_to_left = missing_go_to_left
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.n_features = int(n_features)
+        self.max_depth = int(max_depth)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Pack a fitted single-output RandomForestClassifier."""
+        if model.n_outputs_ != 1:
+            raise ValueError("Only single-output forests can be flattened")
+
+        features, thresholds, missing_left, children, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left < 0
+
+            # Leaves loop back to themselves on both branches
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            # sklearn before 1.3 has no missing-value routing; NaN fails <= and goes right
+            go_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=np.uint8))
+            missing_left.append(np.where(is_leaf, False, go_left.astype(bool)))
+            children.append(np.stack([
+                np.where(is_leaf, node_ids, tree.children_left),
+                np.where(is_leaf, node_ids, tree.children_right)
+            ], axis=1).ravel() + offset)
+
+            # Recent sklearn stores class fractions and uses them as is; older
+            # releases store weighted counts and normalize at predict time
+            value = tree.value[:, 0, :]
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            if not np.allclose(normalizer, 1.0):
+                normalizer[normalizer == 0.0] = 1.0
+                value = value / normalizer
+            values.append(value)
+
+            roots.append(offset)
+            offset += tree.node_count
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            missing_go_to_left=np.concatenate(missing_left).astype(bool),
+            children=np.concatenate(children).astype(np.intp),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.array(roots, dtype=np.intp),
+            classes=np.asarray(model.classes_),
+            n_features=model.n_features_in_,
+            max_depth=max(estimator.tree_.max_depth for estimator in model.estimators_)
+        )
+
+    def apply(self, X):
+        """Return the leaf index reached in every tree, shape (n_rows, n_trees)."""
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64).reshape(-1, self.n_features)
+        flat_X = X.ravel()
+        row_offsets = (np.arange(len(X), dtype=np.intp) * self.n_features)[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        has_missing = np.isnan(flat_X).any()
+        for _ in range(self.max_depth):
+            values = flat_X.take(row_offsets + self.feature.take(nodes))
+            go_right = values > self.threshold.take(nodes)
+            if has_missing:
+                # NaN fails every comparison; send it the way sklearn's splitter chose
+                go_right |= np.isnan(values) & ~self.missing_go_to_left.take(nodes)
+            nodes = self.children.take(2 * nodes + go_right)
+        return nodes
+
+    def predict_proba(self, X):
+        """Average the leaf class probabilities of every tree, like sklearn."""
+        X = np.asarray(X)
+        proba = np.empty((len(X), self.value.shape[1]))
+        # Bound the (rows, trees) working set for large batches
+        chunk = max(1, CHUNK_NODES // len(self.roots))
+        for start in range(0, len(X), chunk):
+            leaves = self.apply(X[start:start + chunk])
+            # Summing over the leading (tree) axis adds trees in order,
+            # matching sklearn's accumulation bit for bit
+            proba[start:start + chunk] = self.value[leaves.T].sum(axis=0)
+        proba /= len(self.roots)
+        return proba
+
+    def predict(self, X):
+        """Return the most probable class for each row."""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def save(self, path):
+        """Write the node arrays to an .npz file."""
+        np.savez(
+            path,
+            feature=self.feature,
+            threshold=self.threshold,
+            missing_go_to_left=self.missing_go_to_left,
+            children=self.children,
+            value=self.value,
+            roots=self.roots,
+            classes=self.classes_,
+            n_features=np.array(self.n_features),
+            max_depth=np.array(self.max_depth)
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Read a forest written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                feature=data['feature'],
+                threshold=data['threshold'],
+                missing_go_to_left=data['missing_go_to_left'],
+                children=data['children'],
+                value=data['value'],
+                roots=data['roots'],
+                classes=data['classes'],
+                n_features=data['n_features'],
+                max_depth=data['max_depth']
+            )
+
+def load_flat_forest(model_path):
+    """Load a joblib RandomForestClassifier and flatten it."""
+    import joblib
+    return FlatForest.from_sklearn(joblib.load(model_path))
+
+def export_path(model_path):
+    """Where the flattened copy of a joblib model is written."""
+    return os.path.splitext(model_path)[0] + '.forest.npz'
+
+def random_inputs(model, rows, seed=0):
+    """Random integer answers covering the questionnaire scales (0-5)."""
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 6, size=(rows, model.n_features_in_)).astype(np.float64)
+
+def check_parity(model, forest, X, atol=1e-12):
+    """Return the largest absolute difference from sklearn, raising if above atol."""
+    expected = model.predict_proba(X)
+    actual = forest.predict_proba(X)
+    max_diff = float(np.abs(expected - actual).max())
+    if max_diff > atol:
+        raise ValueError(f"Flattened forest differs from sklearn by {max_diff:.3g}")
+    return max_diff
+
+def export_model(model_path):
+    """Flatten a joblib RandomForestClassifier, verify parity and save it."""
+    import joblib
+    model = joblib.load(model_path)
+    forest = FlatForest.from_sklearn(model)
+    max_diff = check_parity(model, forest, random_inputs(model, 10000))
+    forest.save(export_path(model_path))
+    print(f"✅ Exported {model_path} -> {export_path(model_path)} "
+          f"({len(forest.roots)} trees, {len(forest.feature)} nodes, max diff {max_diff:.3g})")
+    return forest
+
+if __name__ == "__main__":
+    for model_path in sys.argv[1:] or ['anxiety_model.joblib', 'depression_model.joblib', 'model.joblib']:
+        export_model(model_path)
@@ -0,0 +1,43 @@
+# Production server for wsgi:app. Run with:  gunicorn -c gunicorn.conf.py wsgi:app
+# Graceful reload (e.g. after retraining):  kill -HUP <master pid>
+import gc
+import os
+import multiprocessing
+
+bind = os.getenv('BIND', '0.0.0.0:8000')
+
+# Worker processes and threads per worker
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Import wsgi (and load every model) once in the master; forked workers
+# share the loaded forest arrays copy-on-write instead of each loading a copy
+preload_app = True
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers after this many requests (0 disables); jitter avoids restarting them all at once
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+
+def on_reload(server):
+    """Refresh artifacts that changed on disk in the master before new workers fork."""
+    from anxiety_app import preload_models
+    preload_models()
+    server.log.info("Reloaded model artifacts in master before respawning workers")
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the garbage collector's reach so
+    # collections in the workers do not touch (and un-share) those pages
+    gc.freeze()
+
+def post_worker_init(worker):
+    # With PROFILER_ENABLED=1, `kill -USR2 <worker pid>` samples that worker
+    # for PROFILER_SECONDS (see profiler.py); a no-op otherwise
+    from profiler import install_signal_handler
+    install_signal_handler()
@@ -0,0 +1,40 @@
+import json
+import hashlib
+import datetime
+from flask import Response
+
+class JsonPayload:
+    """A JSON response body serialized once and served with ETag/Last-Modified.
+
+    Meant for data that only changes when a model is retrained: requests get
+    the prebuilt bytes, and a client that sends If-None-Match or
+    If-Modified-Since for the current version gets an empty 304.
+    """
+
+    def __init__(self, data, last_modified=None):
+        self.data = data
+        self.body = json.dumps(data).encode('utf-8')
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        # HTTP dates have whole-second precision
+        self.last_modified = (
+            datetime.datetime.fromtimestamp(int(last_modified), datetime.timezone.utc)
+            if last_modified is not None else None
+        )
+
+    def response(self, request):
+        """Build the response for request, answering 304 when the client's copy is current."""
+        response = Response(self.body, mimetype='application/json')
+        response.set_etag(self.etag)
+        if self.last_modified is not None:
+            response.last_modified = self.last_modified
+        # Clients may keep the body but must revalidate before reusing it
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+def importance_records(feature_names, importances):
+    """[{'feature', 'importance'}] sorted from most to least important."""
+    records = [
+        {'feature': feature, 'importance': float(importance)}
+        for feature, importance in zip(feature_names, importances)
+    ]
+    return sorted(records, key=lambda record: record['importance'], reverse=True)
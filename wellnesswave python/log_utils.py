@@ -0,0 +1,105 @@
+import os
+import sys
+import queue
+import atexit
+import random
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+# LOG_LEVEL=DEBUG turns on per-request payload dumps; keep it at INFO in production
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# Fraction of DEBUG records kept once debug logging is on
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', 1.0))
+# Records waiting for the writer thread; beyond this they are dropped, never waited on
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+
+ROOT_LOGGER_NAME = 'wellnesswave'
+
+_configure_lock = threading.Lock()
+_listener = None
+_listener_pid = None
+_queue_handler = None
+
+class SamplingFilter(logging.Filter):
+    """Keep only a random fraction of DEBUG records; other levels always pass."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hand records to the writer thread without formatting or blocking.
+
+    The message is formatted by the listener thread, so a request only pays
+    for creating the record. When the queue is full the record is dropped and
+    counted instead of stalling the request.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def _start_listener(root, stream_handler):
+    """Give this process its own queue and writer thread behind the root's queue handler."""
+    global _listener, _queue_handler, _listener_pid
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    if _queue_handler is None:
+        _queue_handler = NonBlockingQueueHandler(log_queue)
+        _queue_handler.addFilter(SamplingFilter(LOG_SAMPLE_RATE))
+        root.addHandler(_queue_handler)
+    else:
+        _queue_handler.queue = log_queue
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    _listener_pid = os.getpid()
+
+def _stop_listener():
+    # A forked child's copy of the parent's listener has no thread to stop
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+
+def _restart_after_fork():
+    """Threads do not survive fork, so a child (e.g. a gunicorn worker) starts its own writer."""
+    global _configure_lock
+    _configure_lock = threading.Lock()
+    if _listener is not None:
+        _start_listener(logging.getLogger(ROOT_LOGGER_NAME), _listener.handlers[0])
+
+def _configure():
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    root.setLevel(LOG_LEVEL)
+    root.propagate = False
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(
+        '%(asctime)s %(levelname)s %(name)s [%(threadName)s] %(message)s'
+    ))
+    _start_listener(root, stream_handler)
+    atexit.register(_stop_listener)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_restart_after_fork)
+
+def get_logger(name):
+    """Return a logger under the shared, queue-backed 'wellnesswave' logger.
+
+    Pass payloads as %-style arguments (logger.debug("input: %s", data)) so
+    they are only formatted when the record is actually written.
+    """
+    with _configure_lock:
+        if _listener is None:
+            _configure()
+    return logging.getLogger(f'{ROOT_LOGGER_NAME}.{name}')
@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+import numpy as np
+from model_registry import load_json
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+class ProbabilityTable:
+    """Every answer combination's predict_proba, precomputed into one dense array.
+
+    Rows are indexed by the mixed-radix number formed by the encoded answers
+    (the first column is the most significant digit), so scoring an encoded
+    row is a dot product with the strides and a single array lookup.
+    """
+
+    def __init__(self, radices, probabilities, classes):
+        self.radices = np.asarray(radices, dtype=np.int64)
+        self.probabilities = probabilities
+        self.classes_ = classes
+        # stride[i] = product of the radices after column i
+        self.strides = np.concatenate([np.cumprod(self.radices[::-1])[::-1][1:], [1]]).astype(np.int64)
+
+    @classmethod
+    def build(cls, model, column_info):
+        """Score every combination of encoded answers with the model."""
+        radices = [len(info['values']) for info in column_info.values()]
+        grid = np.indices(radices).reshape(len(radices), -1).T
+        probabilities = np.ascontiguousarray(model.predict_proba(grid))
+        return cls(radices, probabilities, np.asarray(model.classes_))
+
+    def index(self, X):
+        """Mixed-radix row index of each encoded row."""
+        return np.asarray(X, dtype=np.int64) @ self.strides
+
+    def predict_proba(self, X):
+        """Look up the precomputed probabilities for encoded rows."""
+        return self.probabilities[self.index(X)]
+
+    @property
+    def nbytes(self):
+        return self.probabilities.nbytes
+
+    def save(self, path):
+        """Write the table to an .npz file, replacing any old one atomically."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, radices=self.radices, probabilities=self.probabilities, classes=self.classes_)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read a table written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['radices'], data['probabilities'], data['classes'])
+
+def table_path(model_path):
+    """Where the table for a joblib model is persisted."""
+    return os.path.splitext(model_path)[0] + '.table.npz'
+
+def load_probability_table(model_path, column_info_path):
+    """Load the persisted table for model_path, building and saving it if stale."""
+    start = time.perf_counter()
+    column_info = load_json(column_info_path)
+    radices = [len(info['values']) for info in column_info.values()]
+    path = table_path(model_path)
+
+    # A table written after both of its inputs is still valid
+    if (os.path.exists(path) and
+            os.path.getmtime(path) >= max(os.path.getmtime(model_path), os.path.getmtime(column_info_path))):
+        table = ProbabilityTable.load(path)
+        if table.radices.tolist() == radices:
+            logger.info("Loaded probability table %s: %d rows, %.0f KiB in %.3fs", path,
+                        len(table.probabilities), table.nbytes / 1024, time.perf_counter() - start)
+            return table
+
+    import joblib
+    table = ProbabilityTable.build(joblib.load(model_path), column_info)
+    try:
+        table.save(path)
+    except OSError as e:
+        logger.warning("Could not persist probability table %s: %s", path, e)
+    logger.info("Built probability table %s: %d rows, %.0f KiB in %.3fs", path,
+                len(table.probabilities), table.nbytes / 1024, time.perf_counter() - start)
+    return table
+
+if __name__ == "__main__":
+    # Build at training time so servers only have to load the array
+    model_path = sys.argv[1] if len(sys.argv) > 1 else 'depression_model.joblib'
+    column_info_path = sys.argv[2] if len(sys.argv) > 2 else 'column_info.json'
+    if os.path.exists(table_path(model_path)):
+        os.remove(table_path(model_path))
+    load_probability_table(model_path, column_info_path)
@@ -0,0 +1,116 @@
+import time
+import asyncio
+import threading
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+from pymongo.results import InsertOneResult, InsertManyResult, UpdateResult, BulkWriteResult
+
+class UnsupportedByMemoryStore(PyMongoError):
+    """Raised for reads the memory store does not implement (queries and aggregations)."""
+
+class MemoryCollection:
+    """In-process stand-in for a Mongo collection, for benchmarks and tests without a server.
+
+    Documents are kept in a list. Each write sleeps for latency seconds to
+    imitate the round trip to a real server; updates are not applied.
+    Queries are not supported: find, count_documents and aggregate raise
+    UnsupportedByMemoryStore.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.documents = []
+        self._lock = threading.Lock()
+
+    def _store(self, documents):
+        with self._lock:
+            for document in documents:
+                document.setdefault('_id', ObjectId())
+                self.documents.append(document)
+        return [document['_id'] for document in documents]
+
+    def insert_one(self, document):
+        if self.latency:
+            time.sleep(self.latency)
+        return InsertOneResult(self._store([document])[0], True)
+
+    def insert_many(self, documents, ordered=True):
+        if self.latency:
+            time.sleep(self.latency)
+        return InsertManyResult(self._store(list(documents)), True)
+
+    def create_index(self, keys, name=None, **kwargs):
+        # Nothing to build, the documents are scanned in a list
+        return name
+
+    def update_one(self, filter, update, upsert=False):
+        # Updates only cost the round trip; the rollup counts are not kept
+        if self.latency:
+            time.sleep(self.latency)
+        return UpdateResult({'n': 1, 'nModified': 1}, True)
+
+    def bulk_write(self, requests, ordered=True):
+        if self.latency:
+            time.sleep(self.latency)
+        return BulkWriteResult({'nUpserted': 0, 'nModified': len(requests)}, True)
+
+    def _unsupported(self, *args, **kwargs):
+        raise UnsupportedByMemoryStore("Queries are not supported by the memory assessment store")
+
+    find = count_documents = aggregate = _unsupported
+
+class AsyncMemoryCollection(MemoryCollection):
+    """MemoryCollection with the awaitable write API of pymongo's async collections."""
+
+    async def insert_one(self, document):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return InsertOneResult(self._store([document])[0], True)
+
+    async def insert_many(self, documents, ordered=True):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return InsertManyResult(self._store(list(documents)), True)
+
+    async def create_index(self, keys, name=None, **kwargs):
+        return name
+
+    async def update_one(self, filter, update, upsert=False):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return UpdateResult({'n': 1, 'nModified': 1}, True)
+
+    async def bulk_write(self, requests, ordered=True):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return BulkWriteResult({'nUpserted': 0, 'nModified': len(requests)}, True)
+
+class MemoryManager:
+    """Drop-in for MongoManager/AsyncMongoManager that hands out memory collections."""
+
+    def __init__(self, latency=0.0, asynchronous=False):
+        self.latency = latency
+        self.asynchronous = asynchronous
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def collection(self, name):
+        with self._lock:
+            if name not in self._collections:
+                collection_class = AsyncMemoryCollection if self.asynchronous else MemoryCollection
+                self._collections[name] = collection_class(self.latency)
+            return self._collections[name]
+
+    def on_connect(self, callback):
+        """There is no connection to wait for, so callback(manager) runs right away."""
+        callback(self)
+
+    def stats(self):
+        return {
+            'backend': 'memory',
+            'latency_ms': self.latency * 1000,
+            'documents': {name: len(collection.documents) for name, collection in self._collections.items()}
+        }
+
+    def close(self):
+        self._collections.clear()
@@ -0,0 +1,262 @@
+import math
+import time
+import bisect
+import threading
+
+# Latency buckets in seconds, from sub-millisecond stages to slow Mongo round trips
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _format_value(value):
+    if value is None:
+        return 'NaN'
+    if isinstance(value, float) and math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+class CounterValue:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        yield name + '_total', labels, self.value
+
+class StageTimer:
+    """Context manager that observes the time spent inside it into a histogram."""
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+class HistogramValue:
+    __slots__ = ('bounds', 'counts', 'sum', '_lock')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # counts[i] is the number of observations in (bounds[i-1], bounds[i]]; the last is +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        return StageTimer(self)
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        cumulative = 0
+        for bound, count in zip(self.bounds + (math.inf,), counts):
+            cumulative += count
+            yield name + '_bucket', dict(labels, le=_format_value(float(bound))), cumulative
+        yield name + '_sum', labels, total
+        yield name + '_count', labels, cumulative
+
+class Metric:
+    """A named metric with one value per combination of label values."""
+
+    def __init__(self, name, help, kind, label_names, value_factory):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.label_names = tuple(label_names)
+        self._value_factory = value_factory
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """The value for these label values; look it up once and keep it on hot paths."""
+        values = tuple(str(value) for value in values)
+        value = self._values.get(values)
+        if value is None:
+            with self._lock:
+                value = self._values.setdefault(values, self._value_factory())
+        return value
+
+    def samples(self):
+        for values, value in list(self._values.items()):
+            yield from value.samples(self.name, dict(zip(self.label_names, values)))
+
+class MetricsRegistry:
+    """Process-wide metrics rendered in the Prometheus text format.
+
+    Counters and histograms are updated on the request path with one lock
+    acquisition each. Values that already live elsewhere (cache hit counts,
+    queue depths, pool usage) are read by collectors only when /metrics is
+    scraped, so they cost nothing per request. Each process reports its own
+    numbers; under gunicorn a scrape sees whichever worker answered.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def _register(self, name, help, kind, label_names, value_factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = Metric(name, help, kind, label_names, value_factory)
+                self._metrics[name] = metric
+            elif metric.kind != kind or metric.label_names != tuple(label_names):
+                raise ValueError(f"Metric {name} is already registered differently")
+            return metric
+
+    def counter(self, name, help, label_names=()):
+        """A monotonically increasing count; exported as name_total."""
+        return self._register(name, help, 'counter', label_names, CounterValue)
+
+    def histogram(self, name, help, label_names=(), buckets=DEFAULT_BUCKETS):
+        bounds = tuple(sorted(buckets))
+        return self._register(name, help, 'histogram', label_names, lambda: HistogramValue(bounds))
+
+    def collector(self, key, collect):
+        """Register collect() -> [(name, kind, help, labels, value)], replacing any under key."""
+        with self._lock:
+            self._collectors[key] = collect
+
+    def render(self):
+        families = {}
+        for metric in list(self._metrics.values()):
+            family = families.setdefault(metric.name, (metric.kind, metric.help, []))
+            family[2].extend(metric.samples())
+        for collect in list(self._collectors.values()):
+            for name, kind, help, labels, value in collect():
+                family = families.setdefault(name, (kind, help, []))
+                family[2].append((name + '_total' if kind == 'counter' else name, labels, value))
+
+        lines = []
+        for name, (kind, help, samples) in sorted(families.items()):
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+            for sample_name, labels, value in samples:
+                lines.append(f'{sample_name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+registry = MetricsRegistry()
+
+REQUESTS = registry.counter('wellnesswave_requests', 'HTTP requests handled',
+                            ['service', 'endpoint', 'method', 'status'])
+REQUEST_ERRORS = registry.counter('wellnesswave_request_errors', 'HTTP requests answered with a 5xx status',
+                                  ['service', 'endpoint'])
+REQUEST_SECONDS = registry.histogram('wellnesswave_request_seconds', 'Time to handle an HTTP request',
+                                     ['service', 'endpoint'])
+STAGE_SECONDS = registry.histogram('wellnesswave_stage_seconds', 'Time spent in each stage of a request',
+                                   ['pipeline', 'stage'])
+PREDICTION_ERRORS = registry.counter('wellnesswave_prediction_errors', 'Predictions that raised an error',
+                                     ['model'])
+
+def stage_timers(pipeline, stages):
+    """{stage: histogram} for one pipeline, resolved once so timing a stage is a dict lookup."""
+    return {stage: STAGE_SECONDS.labels(pipeline, stage) for stage in stages}
+
+def cache_samples(model, cache):
+    """Collector samples for a PredictionCache."""
+    stats = cache.stats()
+    labels = {'model': model}
+    return [
+        ('wellnesswave_prediction_cache_hits', 'counter', 'Prediction cache hits', labels, stats['hits']),
+        ('wellnesswave_prediction_cache_misses', 'counter', 'Prediction cache misses', labels, stats['misses']),
+        ('wellnesswave_prediction_cache_size', 'gauge', 'Results held in the prediction cache', labels, stats['size'])
+    ]
+
+def batcher_samples(model, batcher):
+    """Collector samples for a MicroBatcher, or none when batching is off."""
+    if batcher is None:
+        return []
+    stats = batcher.stats()
+    labels = {'model': model}
+    return [
+        ('wellnesswave_batcher_queue_depth', 'gauge', 'Predictions waiting for a batch', labels, stats['queue_depth']),
+        ('wellnesswave_batcher_requests', 'counter', 'Predictions submitted to the batcher', labels, stats['requests']),
+        ('wellnesswave_batcher_batches', 'counter', 'Batched model calls', labels, stats['batches']),
+        ('wellnesswave_batcher_rejected', 'counter', 'Predictions rejected because the queue was full',
+         labels, stats['rejected'])
+    ]
+
+def store_samples(mongo):
+    """Collector samples for a MongoManager's connection pool (or a memory store)."""
+    stats = mongo.stats()
+    if not stats.get('client_initialized'):
+        return []
+    return [
+        ('wellnesswave_mongo_pool_in_use', 'gauge', 'Connections checked out of the pool', {}, stats['in_use']),
+        ('wellnesswave_mongo_pool_open', 'gauge', 'Open pooled connections', {}, stats['open_connections']),
+        ('wellnesswave_mongo_pool_max_size', 'gauge', 'maxPoolSize', {}, stats['max_pool_size']),
+        ('wellnesswave_mongo_pool_checkout_failures', 'counter', 'Failed connection checkouts',
+         {}, stats['checkout_failures'])
+    ]
+
+def writer_samples(writer):
+    """Collector samples for a write-behind AssessmentWriter, or none when it is off."""
+    if writer is None:
+        return []
+    return [
+        ('wellnesswave_writer_queue_depth', 'gauge', 'Assessments waiting to be written', {}, writer.queue_depth()),
+        ('wellnesswave_writer_written', 'counter', 'Assessments written by the write-behind writer',
+         {}, writer.written),
+        ('wellnesswave_writer_failed', 'counter', 'Assessments the write-behind writer gave up on',
+         {}, writer.failed)
+    ]
+
+def instrument_blueprint(blueprint, service):
+    """Count and time every request routed to blueprint."""
+    from flask import g, request
+
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    def record(response):
+        start = g.pop('metrics_start', None)
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        if start is not None:
+            REQUEST_SECONDS.labels(service, endpoint).observe(time.perf_counter() - start)
+        REQUESTS.labels(service, endpoint, request.method, response.status_code).inc()
+        if response.status_code >= 500:
+            REQUEST_ERRORS.labels(service, endpoint).inc()
+        return response
+
+    blueprint.before_request(start_timer)
+    blueprint.after_request(record)
+
+def metrics_blueprint():
+    """A blueprint serving GET /metrics from the process-wide registry."""
+    from flask import Blueprint, Response
+    blueprint = Blueprint('metrics', __name__)
+
+    @blueprint.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+    return blueprint
@@ -0,0 +1,188 @@
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Upper bounds of the batch-size histogram buckets reported by stats()
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+class BatcherBusyError(Exception):
+    """Raised when the batcher's queue already holds max_queue requests."""
+
+class MicroBatcher:
+    """Coalesce concurrent single-item calls into one call of a batch function.
+
+    When nothing else is being scored, submit() runs batch_fn([item]) in
+    the calling thread, so sequential traffic pays no hand-off or wait.
+    Requests that arrive while a call is running are queued for a background
+    thread, which keeps collecting until max_batch_size requests are queued
+    or max_wait seconds have passed since the first one arrived, then calls
+    batch_fn(items) once and hands each caller its own result.
+
+    If batch_fn raises for a batch, each item is retried on its own so one
+    bad request does not fail the others. submit() raises BatcherBusyError
+    when max_queue requests are already waiting.
+    """
+
+    def __init__(self, batch_fn, max_wait=0.002, max_batch_size=64, max_queue=1024, name='batcher'):
+        self.batch_fn = batch_fn
+        self.max_wait = max_wait
+        self.max_batch_size = max_batch_size
+        self.max_queue = max_queue
+        self.name = name
+        self.requests = 0
+        self.inline = 0
+        self.batches = 0
+        self.rejected = 0
+        self.retried_batches = 0
+        self.queue_wait_seconds = 0.0
+        self.batch_sizes = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._running = 0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+
+    def _start(self):
+        """Start the worker thread for this process; a forked child starts its own."""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=self.max_queue)
+                    thread = threading.Thread(target=self._run, args=(self._queue,),
+                                              name=self.name, daemon=True)
+                    thread.start()
+                    self._pid = os.getpid()
+        return self._queue
+
+    def submit(self, item, timeout=None):
+        """Queue item, wait for its batch to run and return its result."""
+        requests = self._start()
+        with self._lock:
+            inline = self._running == 0 and requests.empty()
+            if inline:
+                self._running += 1
+                self.inline += 1
+                self.requests += 1
+        if inline:
+            try:
+                return self.batch_fn([item])[0]
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        future = Future()
+        try:
+            requests.put_nowait((item, future, time.monotonic()))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise BatcherBusyError(f"{self.name} queue is full")
+        return future.result(timeout)
+
+    def queue_depth(self):
+        """Number of requests waiting for a batch."""
+        if self._pid != os.getpid():
+            return 0
+        return self._queue.qsize()
+
+    def stats(self):
+        with self._lock:
+            batches = self.batches
+            queued = self.requests - self.inline
+            return {
+                'max_wait_ms': self.max_wait * 1000,
+                'max_batch_size': self.max_batch_size,
+                'max_queue': self.max_queue,
+                'queue_depth': self.queue_depth(),
+                'requests': self.requests,
+                'inline': self.inline,
+                'batches': batches,
+                'rejected': self.rejected,
+                'retried_batches': self.retried_batches,
+                'avg_batch_size': queued / batches if batches else 0.0,
+                'avg_queue_wait_ms': self.queue_wait_seconds * 1000 / queued if queued else 0.0,
+                'batch_size_histogram': {
+                    f'le_{bound}' if bound is not None else 'inf': count
+                    for bound, count in zip(BATCH_SIZE_BUCKETS + (None,), self.batch_sizes)
+                }
+            }
+
+    def _run(self, requests):
+        while True:
+            batch = self._next_batch(requests)
+            try:
+                self._execute(batch)
+            except Exception as e:
+                # Never leave a caller waiting, whatever went wrong
+                logger.error("%s failed to run a batch: %s", self.name, e)
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _next_batch(self, requests):
+        batch = [requests.get()]
+        # Counts as running while collecting, so new requests join this batch
+        with self._lock:
+            self._running += 1
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(requests.get(timeout=remaining))
+                else:
+                    batch.append(requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _execute(self, batch):
+        started = time.monotonic()
+        self._record(batch, started)
+        items = [item for item, _, _ in batch]
+        try:
+            results = self.batch_fn(items)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            logger.warning("%s batch of %d failed, retrying items one by one: %s", self.name, len(batch), e)
+            with self._lock:
+                self.retried_batches += 1
+            for item, future, _ in batch:
+                try:
+                    future.set_result(self.batch_fn([item])[0])
+                except Exception as item_error:
+                    future.set_exception(item_error)
+            return
+        finally:
+            with self._lock:
+                self._running -= 1
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def _record(self, batch, started):
+        size = len(batch)
+        bucket = next((i for i, bound in enumerate(BATCH_SIZE_BUCKETS) if size <= bound),
+                      len(BATCH_SIZE_BUCKETS))
+        with self._lock:
+            self.requests += size
+            self.batches += 1
+            self.batch_sizes[bucket] += 1
+            self.queue_wait_seconds += sum(started - enqueued for _, _, enqueued in batch)
+
+def batcher_from_env(batch_fn, name):
+    """A MicroBatcher configured from PREDICTION_BATCH_* settings, or None when batching is off."""
+    if os.getenv('PREDICTION_BATCHING', '0') != '1':
+        return None
+    return MicroBatcher(
+        batch_fn,
+        max_wait=float(os.getenv('PREDICTION_BATCH_MAX_WAIT_MS', 2)) / 1000,
+        max_batch_size=int(os.getenv('PREDICTION_BATCH_MAX_SIZE', 64)),
+        max_queue=int(os.getenv('PREDICTION_BATCH_QUEUE', 1024)),
+        name=name
+    )
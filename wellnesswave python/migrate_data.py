@@ -1,52 +1,174 @@
 from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
+from bson import json_util
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import threading
+import time
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv('db.env')
 
-def migrate_data():
+# Resume state; point it outside the checkout with MIGRATION_CHECKPOINT
+CHECKPOINT_PATH = os.getenv('MIGRATION_CHECKPOINT', 'migration_checkpoint.json')
+
+# Mongo's error code for a duplicate _id, hit when a resumed batch overlaps
+DUPLICATE_KEY_ERROR = 11000
+
+class Checkpoint:
+    """Last migrated _id and document count per collection, saved after every batch."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.state = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.state = json_util.loads(f.read())
+
+    def last_id(self, collection_name):
+        return self.state.get(collection_name, {}).get('last_id')
+
+    def migrated(self, collection_name):
+        return self.state.get(collection_name, {}).get('migrated', 0)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(json_util.dumps(self.state))
+        os.replace(tmp_path, self.path)
+
+    def update(self, collection_name, last_id, migrated):
+        with self._lock:
+            self.state[collection_name] = {'last_id': last_id, 'migrated': migrated}
+            self._save()
+
+    def reset(self, collection_name):
+        """Forget a collection's progress on disk too, so a failed fresh run cannot resume past it."""
+        with self._lock:
+            self.state.pop(collection_name, None)
+            self._save()
+
+def insert_batch(collection, documents):
+    """Insert a batch unordered; documents already present from an earlier run are skipped."""
+    try:
+        return len(collection.insert_many(documents, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        errors = e.details.get('writeErrors', [])
+        other_errors = [error for error in errors if error.get('code') != DUPLICATE_KEY_ERROR]
+        if other_errors:
+            raise
+        return e.details.get('nInserted', 0)
+
+def migrate_collection(old_db, new_db, collection_name, checkpoint, batch_size, fresh=False):
+    """Stream one collection in _id order, resuming after the last checkpointed _id."""
+    old_collection = old_db[collection_name]
+    new_collection = new_db[collection_name]
+
+    if fresh:
+        # Only clear the target when explicitly asked; a resumed run keeps it
+        new_collection.delete_many({})
+        checkpoint.reset(collection_name)
+        print(f"✅ Cleared {collection_name} collection in target database")
+
+    last_id = checkpoint.last_id(collection_name)
+    migrated = checkpoint.migrated(collection_name)
+    if last_id is not None:
+        print(f"ℹ️ Resuming {collection_name} after _id {last_id} ({migrated} already migrated)")
+
+    query = {'_id': {'$gt': last_id}} if last_id is not None else {}
+    cursor = old_collection.find(query).sort('_id', 1).batch_size(batch_size)
+
+    start = time.perf_counter()
+    copied = 0
+    batch = []
+    for document in cursor:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            copied += flush_batch(new_collection, collection_name, batch, checkpoint, migrated + copied)
+            batch = []
+            elapsed = time.perf_counter() - start
+            print(f"   {collection_name}: {migrated + copied} documents ({copied / elapsed:.0f} docs/s)")
+    if batch:
+        copied += flush_batch(new_collection, collection_name, batch, checkpoint, migrated + copied)
+
+    elapsed = time.perf_counter() - start
+    if copied:
+        print(f"✅ Migrated {copied} documents from {collection_name} in {elapsed:.1f}s "
+              f"({copied / elapsed:.0f} docs/s)")
+    else:
+        print(f"ℹ️ No new documents found in {collection_name}")
+    return copied
+
+def flush_batch(new_collection, collection_name, batch, checkpoint, migrated_before):
+    """Write one batch, record its last _id and return how many documents were inserted."""
+    inserted = insert_batch(new_collection, batch)
+    checkpoint.update(collection_name, batch[-1]['_id'], migrated_before + inserted)
+    return inserted
+
+def migrate_data(batch_size=1000, parallel=False, fresh=False,
+                 checkpoint_path=CHECKPOINT_PATH, collections=("users", "assessments")):
+    old_client = None
+    new_client = None
     try:
         # Connect to both databases
         old_uri = "mongodb://localhost:27017/mental_health_db"
         new_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/krishdb')
-        
+
         old_client = MongoClient(old_uri)
         new_client = MongoClient(new_uri)
-        
+
         old_db = old_client["mental_health_db"]
         new_db = new_client["krishdb"]
-        
-        # Collections to migrate
-        collections = ["users", "assessments"]
-        
-        for collection_name in collections:
-            # Get data from old database
-            old_collection = old_db[collection_name]
-            new_collection = new_db[collection_name]
-            
-            # Clear the target collection first
-            new_collection.delete_many({})
-            print(f"✅ Cleared {collection_name} collection in target database")
-            
-            # Get all documents
-            documents = list(old_collection.find())
-            
-            if documents:
-                # Insert into new database
-                new_collection.insert_many(documents)
-                print(f"✅ Migrated {len(documents)} documents from {collection_name}")
-            else:
-                print(f"ℹ️ No documents found in {collection_name}")
-        
-        print("✅ Migration completed successfully")
-        
+
+        checkpoint = Checkpoint(checkpoint_path)
+        start = time.perf_counter()
+
+        if parallel:
+            with ThreadPoolExecutor(max_workers=len(collections)) as executor:
+                futures = [
+                    executor.submit(migrate_collection, old_db, new_db, name, checkpoint, batch_size, fresh)
+                    for name in collections
+                ]
+                total = sum(future.result() for future in futures)
+        else:
+            total = sum(
+                migrate_collection(old_db, new_db, name, checkpoint, batch_size, fresh)
+                for name in collections
+            )
+
+        elapsed = time.perf_counter() - start
+        print(f"✅ Migration completed successfully: {total} documents in {elapsed:.1f}s "
+              f"({total / elapsed if elapsed else 0:.0f} docs/s)")
+
     except Exception as e:
         print(f"❌ Migration failed: {str(e)}")
+        print("ℹ️ Run again to resume from the last checkpoint")
     finally:
         # Close connections
-        old_client.close()
-        new_client.close()
+        if old_client is not None:
+            old_client.close()
+        if new_client is not None:
+            new_client.close()
 
 if __name__ == "__main__":
-    migrate_data() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Copy users and assessments into the new database")
+    parser.add_argument('--batch-size', type=int, default=1000, help="documents per read/insert batch")
+    parser.add_argument('--parallel', action='store_true', help="migrate collections concurrently")
+    parser.add_argument('--fresh', action='store_true',
+                        help="clear the target collections and ignore any checkpoint")
+    parser.add_argument('--checkpoint', default=CHECKPOINT_PATH,
+                        help="file recording the last migrated _id per collection")
+    parser.add_argument('--collections', nargs='+', default=["users", "assessments"])
+    args = parser.parse_args()
+
+    migrate_data(
+        batch_size=args.batch_size,
+        parallel=args.parallel,
+        fresh=args.fresh,
+        checkpoint_path=args.checkpoint,
+        collections=args.collections
+    )
@@ -0,0 +1,224 @@
+import os
+import sys
+import json
+import time
+import struct
+import hashlib
+import datetime
+import numpy as np
+from flat_forest import FlatForest, random_inputs, check_parity
+from model_registry import load_json
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+MAGIC = b'WWMODEL\0'
+# 2 added missing_go_to_left; version 1 bundles must be converted again
+FORMAT_VERSION = 2
+# magic, format version, header length
+PREAMBLE = struct.Struct('<8sII')
+# Every array starts on a cache-line boundary
+ALIGNMENT = 64
+
+# Forest arrays in the order they are written, with their on-disk dtypes
+FOREST_ARRAYS = {
+    'feature': '<i8',
+    'threshold': '<f8',
+    'missing_go_to_left': '|b1',
+    'children': '<i8',
+    'value': '<f8',
+    'roots': '<i8'
+}
+
+class BundleError(ValueError):
+    """The file is not a readable model bundle: wrong format, version, size or checksum."""
+
+class BundleLabelEncoder:
+    """The parts of a fitted LabelEncoder that prediction uses, rebuilt from the stored classes."""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes, dtype=object)
+
+    def transform(self, labels):
+        index = {label: i for i, label in enumerate(self.classes_)}
+        return np.array([index[label] for label in labels])
+
+    def inverse_transform(self, codes):
+        return self.classes_[np.asarray(codes, dtype=np.intp)]
+
+class ModelBundle:
+    """A forest, its column metadata and label classes read from one bundle file.
+
+    The node arrays are views into a read-only memory map of the file, so
+    loading costs a header parse and every process that maps the same file
+    shares one copy in the page cache. It stands in for the sklearn model:
+    predict_proba, classes_, feature_importances_ and n_features_in_ behave
+    the same, with scoring done by the flattened forest.
+    """
+
+    def __init__(self, path, forest, header):
+        self.path = path
+        self.forest = forest
+        self.header = header
+        self.column_info = header['column_info']
+        self.feature_names = list(self.column_info)
+        self.classes_ = forest.classes_
+        self.n_features_in_ = forest.n_features
+        self.feature_importances_ = np.array(header['feature_importances'], dtype=float)
+        label_classes = header.get('label_classes')
+        self.label_encoder = BundleLabelEncoder(label_classes) if label_classes is not None else None
+
+    def predict_proba(self, X):
+        return self.forest.predict_proba(X)
+
+    def predict(self, X):
+        return self.forest.predict(X)
+
+def bundle_path(model_path):
+    """Where the bundle converted from a joblib model is written."""
+    return os.path.splitext(model_path)[0] + '.bundle'
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def file_info(path):
+    if path is None:
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return {'path': os.path.basename(path), 'size': os.path.getsize(path), 'sha256': digest.hexdigest()}
+
+def write_bundle(path, forest, column_info, feature_importances, label_classes=None, sources=None):
+    """Write forest and its metadata to path as one bundle file.
+
+    The file is written next to path and renamed over it, so processes that
+    still map the old version keep reading a complete file.
+    """
+    arrays = {name: np.ascontiguousarray(getattr(forest, name), dtype=dtype)
+              for name, dtype in FOREST_ARRAYS.items()}
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _aligned(offset)
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+    data_size = offset
+
+    digest = hashlib.sha256()
+    position = 0
+    for name, array in arrays.items():
+        digest.update(b'\0' * (layout[name]['offset'] - position))
+        digest.update(array.data)
+        position = layout[name]['offset'] + array.nbytes
+
+    header = {
+        'format_version': FORMAT_VERSION,
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'arrays': layout,
+        'data_size': data_size,
+        'data_sha256': digest.hexdigest(),
+        'classes': forest.classes_.tolist(),
+        'n_features': forest.n_features,
+        'max_depth': forest.max_depth,
+        'column_info': column_info,
+        'feature_importances': [float(importance) for importance in feature_importances],
+        'label_classes': list(label_classes) if label_classes is not None else None,
+        'sources': sources or {}
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = _aligned(PREAMBLE.size + len(header_bytes))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b'\0' * (data_start - f.tell()))
+        for name, array in arrays.items():
+            f.write(b'\0' * (data_start + layout[name]['offset'] - f.tell()))
+            f.write(array.data)
+    os.replace(tmp_path, path)
+    return data_start + data_size
+
+def read_header(path):
+    """(header, data_start) of a bundle file, checking its magic and version."""
+    with open(path, 'rb') as f:
+        preamble = f.read(PREAMBLE.size)
+        if len(preamble) < PREAMBLE.size:
+            raise BundleError(f"{path} is too short to be a model bundle")
+        magic, version, header_size = PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise BundleError(f"{path} is not a model bundle")
+        if version != FORMAT_VERSION:
+            raise BundleError(f"{path} has bundle format {version}, this code reads {FORMAT_VERSION}")
+        try:
+            header = json.loads(f.read(header_size))
+        except ValueError:
+            raise BundleError(f"{path} has a corrupt header")
+    return header, _aligned(PREAMBLE.size + header_size)
+
+def load_bundle(path, verify=None):
+    """Memory-map a bundle written by write_bundle.
+
+    verify checks the data checksum, which reads the whole file once; it
+    defaults to the MODEL_BUNDLE_VERIFY setting (on unless set to 0).
+    """
+    start = time.perf_counter()
+    if verify is None:
+        verify = os.getenv('MODEL_BUNDLE_VERIFY', '1') == '1'
+    header, data_start = read_header(path)
+    if os.path.getsize(path) < data_start + header['data_size']:
+        raise BundleError(f"{path} is truncated")
+
+    data = np.memmap(path, dtype=np.uint8, mode='r', offset=data_start, shape=(header['data_size'],))
+    if verify and hashlib.sha256(data).hexdigest() != header['data_sha256']:
+        raise BundleError(f"{path} failed its checksum")
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape']))
+        end = spec['offset'] + count * dtype.itemsize
+        array = data[spec['offset']:end].view(dtype).reshape(spec['shape']).view(np.ndarray)
+        # Index arrays must match the platform's index type to be used with take()
+        arrays[name] = array if dtype != np.int64 or np.dtype(np.intp) == np.int64 else array.astype(np.intp)
+
+    forest = FlatForest(classes=np.array(header['classes']), n_features=header['n_features'],
+                        max_depth=header['max_depth'], **arrays)
+    logger.info("Mapped model bundle %s: %d trees, %.0f KiB in %.3fs%s", path, len(forest.roots),
+                header['data_size'] / 1024, time.perf_counter() - start, '' if verify else ' (unverified)')
+    return ModelBundle(path, forest, header)
+
+def convert(model_path, column_info_path, label_encoder_path=None, output_path=None):
+    """Convert a joblib forest plus its metadata files into a bundle and check it scores the same."""
+    import joblib
+    output_path = output_path or bundle_path(model_path)
+    model = joblib.load(model_path)
+    forest = FlatForest.from_sklearn(model)
+    label_classes = None
+    if label_encoder_path is not None:
+        label_classes = joblib.load(label_encoder_path).classes_.tolist()
+
+    size = write_bundle(
+        output_path, forest, load_json(column_info_path), model.feature_importances_, label_classes,
+        sources={
+            'model': file_info(model_path),
+            'column_info': file_info(column_info_path),
+            'label_encoder': file_info(label_encoder_path)
+        }
+    )
+    max_diff = check_parity(model, load_bundle(output_path, verify=True), random_inputs(model, 10000))
+    print(f"✅ Converted {model_path} -> {output_path} "
+          f"({len(forest.roots)} trees, {size / 1024:.0f} KiB, max diff {max_diff:.3g})")
+    return output_path
+
+# The artifacts each service loads, for converting them all at once
+MODELS = {
+    'anxiety': ('anxiety_model.joblib', 'anxiety_column_info.json', 'anxiety_label_encoder.joblib'),
+    'depression': ('depression_model.joblib', 'column_info.json', None)
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or list(MODELS):
+        convert(*MODELS[name])
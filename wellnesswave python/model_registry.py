@@ -0,0 +1,77 @@
+import os
+import json
+import threading
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+def load_joblib(path):
+    """Default loader; joblib (and the sklearn classes it unpickles) is imported on first use."""
+    import joblib
+    return joblib.load(path)
+
+def load_json(path):
+    """Load a JSON artifact such as column_info.json."""
+    with open(path, 'r') as f:
+        return json.load(f)
+
+class ModelRegistry:
+    """Process-wide cache of loaded model artifacts.
+
+    Each artifact is keyed by its absolute path, the loader used to read it and
+    the file's mtime, so one file can back several derived objects (such as a
+    sklearn model and its flattened forest). A lookup with an unchanged mtime
+    returns the already-loaded object; if the file was replaced on disk the new
+    version is loaded and swapped in atomically, so concurrent readers always
+    see either the old or the new object.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._listeners = []
+
+    def get(self, path, loader=load_joblib):
+        """Return loader(path), loading it at most once per mtime."""
+        path = os.path.abspath(path)
+        key = (path, loader)
+        mtime = os.stat(path).st_mtime_ns
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+
+        with self._lock:
+            # Another thread may have loaded this version while we waited
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != mtime:
+                reloaded = entry is not None
+                entry = (mtime, loader(path))
+                self._entries[key] = entry
+                logger.info("Loaded model artifact %s with %s", path, loader.__name__)
+                if reloaded:
+                    self._notify(path)
+            return entry[1]
+
+    def add_reload_listener(self, callback, paths):
+        """Call callback() whenever one of paths is reloaded after a change on disk."""
+        watched = {os.path.abspath(path) for path in paths}
+        self._listeners.append((watched, callback))
+
+    def _notify(self, path):
+        for watched, callback in self._listeners:
+            if path in watched:
+                callback()
+
+    def preload(self, artifacts):
+        """Load a list of (path, loader) pairs, typically at startup."""
+        for path, loader in artifacts:
+            self.get(path, loader)
+
+    def clear(self):
+        """Drop every cached artifact so the next lookup reloads from disk."""
+        with self._lock:
+            self._entries = {}
+        for _, callback in self._listeners:
+            callback()
+
+registry = ModelRegistry()
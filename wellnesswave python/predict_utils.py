@@ -1,17 +1,93 @@
-import joblib
 import pandas as pd
-import numpy as np
-import json
+import os
+from model_registry import registry, load_json
+from feature_encoder import CategoricalEncoder
+from flat_forest import load_flat_forest, MAX_FLAT_BATCH
+from model_bundle import load_bundle, bundle_path
+from prediction_cache import PredictionCache
+from lookup_table import load_probability_table
+from json_payload import JsonPayload, importance_records
+from symptom_rules import DepressionSymptomRules
+from micro_batcher import batcher_from_env
+from metrics import registry as metrics_registry, stage_timers, cache_samples, batcher_samples, PREDICTION_ERRORS
+from log_utils import get_logger
+
+MODEL_PATH = 'depression_model.joblib'
+COLUMN_INFO_PATH = 'column_info.json'
+
+logger = get_logger(__name__)
+
+# Map the question names to match the training data columns
+QUESTION_MAPPING = {
+    "Age": "Age",
+    "Feeling sad": "Feeling sad",
+    "Irritable towards people": "Irritable towards people",
+    "Sleep problems": "Trouble sleeping at night",
+    "Problems concentrating or making decision": "Problems concentrating or making decision",
+    "Appetite changes": "loss of appetite",
+    "Feeling of guilt": "Feeling of guilt",
+    "Problems of bonding with people": "Problems of bonding with people",
+    "Suicidal thoughts": "Suicide attempt"
+}
+
+# Define symptoms to analyze
+SYMPTOMS = {
+    'Feeling sad': {'severe': ['Yes'], 'moderate': ['Sometimes']},
+    'Trouble sleeping at night': {'severe': ['Yes'], 'moderate': ['Two or more days a week']},
+    'Problems concentrating or making decision': {'severe': ['Yes'], 'moderate': ['Often']},
+    'loss of appetite': {'severe': ['Yes'], 'moderate': ['Not at all']},
+    'Feeling of guilt': {'severe': ['Yes'], 'moderate': ['Maybe']},
+    'Irritable towards people': {'severe': ['Yes'], 'moderate': ['Sometimes']},
+    'Problems of bonding with people': {'severe': ['Yes'], 'moderate': ['Sometimes']},
+    'Suicide attempt': {'severe': ['Yes'], 'moderate': ['Not interested to say']}
+}
+
+# Map frontend questions to backend symptoms
+SYMPTOM_MAPPING = {
+    'Feeling sad': 'Feeling sad',
+    'Sleep problems': 'Trouble sleeping at night',
+    'Problems concentrating or making decision': 'Problems concentrating or making decision',
+    'Appetite changes': 'loss of appetite',
+    'Feeling of guilt': 'Feeling of guilt',
+    'Irritable towards people': 'Irritable towards people',
+    'Problems of bonding with people': 'Problems of bonding with people',
+    'Suicidal thoughts': 'Suicide attempt'
+}
+
+# The rules above compiled into lookup tables; a severe suicide answer always escalates
+symptom_rules = DepressionSymptomRules(SYMPTOMS, SYMPTOM_MAPPING, ['Suicide attempt'])
+
+# Table mode answers every prediction from a precomputed probability table
+TABLE_MODE = os.getenv('DEPRESSION_TABLE_MODE', '0') == '1'
+
+# 'bundle' serves from the memory-mapped file written by model_bundle.py
+# instead of the joblib pickle; table mode still builds from the pickle
+BUNDLE_PATH = bundle_path(MODEL_PATH)
+MODEL_FORMAT = os.getenv('MODEL_FORMAT', 'joblib')
+
+_encoder = None
+_importance_payload = None
+
+# Repeated answer patterns skip scoring and symptom analysis entirely
+prediction_cache = PredictionCache(int(os.getenv('PREDICTION_CACHE_SIZE', 4096)))
+registry.add_reload_listener(prediction_cache.clear, [MODEL_PATH, COLUMN_INFO_PATH, BUNDLE_PATH])
+
+# Latency histograms for each step of a prediction, exported on /metrics
+stages = stage_timers('depression', ['preprocess', 'predict_proba', 'symptoms', 'batched'])
+prediction_errors = PREDICTION_ERRORS.labels('depression')
 
 def load_model_components():
     """Load the trained model and preprocessing components."""
     try:
-        model = joblib.load('depression_model.joblib')
-        with open('column_info.json', 'r') as f:
-            column_info = json.load(f)
+        if MODEL_FORMAT == 'bundle':
+            bundle = registry.get(BUNDLE_PATH, load_bundle)
+            return bundle, bundle.column_info
+
+        model = registry.get(MODEL_PATH)
+        column_info = registry.get(COLUMN_INFO_PATH, load_json)
         return model, column_info
     except Exception as e:
-        print(f"Error loading model components: {str(e)}")
+        logger.error("Error loading model components: %s", e)
         raise
 
 def encode_value(value, column_info):
@@ -20,161 +96,185 @@ def encode_value(value, column_info):
         return column_info['encoded_values'][column_info['values'].index(value)]
     return 0  # Default to 0 if value not found
 
+def get_forest():
+    """Return the flattened copy of the depression forest used for scoring."""
+    if MODEL_FORMAT == 'bundle':
+        return registry.get(BUNDLE_PATH, load_bundle).forest
+    return registry.get(MODEL_PATH, load_flat_forest)
+
+def load_table(model_path):
+    """Registry loader for the depression probability table."""
+    return load_probability_table(model_path, COLUMN_INFO_PATH)
+
+def get_scorer(batch_size=1):
+    """Return the object whose predict_proba scores encoded rows of this batch size."""
+    if TABLE_MODE:
+        return registry.get(MODEL_PATH, load_table)
+    if batch_size <= MAX_FLAT_BATCH:
+        return get_forest()
+    model, _ = load_model_components()
+    return model
+
+def get_encoder():
+    """Return the precompiled encoder, rebuilding it if column_info was reloaded."""
+    global _encoder
+    _, column_info = load_model_components()
+    encoder = _encoder
+    if encoder is None or encoder.column_info is not column_info:
+        encoder = CategoricalEncoder(column_info, QUESTION_MAPPING)
+        _encoder = encoder
+    return encoder
+
+def prediction_cache_key(input_data):
+    """Canonical cache key: the answer codes plus which symptom questions were answered."""
+    present = tuple(name in input_data for name in SYMPTOM_MAPPING)
+    return get_encoder().canonical_codes(input_data), present
+
 def preprocess_input(input_data):
     """Preprocess the input data for prediction."""
     try:
-        print("Starting preprocessing with input:", input_data)
-        model, column_info = load_model_components()
-        
-        # Create a DataFrame with the input data
-        df = pd.DataFrame([input_data])
-        print("Created DataFrame:", df)
-        
-        # Map the question names to match the training data columns
-        question_mapping = {
-            "Age": "Age",
-            "Feeling sad": "Feeling sad",
-            "Irritable towards people": "Irritable towards people",
-            "Sleep problems": "Trouble sleeping at night",
-            "Problems concentrating or making decision": "Problems concentrating or making decision",
-            "Appetite changes": "loss of appetite",
-            "Feeling of guilt": "Feeling of guilt",
-            "Problems of bonding with people": "Problems of bonding with people",
-            "Suicidal thoughts": "Suicide attempt"
-        }
-        
-        # Rename columns based on mapping
-        df = df.rename(columns=question_mapping)
-        print("After renaming columns:", df.columns)
+        logger.debug("Starting preprocessing with input: %s", input_data)
         
-        # Create a new DataFrame with required columns
-        processed_df = pd.DataFrame()
+        # Encode straight into a (1, n_features) array in training column order
+        processed_data = get_encoder().encode_one(input_data)
         
-        # Process each column according to column_info
-        for col_name, info in column_info.items():
-            if col_name in df.columns:
-                value = df[col_name].iloc[0]
-                encoded_value = encode_value(value, info)
-            else:
-                # Use default value if column is missing
-                encoded_value = 0
-            processed_df[col_name] = [encoded_value]
-        
-        print("Final preprocessed data:", processed_df)
-        return processed_df
+        logger.debug("Final preprocessed data: %s", processed_data)
+        return processed_data
     except Exception as e:
-        print(f"Error in preprocessing: {str(e)}")
+        logger.error("Error in preprocessing: %s", e)
         raise
 
 def analyze_symptoms(processed_data, original_data):
     """Analyze the severity and patterns of symptoms."""
     try:
-        print("Analyzing symptoms with data:", original_data)
-        # Define symptoms to analyze
-        symptoms = {
-            'Feeling sad': {'severe': ['Yes'], 'moderate': ['Sometimes']},
-            'Trouble sleeping at night': {'severe': ['Yes'], 'moderate': ['Two or more days a week']},
-            'Problems concentrating or making decision': {'severe': ['Yes'], 'moderate': ['Often']},
-            'loss of appetite': {'severe': ['Yes'], 'moderate': ['Not at all']},
-            'Feeling of guilt': {'severe': ['Yes'], 'moderate': ['Maybe']},
-            'Irritable towards people': {'severe': ['Yes'], 'moderate': ['Sometimes']},
-            'Problems of bonding with people': {'severe': ['Yes'], 'moderate': ['Sometimes']},
-            'Suicide attempt': {'severe': ['Yes'], 'moderate': ['Not interested to say']}
-        }
-        
-        # Initialize symptom analysis
-        symptom_analysis = {
-            'severe_symptoms': [],
-            'moderate_symptoms': [],
-            'mild_symptoms': []
-        }
-        
-        # Map frontend questions to backend symptoms
-        symptom_mapping = {
-            'Feeling sad': 'Feeling sad',
-            'Sleep problems': 'Trouble sleeping at night',
-            'Problems concentrating or making decision': 'Problems concentrating or making decision',
-            'Appetite changes': 'loss of appetite',
-            'Feeling of guilt': 'Feeling of guilt',
-            'Irritable towards people': 'Irritable towards people',
-            'Problems of bonding with people': 'Problems of bonding with people',
-            'Suicidal thoughts': 'Suicide attempt'
-        }
-        
-        # Analyze each symptom
-        for frontend_name, backend_name in symptom_mapping.items():
-            if frontend_name in original_data:
-                value = original_data[frontend_name]
-                if backend_name in symptoms:
-                    if value in symptoms[backend_name]['severe']:
-                        symptom_analysis['severe_symptoms'].append(backend_name)
-                    elif value in symptoms[backend_name]['moderate']:
-                        symptom_analysis['moderate_symptoms'].append(backend_name)
-                    else:
-                        symptom_analysis['mild_symptoms'].append(backend_name)
-        
-        print("Symptom analysis result:", symptom_analysis)
+        logger.debug("Analyzing symptoms with data: %s", original_data)
+        symptom_analysis = symptom_summary(symptom_rules.classify([original_data]), 0)
+        logger.debug("Symptom analysis result: %s", symptom_analysis)
         return symptom_analysis
     except Exception as e:
-        print(f"Error in symptom analysis: {str(e)}")
+        logger.error("Error in symptom analysis: %s", e)
         raise
 
+def symptom_summary(symptoms, row):
+    """Severe/moderate/mild symptom names for one row of classified symptoms."""
+    return {
+        'severe_symptoms': symptoms.names_at(symptoms.severe, row),
+        'moderate_symptoms': symptoms.names_at(symptoms.moderate, row),
+        'mild_symptoms': symptoms.names_at(symptoms.mild, row)
+    }
+
+def build_results(inputs, probabilities):
+    """Apply the symptom rules and risk levels to scored rows, shared by single and batch predictions."""
+    symptoms = symptom_rules.classify(inputs)
+    interpretation_index, confidences = symptom_rules.decide(symptoms, probabilities)
+    return [
+        {
+            'category': symptom_rules.INTERPRETATIONS[interpretation_index[i]],
+            'probability': float(confidences[i]),
+            'symptom_summary': symptom_summary(symptoms, i)
+        }
+        for i in range(len(inputs))
+    ]
+
 def predict_depression(input_data):
     """Make a prediction for depression with enhanced analysis."""
     try:
-        print("Starting prediction with input:", input_data)
-        # Keep original data for symptom analysis
-        original_data = input_data.copy()
-        
-        # Preprocess the input data
-        processed_data = preprocess_input(input_data)
-        
-        # Get model probability
-        model, _ = load_model_components()
-        probability = model.predict_proba(processed_data)[0]
-        print("Model probability:", probability)
+        logger.debug("Starting prediction with input: %s", input_data)
+        cache_key = prediction_cache_key(input_data)
+        generation = prediction_cache.generation
+        cached = prediction_cache.get(cache_key)
+        if cached is not None:
+            return cached
         
-        # Get symptom analysis using original data
-        symptom_analysis = analyze_symptoms(processed_data, original_data)
-        
-        # Calculate risk level and interpretation
-        if len(symptom_analysis['severe_symptoms']) == 0 and len(symptom_analysis['moderate_symptoms']) == 0:
-            interpretation = "Not Depressed"
-            confidence = 0.95
-        elif 'Suicide attempt' in symptom_analysis['severe_symptoms'] or len(symptom_analysis['severe_symptoms']) >= 3:
-            interpretation = "High Risk of Depression"
-            confidence = max(probability[1], 0.9)
-        elif len(symptom_analysis['severe_symptoms']) >= 2:
-            interpretation = "Likely Depressed"
-            confidence = probability[1]
-        elif len(symptom_analysis['severe_symptoms']) >= 1 or len(symptom_analysis['moderate_symptoms']) >= 3:
-            interpretation = "Moderate Risk of Depression"
-            confidence = probability[1]
+        if batcher is not None:
+            # Scored together with other concurrent requests in one model call
+            with stages['batched'].time():
+                result = batcher.submit(input_data)
         else:
-            interpretation = "Low Risk of Depression"
-            confidence = probability[0]
-        
-        result = {
-            'category': interpretation,
-            'probability': float(confidence),
-            'symptom_summary': symptom_analysis
-        }
-        print("Final prediction result:", result)
+            # Preprocess the input data
+            with stages['preprocess'].time():
+                processed_data = preprocess_input(input_data)
+            
+            # Get model probability
+            with stages['predict_proba'].time():
+                probability = get_scorer().predict_proba(processed_data)
+            logger.debug("Model probability: %s", probability[0])
+            
+            # Symptom analysis and risk level from the original answers
+            with stages['symptoms'].time():
+                result = build_results([input_data], probability)[0]
+        logger.debug("Final prediction result: %s", result)
+        prediction_cache.put(cache_key, result, generation)
         return result
     except Exception as e:
-        print(f"Error in prediction: {str(e)}")
+        prediction_errors.inc()
+        logger.error("Error in prediction: %s", e)
+        raise
+
+def preprocess_batch(inputs):
+    """Encode a list of answer dicts into one feature matrix."""
+    try:
+        return get_encoder().encode(inputs)
+    except Exception as e:
+        logger.error("Error in batch preprocessing: %s", e)
         raise
 
+def analyze_symptoms_batch(inputs):
+    """Classify every symptom of a batch of answer dicts at once.
+
+    Returns boolean (severe, moderate, mild) masks of shape
+    (n_rows, n_symptoms), with columns in SYMPTOM_MAPPING order.
+    """
+    symptoms = symptom_rules.classify(inputs)
+    return symptoms.severe, symptoms.moderate, symptoms.mild
+
+def predict_depression_batch(inputs):
+    """Make depression predictions for a list of answer dicts in one model call."""
+    try:
+        if not inputs:
+            return []
+        
+        return score_depression_batch(inputs)
+    except Exception as e:
+        prediction_errors.inc()
+        logger.error("Error in batch prediction: %s", e)
+        raise
+
+def score_depression_batch(inputs):
+    """Score a non-empty list of answer dicts; errors are counted by the caller.
+
+    The batcher calls this directly, so a failed single prediction is only
+    counted once, by predict_depression, as on the anxiety path.
+    """
+    with stages['preprocess'].time():
+        processed_data = preprocess_batch(inputs)
+    with stages['predict_proba'].time():
+        probabilities = get_scorer(len(inputs)).predict_proba(processed_data)
+    with stages['symptoms'].time():
+        return build_results(inputs, probabilities)
+
+# Optional coalescing of concurrent single predictions into one model call
+batcher = batcher_from_env(score_depression_batch, 'depression-batcher')
+
+metrics_registry.collector('depression_predictions', lambda: (
+    cache_samples('depression', prediction_cache) + batcher_samples('depression', batcher)
+))
+
+def get_feature_importance_payload():
+    """Return the prebuilt feature-importance JSON, rebuilt only when the model is reloaded."""
+    global _importance_payload
+    model, column_info = load_model_components()
+    state = _importance_payload
+    if state is None or state[0] is not model:
+        records = importance_records(list(column_info.keys()), model.feature_importances_)
+        state = (model, JsonPayload(records, os.path.getmtime(BUNDLE_PATH if MODEL_FORMAT == 'bundle' else MODEL_PATH)))
+        _importance_payload = state
+    return state[1]
+
 def get_feature_importance():
     """Get the importance of each feature."""
     try:
-        model, column_info = load_model_components()
-        importance = model.feature_importances_
-        feature_importance = pd.DataFrame({
-            'feature': list(column_info.keys()),
-            'importance': importance
-        })
-        return feature_importance.sort_values('importance', ascending=False)
+        return pd.DataFrame(get_feature_importance_payload().data)
     except Exception as e:
-        print(f"Error getting feature importance: {str(e)}")
-        raise 
\ No newline at end of file
+        logger.error("Error getting feature importance: %s", e)
+        raise
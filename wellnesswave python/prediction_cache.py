@@ -0,0 +1,65 @@
+import copy
+import threading
+from collections import OrderedDict
+
+class PredictionCache:
+    """Bounded LRU cache of prediction results with hit/miss counters.
+
+    Keys are canonical encodings of the answers, so repeated answer patterns
+    reuse the stored result. clear() bumps a generation counter; a result
+    computed before the clear is dropped by put() instead of being cached
+    against the new model.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """Return a copy of the cached result for key, or None."""
+        if self.maxsize <= 0:
+            return None
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Callers may mutate the returned dict, so never hand out the stored one
+        return copy.deepcopy(result)
+
+    def put(self, key, result, generation):
+        """Store result unless the cache was cleared since generation was read."""
+        if self.maxsize <= 0:
+            return
+        result = copy.deepcopy(result)
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached result, e.g. after the model was reloaded."""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def stats(self):
+        """Return size and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
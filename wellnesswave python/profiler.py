@@ -0,0 +1,239 @@
+import os
+import sys
+import hmac
+import json
+import math
+import time
+import signal
+import threading
+from collections import Counter
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Off unless PROFILER_ENABLED=1; the endpoint and signal handler do nothing otherwise
+PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', '0') == '1'
+# Required in the X-Profiler-Token header of admin requests
+PROFILER_TOKEN = os.getenv('PROFILER_TOKEN', '')
+PROFILER_INTERVAL = float(os.getenv('PROFILER_INTERVAL_MS', 5)) / 1000
+PROFILER_DEFAULT_SECONDS = float(os.getenv('PROFILER_SECONDS', 10))
+PROFILER_MAX_SECONDS = float(os.getenv('PROFILER_MAX_SECONDS', 120))
+PROFILER_DIR = os.getenv('PROFILER_DIR', 'profiles')
+# Sent to one worker (kill -USR2 <pid>) to profile it for PROFILER_SECONDS
+PROFILER_SIGNAL = os.getenv('PROFILER_SIGNAL', 'SIGUSR2')
+
+# Modules whose functions get their own breakdown in every report
+FOCUS_MODULES = ('anxiety_predict_utils', 'predict_utils')
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile is already running in this process."""
+
+def frame_label(frame):
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}"
+
+def stack_of(frame):
+    """Frame labels from the outermost call to frame, as a tuple."""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+def function_breakdown(stacks, modules=FOCUS_MODULES, interval=PROFILER_INTERVAL):
+    """Self and total samples per function of modules, busiest first.
+
+    A function's total counts every sample it was on the stack for (once
+    per sample, however deep the recursion); self counts the samples where
+    it was the innermost frame from those modules, i.e. time spent in its
+    own lines or in library code it called directly.
+    """
+    total = Counter()
+    own = Counter()
+    samples = sum(stacks.values())
+    for stack, count in stacks.items():
+        focused = [label for label in stack if label.split(':', 1)[0] in modules]
+        if not focused:
+            continue
+        for label in set(focused):
+            total[label] += count
+        own[focused[-1]] += count
+    return [
+        {
+            'function': label,
+            'total_samples': count,
+            'self_samples': own[label],
+            'total_ms': count * interval * 1000,
+            'self_ms': own[label] * interval * 1000,
+            'total_share': count / samples if samples else 0.0
+        }
+        for label, count in total.most_common()
+    ]
+
+def leaf_breakdown(stacks, top=20):
+    """The innermost functions that took the most samples, from any module."""
+    leaves = Counter()
+    for stack, count in stacks.items():
+        leaves[stack[-1]] += count
+    return leaves.most_common(top)
+
+def write_collapsed(path, stacks):
+    """Write stacks in the collapsed format read by flamegraph.pl and speedscope."""
+    with open(path, 'w') as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{';'.join(stack)} {count}\n")
+
+def read_collapsed(path):
+    stacks = Counter()
+    with open(path) as f:
+        for line in f:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack:
+                stacks[tuple(stack.split(';'))] += int(count)
+    return stacks
+
+class SamplingProfiler:
+    """Sample the Python stack of every thread in this process for a fixed time.
+
+    A background thread wakes every interval seconds, reads all threads'
+    current frames and counts each distinct stack; nothing is hooked into
+    the profiled code, so the cost is one stack walk per thread per sample
+    and stops when the profile ends. Idle threads are dropped by default:
+    samples whose innermost frame is a lock wait, selector or socket read.
+    """
+
+    # Innermost Python frames of a thread blocked in a lock, selector or socket call
+    IDLE_FRAMES = {'threading:wait', 'selectors:select', 'socket:accept', 'socket:readinto',
+                   'ssl:read', 'ssl:recv_into', 'queue:get'}
+
+    def __init__(self, interval=PROFILER_INTERVAL, output_dir=PROFILER_DIR, include_idle=False):
+        self.interval = interval
+        self.output_dir = output_dir
+        self.include_idle = include_idle
+        self.report = None
+        self._running = False
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self, seconds=PROFILER_DEFAULT_SECONDS):
+        """Start a profile of seconds on a background thread; returns the paths it will write."""
+        seconds = float(seconds)
+        if not math.isfinite(seconds) or seconds <= 0:
+            raise ValueError("seconds must be a positive number")
+        seconds = min(seconds, PROFILER_MAX_SECONDS)
+        with self._lock:
+            if self._running:
+                raise ProfilerBusyError("A profile is already running in this process")
+            self._running = True
+        name = f"profile-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}"
+        paths = {
+            'collapsed': os.path.join(self.output_dir, name + '.collapsed'),
+            'summary': os.path.join(self.output_dir, name + '.json')
+        }
+        self.report = {'state': 'running', 'pid': os.getpid(), 'seconds': seconds, **paths}
+        threading.Thread(target=self._run, args=(seconds, paths), name='profiler', daemon=True).start()
+        logger.info("Profiling process %d for %.0fs -> %s", os.getpid(), seconds, paths['collapsed'])
+        return paths
+
+    def _run(self, seconds, paths):
+        try:
+            stacks, sample_count, elapsed = self.sample(seconds)
+            os.makedirs(self.output_dir, exist_ok=True)
+            write_collapsed(paths['collapsed'], stacks)
+            report = {
+                'state': 'done',
+                'pid': os.getpid(),
+                'seconds': elapsed,
+                'interval_ms': self.interval * 1000,
+                'samples': sample_count,
+                'stacks': len(stacks),
+                **paths,
+                'functions': function_breakdown(stacks, interval=self.interval),
+                'top_leaves': leaf_breakdown(stacks)
+            }
+            with open(paths['summary'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.report = report
+            logger.info("Profile finished: %d samples in %.1fs written to %s", sample_count, elapsed,
+                        paths['collapsed'])
+        except Exception as e:
+            self.report = dict(self.report, state='failed', error=str(e))
+            logger.error("Profile failed: %s", e)
+        finally:
+            self._running = False
+
+    def sample(self, seconds):
+        """(stacks, samples taken, elapsed seconds) for seconds of sampling in the calling thread."""
+        own_thread = threading.get_ident()
+        names = {}
+        stacks = Counter()
+        sample_count = 0
+        start = time.perf_counter()
+        deadline = start + seconds
+        next_sample = start
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if now < next_sample:
+                time.sleep(next_sample - now)
+            next_sample += self.interval
+            sample_count += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                if not self.include_idle and frame_label(frame) in self.IDLE_FRAMES:
+                    continue
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stacks[(names.get(thread_id, str(thread_id)),) + stack_of(frame)] += 1
+        return stacks, sample_count, time.perf_counter() - start
+
+# One profiler per process; the admin endpoint and the signal handler share it
+profiler = SamplingProfiler()
+
+def authorized(token):
+    """True if profiling is on and token matches PROFILER_TOKEN, which must be set."""
+    return PROFILER_ENABLED and bool(PROFILER_TOKEN) and hmac.compare_digest(token or '', PROFILER_TOKEN)
+
+def install_signal_handler(seconds=None):
+    """Profile this process for seconds whenever it receives PROFILER_SIGNAL.
+
+    Does nothing unless profiling is enabled. Call it from the main thread
+    after the server has set up its own handlers, e.g. in gunicorn's
+    post_worker_init.
+    """
+    if not PROFILER_ENABLED:
+        return False
+    signum = getattr(signal, PROFILER_SIGNAL)
+
+    def handle(signum, frame):
+        try:
+            profiler.start(seconds or PROFILER_DEFAULT_SECONDS)
+        except ProfilerBusyError:
+            logger.warning("Ignoring %s: a profile is already running", PROFILER_SIGNAL)
+
+    signal.signal(signum, handle)
+    logger.info("Process %d profiles itself on %s", os.getpid(), PROFILER_SIGNAL)
+    return True
+
+def print_report(path, top=25):
+    stacks = read_collapsed(path)
+    samples = sum(stacks.values())
+    print(f"\n🔥 {path}: {samples} samples across {len(stacks)} distinct stacks")
+    print(f"\n{'function':<60} {'total':>8} {'self':>8}")
+    for entry in function_breakdown(stacks)[:top]:
+        print(f"  {entry['function']:<58} {entry['total_samples']:8d} {entry['self_samples']:8d}"
+              f"  {entry['total_share']:6.1%}")
+    print("\nBusiest innermost frames:")
+    for label, count in leaf_breakdown(stacks, top):
+        print(f"  {label:<58} {count:8d}  {count / samples:6.1%}")
+
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        print_report(path)
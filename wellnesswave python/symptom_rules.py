@@ -0,0 +1,161 @@
+import numpy as np
+
+# Severity level of one answer; ABSENT marks an unanswered symptom question
+ABSENT = -1
+MILD = 0
+MODERATE = 1
+SEVERE = 2
+LEVELS = np.array([MILD, MODERATE, SEVERE]).reshape(3, 1, 1)
+
+def first_match(conditions):
+    """Index of the first true condition in each row, or len(conditions) if none holds."""
+    matched = np.vstack(conditions + [np.ones(len(conditions[0]), dtype=bool)])
+    return matched.argmax(axis=0)
+
+def pick(index, choices):
+    """choices[index[i]][i] for every row i."""
+    return np.vstack(choices)[index, np.arange(len(index))]
+
+class SymptomLevels:
+    """Per-row, per-symptom severity levels with the derived masks and counts."""
+
+    def __init__(self, names, levels):
+        self.names = names
+        self.levels = levels
+        # masks[level] is the (n_rows, n_symptoms) mask of answers at that level
+        masks = levels == LEVELS
+        self.mild, self.moderate, self.severe = masks
+        self.mild_count, self.moderate_count, self.severe_count = masks.sum(axis=2)
+
+    def names_at(self, mask, row):
+        """Symptom names selected by mask in one row, in rule order."""
+        return self.names[mask[row]].tolist()
+
+class AnxietySymptomRules:
+    """CRITICAL_SYMPTOMS compiled into arrays and applied to whole batches.
+
+    An answer at or above its severe threshold is severe, one equal to its
+    moderate value is moderate, anything else is mild. Each symptom adds its
+    weight times the level factor to total_weight.
+    """
+
+    INTERPRETATIONS = ["Extreme Anxiety", "Severe Anxiety", "Moderate Anxiety",
+                       "Mild Anxiety", "No Anxiety"]
+    RISK_LEVELS = np.array([3, 2, 1, 0, 0])
+
+    def __init__(self, weights, escalating_symptoms, severe_threshold=4, moderate_value=3,
+                 level_factors=(0.3, 0.7, 1.0)):
+        self.names = np.array(list(weights))
+        self.weights = np.array(list(weights.values()), dtype=float)
+        self.severe_thresholds = np.full(len(self.names), severe_threshold)
+        self.moderate_values = np.full(len(self.names), moderate_value)
+        # Weight contributed by each symptom at each level, indexed [level, symptom]
+        self.level_weights = np.stack([self.weights * factor for factor in level_factors])
+        self.escalating = np.isin(self.names, escalating_symptoms)
+
+    def classify(self, values):
+        """Severity levels for an (n_rows, n_symptoms) array of answers in rule order."""
+        levels = np.where(values >= self.severe_thresholds, SEVERE,
+                          np.where(values == self.moderate_values, MODERATE, MILD))
+        return SymptomLevels(self.names, levels.astype(np.int8))
+
+    def total_weight(self, symptoms):
+        """Sum of each row's level weights.
+
+        cumsum adds left to right like the original per-symptom loop, so the
+        totals match it exactly (np.sum's pairwise reduction would not).
+        """
+        contributions = self.level_weights[symptoms.levels, np.arange(len(self.names))]
+        return np.cumsum(contributions, axis=1)[:, -1]
+
+    def decide(self, symptoms, total_weight, probability):
+        """Risk level, interpretation and confidence for every row.
+
+        The conditions are checked in order and the first one that holds decides the row.
+        """
+        critical_count = symptoms.severe_count
+        moderate_count = symptoms.moderate_count
+        conditions = [
+            (critical_count >= 2) |
+            symptoms.severe[:, self.escalating].any(axis=1) |
+            ((critical_count == 1) & (moderate_count >= 3)),
+            (probability[:, 3] > 0.7) & (total_weight > 8),
+            (probability[:, 2] > 0.6) & ((moderate_count >= 2) | (total_weight > 5)),
+            probability[:, 1] > 0.5
+        ]
+        interpretation_index = first_match(conditions)
+        risk_levels = self.RISK_LEVELS[interpretation_index]
+        confidences = pick(interpretation_index, [
+            np.maximum(probability[:, 3], 0.9),
+            probability[:, 3],
+            probability[:, 2],
+            probability[:, 1],
+            probability[:, 0]
+        ])
+        return risk_levels, interpretation_index, confidences
+
+class DepressionSymptomRules:
+    """SYMPTOMS compiled into per-question answer->level tables.
+
+    Only the frontend question names in symptom_mapping count as answered.
+    Answers listed as severe or moderate get that level, any other answer is
+    mild, and an unanswered question is ABSENT.
+    """
+
+    INTERPRETATIONS = ["Not Depressed", "High Risk of Depression", "Likely Depressed",
+                       "Moderate Risk of Depression", "Low Risk of Depression"]
+
+    def __init__(self, symptoms, symptom_mapping, escalating_symptoms):
+        self.input_keys = list(symptom_mapping)
+        self.names = np.array(list(symptom_mapping.values()))
+        self.tables = []
+        for backend_name in symptom_mapping.values():
+            rule = symptoms[backend_name]
+            table = {value: MODERATE for value in rule['moderate']}
+            # Severe wins when an answer is listed under both levels
+            table.update({value: SEVERE for value in rule['severe']})
+            self.tables.append(table)
+        self._lookups = list(zip(self.input_keys, self.tables))
+        self.escalating = np.isin(self.names, escalating_symptoms)
+
+    def classify(self, inputs):
+        """Severity levels for a list of answer dicts."""
+        try:
+            levels = [
+                [table.get(row[key], MILD) if key in row else ABSENT for key, table in self._lookups]
+                for row in inputs
+            ]
+        except TypeError:
+            # Unhashable answers never match a listed value, so they are mild
+            levels = [
+                [_safe_level(table, row[key]) if key in row else ABSENT for key, table in self._lookups]
+                for row in inputs
+            ]
+        levels = np.array(levels, dtype=np.int8).reshape(len(inputs), len(self.names))
+        return SymptomLevels(self.names, levels)
+
+    def decide(self, symptoms, probability):
+        """Interpretation and confidence for every row, first matching condition wins."""
+        severe_count = symptoms.severe_count
+        moderate_count = symptoms.moderate_count
+        conditions = [
+            (severe_count == 0) & (moderate_count == 0),
+            symptoms.severe[:, self.escalating].any(axis=1) | (severe_count >= 3),
+            severe_count >= 2,
+            (severe_count >= 1) | (moderate_count >= 3)
+        ]
+        interpretation_index = first_match(conditions)
+        confidences = pick(interpretation_index, [
+            np.full(len(probability), 0.95),
+            np.maximum(probability[:, 1], 0.9),
+            probability[:, 1],
+            probability[:, 1],
+            probability[:, 0]
+        ])
+        return interpretation_index, confidences
+
+def _safe_level(table, value):
+    try:
+        return table.get(value, MILD)
+    except TypeError:
+        return MILD
@@ -0,0 +1,50 @@
+import joblib
+import numpy as np
+import pytest
+from flat_forest import FlatForest, random_inputs
+
+MODEL_PATHS = ['anxiety_model.joblib', 'depression_model.joblib']
+
+@pytest.fixture(scope='module', params=MODEL_PATHS)
+def model_and_forest(request):
+    model = joblib.load(request.param)
+    return model, FlatForest.from_sklearn(model)
+
+def assert_same_proba(model, forest, X):
+    np.testing.assert_allclose(forest.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-12)
+
+def test_in_range_rows(model_and_forest):
+    model, forest = model_and_forest
+    assert_same_proba(model, forest, random_inputs(model, 2000))
+
+def test_single_row(model_and_forest):
+    model, forest = model_and_forest
+    assert_same_proba(model, forest, random_inputs(model, 1, seed=1))
+
+def test_out_of_range_rows(model_and_forest):
+    model, forest = model_and_forest
+    rng = np.random.default_rng(2)
+    X = rng.uniform(-100, 100, size=(2000, model.n_features_in_))
+    X[::3] = rng.integers(-5, 12, size=X[::3].shape)
+    assert_same_proba(model, forest, X)
+
+def test_nan_rows(model_and_forest):
+    model, forest = model_and_forest
+    rng = np.random.default_rng(3)
+    X = random_inputs(model, 2000, seed=3)
+    X[rng.random(X.shape) < 0.3] = np.nan
+    X[0] = np.nan
+    assert_same_proba(model, forest, X)
+
+def test_save_and_load_keep_nan_routing(model_and_forest, tmp_path):
+    model, forest = model_and_forest
+    path = tmp_path / 'forest.npz'
+    forest.save(path)
+    X = random_inputs(model, 500, seed=4)
+    X[:, 0] = np.nan
+    assert_same_proba(model, FlatForest.load(path), X)
+
+def test_predict_matches_classes(model_and_forest):
+    model, forest = model_and_forest
+    X = random_inputs(model, 500, seed=5)
+    np.testing.assert_array_equal(forest.predict(X), model.predict(X))
@@ -0,0 +1,58 @@
+import os
+import shutil
+import joblib
+import numpy as np
+import pytest
+from lookup_table import ProbabilityTable, load_probability_table, table_path
+from model_registry import load_json
+
+MODEL_PATH = 'depression_model.joblib'
+COLUMN_INFO_PATH = 'column_info.json'
+
+@pytest.fixture(scope='module')
+def model():
+    return joblib.load(MODEL_PATH)
+
+@pytest.fixture(scope='module')
+def table(model):
+    return ProbabilityTable.build(model, load_json(COLUMN_INFO_PATH))
+
+def test_index_is_mixed_radix():
+    table = ProbabilityTable([2, 3, 4], np.zeros((24, 2)), np.array([0, 1]))
+    assert table.strides.tolist() == [12, 4, 1]
+    grid = np.indices([2, 3, 4]).reshape(3, -1).T
+    assert table.index(grid).tolist() == list(range(24))
+
+def test_matches_model_on_every_answer_combination(model, table):
+    grid = np.indices(table.radices).reshape(len(table.radices), -1).T
+    np.testing.assert_array_equal(table.predict_proba(grid), model.predict_proba(grid))
+
+def test_matches_model_on_random_rows(model, table):
+    rng = np.random.default_rng(0)
+    X = rng.integers(0, table.radices, size=(500, len(table.radices)))
+    np.testing.assert_array_equal(table.predict_proba(X), model.predict_proba(X))
+
+def test_save_and_load(table, tmp_path):
+    path = tmp_path / 'table.npz'
+    table.save(str(path))
+    loaded = ProbabilityTable.load(str(path))
+    np.testing.assert_array_equal(loaded.probabilities, table.probabilities)
+    assert loaded.radices.tolist() == table.radices.tolist()
+
+def test_rebuilds_a_stale_table(tmp_path):
+    model_path = str(tmp_path / MODEL_PATH)
+    column_info_path = str(tmp_path / COLUMN_INFO_PATH)
+    shutil.copy(MODEL_PATH, model_path)
+    shutil.copy(COLUMN_INFO_PATH, column_info_path)
+
+    built = load_probability_table(model_path, column_info_path)
+    assert os.path.exists(table_path(model_path))
+    # Written after its inputs, so the persisted table is reused
+    reused = load_probability_table(model_path, column_info_path)
+    np.testing.assert_array_equal(reused.probabilities, built.probabilities)
+
+    # A model newer than the table makes it stale
+    saved = os.path.getmtime(table_path(model_path))
+    os.utime(model_path, (saved + 10, saved + 10))
+    load_probability_table(model_path, column_info_path)
+    assert os.path.getmtime(table_path(model_path)) > saved
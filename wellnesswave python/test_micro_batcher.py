@@ -0,0 +1,102 @@
+import threading
+from concurrent.futures import Future
+import pytest
+from micro_batcher import MicroBatcher, BatcherBusyError
+
+def test_runs_inline_when_idle():
+    calls = []
+
+    def batch_fn(items):
+        calls.append((threading.get_ident(), list(items)))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(batch_fn)
+    assert batcher.submit(3) == 6
+    assert calls == [(threading.get_ident(), [3])]
+    assert batcher.stats()['inline'] == 1
+
+def test_coalesces_requests_that_arrive_while_busy():
+    release = threading.Event()
+    started = threading.Event()
+    sizes = []
+
+    def batch_fn(items):
+        sizes.append(len(items))
+        if len(sizes) == 1:
+            started.set()
+            release.wait(5)
+        return [item + 1 for item in items]
+
+    # The queued requests always fill one batch long before max_wait
+    batcher = MicroBatcher(batch_fn, max_wait=5, max_batch_size=4)
+    results = {}
+
+    def submit(item):
+        results[item] = batcher.submit(item, timeout=5)
+
+    first = threading.Thread(target=submit, args=(0,))
+    first.start()
+    assert started.wait(5)
+    waiting = [threading.Thread(target=submit, args=(item,)) for item in range(1, 5)]
+    for thread in waiting:
+        thread.start()
+    for thread in waiting:
+        thread.join(5)
+    release.set()
+    first.join(5)
+
+    assert results == {item: item + 1 for item in range(5)}
+    assert sizes == [1, 4]
+
+def test_failed_batch_retries_items_alone():
+    def batch_fn(items):
+        if len(items) > 1:
+            raise RuntimeError("batch failed")
+        if items[0] == 'bad':
+            raise ValueError("bad item")
+        return [items[0].upper()]
+
+    batcher = MicroBatcher(batch_fn)
+    batch = []
+    futures = []
+    for item in ['a', 'bad', 'c']:
+        future = Future()
+        futures.append(future)
+        batch.append((item, future, 0.0))
+    batcher._running = 1
+    batcher._execute(batch)
+
+    assert futures[0].result() == 'A'
+    assert futures[2].result() == 'C'
+    with pytest.raises(ValueError):
+        futures[1].result()
+    assert batcher.stats()['retried_batches'] == 1
+    assert batcher._running == 0
+
+def test_rejects_when_queue_is_full():
+    release = threading.Event()
+    running = threading.Semaphore(0)
+
+    def batch_fn(items):
+        running.release()
+        release.wait(5)
+        return list(items)
+
+    batcher = MicroBatcher(batch_fn, max_wait=0, max_queue=1)
+    # One call inline and one on the worker thread, both blocked
+    busy = [threading.Thread(target=batcher.submit, args=(item, 5)) for item in (0, 1)]
+    for thread in busy:
+        thread.start()
+        assert running.acquire(timeout=5)
+    queued = threading.Thread(target=batcher.submit, args=(2, 5))
+    queued.start()
+    try:
+        while batcher.queue_depth() < 1:
+            pass
+        with pytest.raises(BatcherBusyError):
+            batcher.submit(3)
+        assert batcher.stats()['rejected'] == 1
+    finally:
+        release.set()
+        for thread in busy + [queued]:
+            thread.join(5)
@@ -0,0 +1,65 @@
+import struct
+import joblib
+import numpy as np
+import pytest
+from flat_forest import FlatForest, random_inputs
+from model_bundle import (BundleError, FORMAT_VERSION, MAGIC, PREAMBLE, load_bundle, read_header,
+                          write_bundle)
+from model_registry import load_json
+
+@pytest.fixture(scope='module')
+def model():
+    return joblib.load('depression_model.joblib')
+
+@pytest.fixture
+def bundle_file(model, tmp_path):
+    path = tmp_path / 'model.bundle'
+    write_bundle(str(path), FlatForest.from_sklearn(model), load_json('column_info.json'),
+                 model.feature_importances_, label_classes=['no', 'yes'])
+    return path
+
+def test_round_trip_scores_like_sklearn(model, bundle_file):
+    bundle = load_bundle(str(bundle_file), verify=True)
+    X = random_inputs(model, 1000)
+    X[::7, 0] = np.nan
+    np.testing.assert_allclose(bundle.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(bundle.feature_importances_, model.feature_importances_)
+    assert bundle.n_features_in_ == model.n_features_in_
+    assert bundle.label_encoder.inverse_transform([1, 0]).tolist() == ['yes', 'no']
+
+def test_corrupt_data_fails_the_checksum(bundle_file):
+    _, data_start = read_header(str(bundle_file))
+    with open(bundle_file, 'r+b') as f:
+        f.seek(data_start + 8)
+        byte = f.read(1)
+        f.seek(data_start + 8)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    with pytest.raises(BundleError, match='checksum'):
+        load_bundle(str(bundle_file), verify=True)
+    # Skipping verification maps it anyway
+    load_bundle(str(bundle_file), verify=False)
+
+def test_truncated_file(bundle_file):
+    with open(bundle_file, 'r+b') as f:
+        f.truncate(bundle_file.stat().st_size - 64)
+    with pytest.raises(BundleError, match='truncated'):
+        load_bundle(str(bundle_file), verify=False)
+
+def test_wrong_magic(tmp_path):
+    path = tmp_path / 'model.joblib'
+    path.write_bytes(b'not a bundle at all, just some bytes')
+    with pytest.raises(BundleError, match='not a model bundle'):
+        load_bundle(str(path))
+
+def test_other_format_version(bundle_file):
+    with open(bundle_file, 'r+b') as f:
+        f.seek(len(MAGIC))
+        f.write(struct.pack('<I', FORMAT_VERSION + 1))
+    with pytest.raises(BundleError, match='bundle format'):
+        load_bundle(str(bundle_file))
+
+def test_too_short(tmp_path):
+    path = tmp_path / 'empty.bundle'
+    path.write_bytes(MAGIC[:PREAMBLE.size - 1])
+    with pytest.raises(BundleError, match='too short'):
+        load_bundle(str(path))
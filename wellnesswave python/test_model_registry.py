@@ -0,0 +1,75 @@
+import os
+import json
+from model_registry import ModelRegistry, load_json
+
+def write_json(path, data, mtime_ns):
+    with open(path, 'w') as f:
+        json.dump(data, f)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+def counting_loader(calls):
+    def load(path):
+        calls.append(path)
+        return load_json(path)
+    return load
+
+def test_loads_once_per_mtime(tmp_path):
+    path = tmp_path / 'artifact.json'
+    write_json(path, {'version': 1}, 1_000_000_000)
+    registry = ModelRegistry()
+    calls = []
+    loader = counting_loader(calls)
+    first = registry.get(path, loader)
+    assert registry.get(path, loader) is first
+    assert len(calls) == 1
+
+def test_reloads_after_change_and_notifies(tmp_path):
+    path = tmp_path / 'artifact.json'
+    write_json(path, {'version': 1}, 1_000_000_000)
+    registry = ModelRegistry()
+    reloads = []
+    registry.add_reload_listener(lambda: reloads.append(True), [path])
+    assert registry.get(path, load_json) == {'version': 1}
+    assert reloads == []
+
+    write_json(path, {'version': 2}, 2_000_000_000)
+    assert registry.get(path, load_json) == {'version': 2}
+    assert reloads == [True]
+
+def test_listeners_only_hear_their_paths(tmp_path):
+    watched = tmp_path / 'watched.json'
+    other = tmp_path / 'other.json'
+    write_json(watched, {}, 1_000_000_000)
+    write_json(other, {}, 1_000_000_000)
+    registry = ModelRegistry()
+    reloads = []
+    registry.add_reload_listener(lambda: reloads.append(True), [watched])
+    registry.get(other, load_json)
+    write_json(other, {'changed': True}, 2_000_000_000)
+    registry.get(other, load_json)
+    assert reloads == []
+
+def test_each_loader_gets_its_own_entry(tmp_path):
+    path = tmp_path / 'artifact.json'
+    write_json(path, {'version': 1}, 1_000_000_000)
+    registry = ModelRegistry()
+
+    def load_keys(path):
+        return sorted(load_json(path))
+
+    assert registry.get(path, load_json) == {'version': 1}
+    assert registry.get(path, load_keys) == ['version']
+
+def test_clear_forces_reload_and_notifies(tmp_path):
+    path = tmp_path / 'artifact.json'
+    write_json(path, {'version': 1}, 1_000_000_000)
+    registry = ModelRegistry()
+    calls = []
+    reloads = []
+    loader = counting_loader(calls)
+    registry.add_reload_listener(lambda: reloads.append(True), [path])
+    first = registry.get(path, loader)
+    registry.clear()
+    assert reloads == [True]
+    assert registry.get(path, loader) is not first
+    assert len(calls) == 2
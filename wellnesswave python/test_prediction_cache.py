@@ -0,0 +1,54 @@
+from prediction_cache import PredictionCache
+
+def test_hit_returns_a_copy():
+    cache = PredictionCache(4)
+    cache.put('a', {'probability': 0.5, 'symptoms': ['x']}, cache.generation)
+    result = cache.get('a')
+    assert result == {'probability': 0.5, 'symptoms': ['x']}
+    result['symptoms'].append('y')
+    assert cache.get('a')['symptoms'] == ['x']
+
+def test_put_stores_a_copy():
+    cache = PredictionCache(4)
+    result = {'symptoms': ['x']}
+    cache.put('a', result, cache.generation)
+    result['symptoms'].append('y')
+    assert cache.get('a') == {'symptoms': ['x']}
+
+def test_evicts_least_recently_used():
+    cache = PredictionCache(2)
+    cache.put('a', 1, cache.generation)
+    cache.put('b', 2, cache.generation)
+    assert cache.get('a') == 1
+    cache.put('c', 3, cache.generation)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+def test_clear_drops_results_computed_before_it():
+    cache = PredictionCache(4)
+    generation = cache.generation
+    cache.put('a', 1, generation)
+    cache.clear()
+    assert cache.get('a') is None
+    # A result scored with the old model arrives after the reload
+    cache.put('b', 2, generation)
+    assert cache.get('b') is None
+    cache.put('b', 3, cache.generation)
+    assert cache.get('b') == 3
+
+def test_zero_size_disables_caching():
+    cache = PredictionCache(0)
+    cache.put('a', 1, cache.generation)
+    assert cache.get('a') is None
+    assert cache.stats()['misses'] == 0
+
+def test_stats_count_hits_and_misses():
+    cache = PredictionCache(4)
+    cache.get('a')
+    cache.put('a', 1, cache.generation)
+    cache.get('a')
+    cache.get('a')
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (2, 1, 1)
+    assert stats['hit_rate'] == 2 / 3
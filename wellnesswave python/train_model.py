@@ -1,74 +1,95 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
-from sklearn.ensemble import RandomForestClassifier
 import joblib
-
-# Load the dataset
-print("Loading dataset...")
-df = pd.read_csv('depressionData.csv')
-
-# Drop the Timestamp column
-df = df.drop('Timestamp', axis=1)
-
-# Handle missing values with mode
-df = df.fillna(df.mode().iloc[0])
-
-# Create label encoders for each column
-label_encoders = {}
-columns_to_encode = df.columns.drop('Depressed')  # Don't encode the target variable
-
-# Encode each column
-for column in columns_to_encode:
-    le = LabelEncoder()
-    df[column] = le.fit_transform(df[column])
-    label_encoders[column] = le
-
-# Prepare features and target
-X = df.drop('Depressed', axis=1)
-y = df['Depressed'].map({'Yes': 1, 'No': 0})
-
-# Calculate class weights
-class_weights = dict(zip(np.unique(y), 1 / np.bincount(y)))
-
-# Train the model with class weights
-print("Training Random Forest model...")
-model = RandomForestClassifier(
-    n_estimators=100,
-    random_state=42,
-    class_weight=class_weights,
-    min_samples_leaf=5
-)
-model.fit(X, y)
-
-# Save the model and encoders
-print("Saving model and encoders...")
-joblib.dump(model, 'model.joblib')
-joblib.dump(label_encoders, 'label_encoders.joblib')
-
-# Save column information
-column_info = {}
-for column in columns_to_encode:
-    column_info[column] = {
-        'values': label_encoders[column].classes_.tolist(),
-        'encoded_values': list(range(len(label_encoders[column].classes_)))
-    }
-
-# Save column info
 import json
-with open('column_info.json', 'w') as f:
-    json.dump(column_info, f)
-
-# Print model accuracy
-y_pred = model.predict(X)
-accuracy = (y_pred == y).mean()
-print(f"\nModel accuracy: {accuracy * 100:.2f}%")
-
-# Print feature importance
-feature_importance = pd.DataFrame({
-    'feature': X.columns,
-    'importance': model.feature_importances_
-})
-print("\nFeature Importance:")
-print(feature_importance.sort_values('importance', ascending=False)) 
\ No newline at end of file
+import training
+
+CSV_PATH = 'depressionData.csv'
+TARGET = 'Depressed'
+
+MODEL_PARAMS = {
+    'n_estimators': 100,
+    'random_state': 42,
+    'min_samples_leaf': 5,
+    'n_jobs': -1
+}
+
+def prepare_dataset(csv_path):
+    """Parse the CSV and label-encode every feature column."""
+    print("Loading dataset...")
+    df = pd.read_csv(csv_path)
+
+    # Drop the Timestamp column
+    df = df.drop('Timestamp', axis=1)
+
+    # Handle missing values with mode
+    df = df.fillna(df.mode().iloc[0])
+
+    # Encode each column, keeping the classes so the encoders can be rebuilt from the cache
+    classes = {}
+    columns_to_encode = df.columns.drop(TARGET)  # Don't encode the target variable
+    for column in columns_to_encode:
+        le = LabelEncoder()
+        df[column] = le.fit_transform(df[column])
+        classes[column] = le.classes_.tolist()
+
+    df[TARGET] = df[TARGET].map({'Yes': 1, 'No': 0})
+    return df, {'classes': classes}
+
+def model_params(y, params):
+    """Add class weights inversely proportional to class frequency."""
+    class_weights = dict(zip(np.unique(y).tolist(), (1 / np.bincount(y)).tolist()))
+    return dict(params, class_weight=class_weights)
+
+def label_encoders_from(metadata):
+    label_encoders = {}
+    for column, classes in metadata['classes'].items():
+        le = LabelEncoder()
+        le.classes_ = np.array(classes, dtype=object)
+        label_encoders[column] = le
+    return label_encoders
+
+def train_and_save(df, metadata, params):
+    # Prepare features and target
+    X = df.drop(TARGET, axis=1)
+    y = df[TARGET]
+
+    # Train the model with class weights
+    print("Training Random Forest model...")
+    model, stats = training.fit_model(X, y, model_params(y, params))
+    print(training.format_stats(stats))
+
+    # Save the model and encoders
+    print("Saving model and encoders...")
+    label_encoders = label_encoders_from(metadata)
+    joblib.dump(model, 'model.joblib')
+    joblib.dump(label_encoders, 'label_encoders.joblib')
+
+    # Save column information
+    column_info = {}
+    for column, le in label_encoders.items():
+        column_info[column] = {
+            'values': le.classes_.tolist(),
+            'encoded_values': list(range(len(le.classes_)))
+        }
+
+    with open('column_info.json', 'w') as f:
+        json.dump(column_info, f)
+
+    # Print model accuracy
+    y_pred = model.predict(X)
+    accuracy = (y_pred == y).mean()
+    print(f"\nModel accuracy: {accuracy * 100:.2f}%")
+
+    # Print feature importance
+    feature_importance = pd.DataFrame({
+        'feature': X.columns,
+        'importance': model.feature_importances_
+    })
+    print("\nFeature Importance:")
+    print(feature_importance.sort_values('importance', ascending=False))
+    return model
+
+if __name__ == "__main__":
+    training.main('depression')
@@ -0,0 +1,209 @@
+import os
+import io
+import sys
+import json
+import time
+import hashlib
+import argparse
+import importlib
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Training scripts that can be run through this CLI
+DATASETS = {
+    'depression': 'train_model',
+    'anxiety': 'train_anxiety_model'
+}
+
+DATASET_CACHE_DIR = os.getenv('DATASET_CACHE_DIR', '.dataset_cache')
+# Bump when a prepare_dataset() changes so old caches are not reused
+CACHE_VERSION = 1
+
+def file_sha256(path):
+    """Hex SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def dataset_cache_path(csv_path, prepare, cache_dir=DATASET_CACHE_DIR):
+    """Cache file for csv_path as encoded by prepare, keyed by the CSV's hash."""
+    key = hashlib.sha256(
+        f"{file_sha256(csv_path)}:{prepare.__module__}.{prepare.__name__}:{CACHE_VERSION}".encode()
+    ).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(cache_dir, f"{stem}-{key}.npz")
+
+def save_dataset(path, df, metadata):
+    """Write one array per column plus JSON metadata; no pickled objects."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    arrays = {f"column_{i}": df[column].to_numpy() for i, column in enumerate(df.columns)}
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, __columns__=np.array(df.columns, dtype=str),
+                 __metadata__=np.array(json.dumps(metadata)), **arrays)
+    os.replace(tmp_path, path)
+
+def load_dataset(path):
+    """Read a dataset written by save_dataset()."""
+    with np.load(path, allow_pickle=False) as data:
+        columns = data['__columns__'].tolist()
+        df = pd.DataFrame({column: data[f"column_{i}"] for i, column in enumerate(columns)})
+        metadata = json.loads(str(data['__metadata__']))
+    return df, metadata
+
+def cached_dataset(csv_path, prepare, use_cache=True, cache_dir=DATASET_CACHE_DIR):
+    """Return prepare(csv_path), reusing the encoded copy while the CSV is unchanged.
+
+    prepare must return a numeric DataFrame and JSON-serializable metadata
+    (e.g. label-encoder classes) needed to rebuild the saved artifacts.
+    """
+    start = time.perf_counter()
+    path = dataset_cache_path(csv_path, prepare, cache_dir)
+    if use_cache and os.path.exists(path):
+        df, metadata = load_dataset(path)
+        print(f"Loaded cached dataset {path} in {time.perf_counter() - start:.3f}s")
+        return df, metadata
+
+    df, metadata = prepare(csv_path)
+    print(f"Parsed and encoded {csv_path} in {time.perf_counter() - start:.3f}s")
+    if use_cache:
+        save_dataset(path, df, metadata)
+    return df, metadata
+
+def peak_rss_mib():
+    """Peak resident memory of this process in MiB, or None if unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def model_size_bytes(model):
+    """Size of the model as joblib would write it."""
+    import joblib
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.getbuffer().nbytes
+
+def fit_model(X_train, y_train, params, X_eval=None, y_eval=None):
+    """Fit a RandomForestClassifier and return it with wall time, peak memory and size."""
+    start = time.perf_counter()
+    model = RandomForestClassifier(**params)
+    model.fit(X_train, y_train)
+    stats = {
+        'params': {key: value for key, value in params.items() if key != 'class_weight'},
+        'fit_seconds': time.perf_counter() - start,
+        'peak_rss_mib': peak_rss_mib(),
+        'model_bytes': model_size_bytes(model)
+    }
+    if X_eval is not None:
+        stats['accuracy'] = accuracy_score(y_eval, model.predict(X_eval))
+    return model, stats
+
+def format_stats(stats):
+    peak = stats['peak_rss_mib']
+    parts = [
+        f"fit {stats['fit_seconds']:.2f}s",
+        f"peak RSS {peak:.0f} MiB" if peak is not None else "peak RSS n/a",
+        f"model {stats['model_bytes'] / 1024:.0f} KiB"
+    ]
+    if 'accuracy' in stats:
+        parts.append(f"accuracy {stats['accuracy']:.2%}")
+    return ', '.join(parts)
+
+def holdout_split(spec, df):
+    """The 80/20 split the anxiety script evaluates on, used for every sweep run."""
+    X = df.drop(spec.TARGET, axis=1)
+    y = df[spec.TARGET]
+    return train_test_split(X, y, test_size=0.2, random_state=42)
+
+def _sweep_run(spec_name, params, use_cache):
+    """Fit one sweep configuration in a worker process."""
+    spec = importlib.import_module(DATASETS[spec_name])
+    df, metadata = cached_dataset(spec.CSV_PATH, spec.prepare_dataset, use_cache)
+    X_train, X_test, y_train, y_test = holdout_split(spec, df)
+    run_params = spec.model_params(y_train, dict(params, n_jobs=1))
+    _, stats = fit_model(X_train, y_train, run_params, X_test, y_test)
+    return stats
+
+def parse_value(text):
+    """'200' -> 200, 'null' -> None, 'sqrt' -> 'sqrt'."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+def parse_assignments(items):
+    """Turn ['max_depth=10,15', ...] into {'max_depth': [10, 15], ...}."""
+    grid = {}
+    for item in items or []:
+        key, _, values = item.partition('=')
+        if not values:
+            raise ValueError(f"Expected name=value[,value...], got '{item}'")
+        grid[key] = [parse_value(value) for value in values.split(',')]
+    return grid
+
+def run_sweep(spec_name, grid, base_params, workers=None, use_cache=True):
+    """Fit every combination in grid on its own worker process and print the results."""
+    keys = list(grid)
+    combinations = [dict(base_params, **dict(zip(keys, values)))
+                    for values in itertools.product(*(grid[key] for key in keys))]
+    print(f"Sweeping {len(combinations)} configurations on {workers or os.cpu_count()} processes...")
+
+    # One fit per worker process so each run's peak RSS is its own. Python
+    # before 3.11 cannot recycle workers, so there a run's peak RSS also
+    # covers the runs its worker did before it
+    recycle = {'max_tasks_per_child': 1} if sys.version_info >= (3, 11) else {}
+    with ProcessPoolExecutor(max_workers=workers, **recycle) as executor:
+        results = list(executor.map(_sweep_run, itertools.repeat(spec_name),
+                                    combinations, itertools.repeat(use_cache)))
+
+    results.sort(key=lambda stats: stats['accuracy'], reverse=True)
+    print("\nSweep results (held-out accuracy):")
+    for stats in results:
+        varied = {key: stats['params'].get(key) for key in keys}
+        print(f"  {varied}: {format_stats(stats)}")
+    return results
+
+def main(spec_name, argv=None):
+    """Command-line entry point shared by the training scripts."""
+    spec = importlib.import_module(DATASETS[spec_name])
+    parser = argparse.ArgumentParser(description=f"Train the {spec_name} model")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="re-parse the CSV instead of using the encoded dataset cache")
+    parser.add_argument('--param', action='append', metavar='NAME=VALUE',
+                        help="override a RandomForestClassifier parameter")
+    parser.add_argument('--sweep', action='append', metavar='NAME=V1,V2',
+                        help="try each value; repeat for a grid over several parameters")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="sweep processes (default: one per core)")
+    args = parser.parse_args(argv)
+
+    overrides = {key: values[0] for key, values in parse_assignments(args.param).items()}
+    base_params = dict(spec.MODEL_PARAMS, **overrides)
+    use_cache = not args.no_cache
+
+    # Build the cache once up front so sweep workers only read it
+    df, metadata = cached_dataset(spec.CSV_PATH, spec.prepare_dataset, use_cache)
+
+    if args.sweep:
+        return run_sweep(spec_name, parse_assignments(args.sweep), base_params, args.workers, use_cache)
+    return spec.train_and_save(df, metadata, base_params)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in DATASETS:
+        print(f"Usage: python training.py {{{','.join(DATASETS)}}} [options]")
+        sys.exit(2)
+    main(sys.argv[1], sys.argv[2:])
@@ -0,0 +1,131 @@
+import os
+import re
+import sys
+import time
+import threading
+import subprocess
+from collections import defaultdict
+from log_utils import get_logger
+
+logger = get_logger(__name__)
+
+PENDING = 'pending'
+RUNNING = 'running'
+READY = 'ready'
+FAILED = 'failed'
+
+class Warmup:
+    """Named startup steps (imports, model loads) run once, with their timings.
+
+    run() executes the steps in order in the calling thread; start() runs
+    them on a background thread so the server can answer while the models
+    load. ready turns true once every step has finished, and report() gives
+    the state plus how long each step took.
+    """
+
+    def __init__(self, steps):
+        self.steps = steps
+        self.state = PENDING
+        self.error = None
+        self.timings = {}
+        self.seconds = None
+        self._lock = threading.Lock()
+        self._pid = None
+
+    @property
+    def ready(self):
+        return self.state == READY
+
+    def run(self):
+        """Run every step now; a step that raises marks the warm-up failed and re-raises."""
+        with self._lock:
+            self._pid = os.getpid()
+            self.state = RUNNING
+            self.error = None
+        start = time.perf_counter()
+        modules_before = len(sys.modules)
+        try:
+            for name, step in self.steps:
+                step_start = time.perf_counter()
+                step()
+                self.timings[name] = time.perf_counter() - step_start
+        except Exception as e:
+            self.state = FAILED
+            self.error = str(e)
+            logger.error("Warm-up failed: %s", e)
+            raise
+        self.seconds = time.perf_counter() - start
+        self.state = READY
+        logger.info("Warm-up finished in %.2fs (%d modules imported): %s", self.seconds,
+                    len(sys.modules) - modules_before,
+                    ', '.join(f"{name} {seconds:.2f}s" for name, seconds in self.timings.items()))
+
+    def start(self):
+        """Run the steps on a background thread, once per process.
+
+        A process forked after the warm-up finished inherits the loaded
+        models and does not run it again.
+        """
+        if self.ready or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self.ready or self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._run_quietly, name='warmup', daemon=True).start()
+
+    def _run_quietly(self):
+        try:
+            self.run()
+        except Exception:
+            # Already logged and recorded in the report
+            pass
+
+    def report(self):
+        return {
+            'ready': self.ready,
+            'state': self.state,
+            'error': self.error,
+            'seconds': self.seconds,
+            'steps': dict(self.timings)
+        }
+
+IMPORT_TIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+def import_times(module):
+    """(self_us, cumulative_us, depth, name) for every module loaded by importing module.
+
+    Runs `python -X importtime` in a fresh interpreter so nothing is already cached.
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{process.stderr[-2000:]}")
+    entries = []
+    for line in process.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((int(self_us), int(cumulative_us), len(indent) // 2, name))
+    return entries
+
+def import_breakdown(module):
+    """Import time of module grouped by top-level package, slowest first, in seconds."""
+    packages = defaultdict(int)
+    for self_us, _, _, name in import_times(module):
+        packages[name.split('.')[0]] += self_us
+    return sorted(((package, us / 1e6) for package, us in packages.items()),
+                  key=lambda item: item[1], reverse=True)
+
+def print_breakdown(module, top=15):
+    breakdown = import_breakdown(module)
+    total = sum(seconds for _, seconds in breakdown)
+    print(f"\n📦 import {module}: {total:.3f}s across {len(breakdown)} packages")
+    for package, seconds in breakdown[:top]:
+        print(f"  {package:<28} {seconds:8.3f}s  {seconds / total:6.1%}")
+
+if __name__ == "__main__":
+    for module in sys.argv[1:] or ['app', 'anxiety_app', 'anxiety_predict_utils', 'predict_utils']:
+        print_breakdown(module)
@@ -0,0 +1,22 @@
+import os
+import app as assessment_app
+from anxiety_app import anxiety_api, preload_models, warmup
+
+def create_app():
+    """One WSGI app serving both the assessment API and the prediction routes.
+
+    By default (MODEL_WARMUP=eager) models are loaded here, at import time, so
+    a gunicorn master started with preload_app (see gunicorn.conf.py) holds
+    them before forking its workers. 'background' loads them on a thread in
+    each worker after its first request, which suits servers without preload.
+    """
+    warm_up = os.getenv('MODEL_WARMUP', 'eager')
+    if warm_up == 'eager':
+        preload_models()
+    app = assessment_app.create_app()
+    if warm_up == 'background':
+        app.before_request(warmup.start)
+    app.register_blueprint(anxiety_api)
+    return app
+
+app = create_app()